@@ -0,0 +1,52 @@
+"""
+DAG SVG 生成のスケーリング計測（100 → 50,000 ノード）
+
+    uv run benchmarks/bench_dag_svg.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dag_svg import generate_dag_svg  # noqa: E402
+
+SIZES = [100, 1_000, 5_000, 10_000, 50_000]
+
+
+def synthetic_nodes(n, seed=0):
+    """各ノードが直前 50 件のうち最大 2 件に依存する合成ワークフロー"""
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(n):
+        deps = [f"n{j}" for j in rng.sample(range(max(0, i - 50), i), min(i, 2))]
+        nodes.append(
+            {
+                "id": f"n{i}",
+                "label": f"Task {i}",
+                "deadline": f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "section": f"S{i % 10}",
+                "depends_on": deps,
+            }
+        )
+    return nodes
+
+
+def main():
+    print(f"{'nodes':>8} {'edges':>8} {'total ms':>10} {'us/node':>9} {'MB':>7}")
+    for n in SIZES:
+        nodes = synthetic_nodes(n)
+        edges = sum(len(node["depends_on"]) for node in nodes)
+        start = time.perf_counter()
+        svg = generate_dag_svg(nodes)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{n:>8} {edges:>8} {elapsed * 1000:>10.1f} "
+            f"{elapsed / n * 1e6:>9.2f} {len(svg) / 1e6:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
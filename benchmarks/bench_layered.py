@@ -0,0 +1,60 @@
+"""
+階層 DAG レイアウト（dag_layered.py）の計測（1,000 → 10,000 ノード）
+
+    uv run benchmarks/bench_layered.py
+
+full は最初からの計算、incremental は1ノードの依存先を変えた後に直前の
+レイアウトから差分計算した時間、memo はラベルだけ変えた場合（キャッシュヒット）。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_dag_svg import synthetic_nodes  # noqa: E402
+from dag_layered import LayeredLayout, LayoutCache  # noqa: E402
+
+SIZES = [1_000, 5_000, 10_000]
+
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    print(
+        f"{'nodes':>8} {'layers':>7} {'width':>6} {'full ms':>8} "
+        f"{'incr ms':>8} {'redone':>7} {'memo ms':>8}"
+    )
+    for n in SIZES:
+        nodes = synthetic_nodes(n)
+        full_ms, layout = timed(lambda: LayeredLayout(nodes))
+
+        # 末尾付近のノードに依存先を1つ追加
+        edited = list(nodes)
+        target = edited[n - 5]
+        edited[n - 5] = dict(target, depends_on=target["depends_on"] + [f"n{n - 40}"])
+        incr_ms, incremental = timed(lambda: LayeredLayout(edited, previous=layout))
+        assert incremental.positions == LayeredLayout(edited).positions
+
+        cache = LayoutCache()
+        cache.get(nodes)
+        relabeled = [dict(node, label=node["label"] + "!") for node in nodes]
+        memo_ms, _ = timed(lambda: cache.get(relabeled))
+
+        print(
+            f"{n:>8} {layout.depth:>7} {layout.width:>6} {full_ms:>8.1f} "
+            f"{incr_ms:>8.1f} {incremental.replaced_layers:>7} {memo_ms:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
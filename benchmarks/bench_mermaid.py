@@ -0,0 +1,97 @@
+"""
+Mermaid gantt パーサ / シリアライザの計測（1,000 → 50,000 行）
+
+    uv run benchmarks/bench_mermaid.py
+
+legacy は以前の test.py（Dash）の btn-parse の解析ループ（トークンごとに
+re.match を2回呼ぶ）。after の依存関係や期間は解釈しない。
+"""
+
+import random
+import re
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mermaid_gantt import parse_gantt, serialize_gantt  # noqa: E402
+
+SIZES = [1_000, 10_000, 50_000]
+
+
+def synthetic_gantt(n, seed=0):
+    """n タスクの gantt コード（日付指定・after 依存・期間指定を混在）"""
+    rng = random.Random(seed)
+    base = date(2023, 1, 1)
+    lines = ["gantt", "    dateFormat YYYY-MM-DD", "    title Benchmark"]
+    for i in range(n):
+        if i % 100 == 0:
+            lines.append(f"    section S{i // 100}")
+        start = base + timedelta(days=rng.randint(0, 360))
+        kind = i % 3
+        if kind == 0 or i == 0:
+            end = start + timedelta(days=rng.randint(0, 20))
+            lines.append(f"    Task {i} : n{i}, {start}, {end}")
+        elif kind == 1:
+            lines.append(f"    Task {i} : crit, n{i}, after n{i - 1}, {rng.randint(1, 9)}d")
+        else:
+            lines.append(f"    Task {i} : n{i}, {start}, {rng.randint(1, 3)}w")
+    return "\n".join(lines)
+
+
+def legacy_parse(m_code):
+    lines = m_code.split("\n")
+    parsed = []
+    curr_sec = "Default"
+    cnt = 1
+    for line in lines:
+        line = line.strip()
+        if line.startswith("section"):
+            curr_sec = line.replace("section", "").strip()
+        elif ":" in line:
+            parts = line.split(":")
+            tn = parts[0].strip()
+            rem = parts[1].strip()
+            tokens = [t.strip() for t in rem.split(",")]
+            dates = [t for t in tokens if re.match(r"\d{4}-\d{2}-\d{2}", t)]
+            ids = [
+                t
+                for t in tokens
+                if not re.match(r"\d{4}-\d{2}-\d{2}", t) and not t.startswith("after")
+            ]
+            if len(dates) >= 1:
+                s = dates[0]
+                e = dates[1] if len(dates) > 1 else s
+                tid = ids[0] if ids else f"id{cnt}"
+                parsed.append({"id": tid, "section": curr_sec, "task": tn, "start": s, "end": e})
+                cnt += 1
+    return parsed
+
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    print(f"{'lines':>8} {'legacy ms':>10} {'parse ms':>9} {'serialize ms':>13} {'tasks':>7} {'deps':>7}")
+    for n in SIZES:
+        code = synthetic_gantt(n)
+        legacy_ms, _ = timed(lambda: legacy_parse(code))
+        parse_ms, tasks = timed(lambda: parse_gantt(code))
+        serialize_ms, _ = timed(lambda: serialize_gantt(tasks))
+        deps = sum(len(t["depends_on"]) for t in tasks)
+        print(
+            f"{n:>8} {legacy_ms:>10.1f} {parse_ms:>9.1f} {serialize_ms:>13.1f} "
+            f"{len(tasks):>7} {deps:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
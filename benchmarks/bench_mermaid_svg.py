@@ -0,0 +1,55 @@
+"""
+Mermaid のサーバ側 SVG 描画の計測（gantt / flowchart、初回描画とキャッシュ参照）
+
+    uv run benchmarks/bench_mermaid_svg.py
+
+flowchart は木構造＋ランダムな辺で、20 ノードごとに subgraph にまとめる。
+cached は MermaidCache のメモリ参照（ソースのハッシュ計算を含む）。
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_mermaid import synthetic_gantt, timed  # noqa: E402
+from mermaid_svg import MermaidCache, render_mermaid  # noqa: E402
+
+SIZES = [20, 100, 500]
+
+
+def synthetic_flowchart(n, seed=0):
+    """n ノードの flowchart TD（日本語ラベル・2行ラベル・subgraph を含む）"""
+    rng = random.Random(seed)
+    lines = ["flowchart TD", "  N0[開始]"]
+    for i in range(1, n):
+        if i % 20 == 1:
+            if i > 1:
+                lines.append("  end")
+            lines.append(f"  subgraph G{i // 20}[フェーズ {i // 20}]")
+        parent = rng.randrange(max(i - 10, 0), i)
+        lines.append(f"  N{parent} --> N{i}[タスク {i}\\n担当 {rng.randint(1, 9)}]")
+    lines.append("  end")
+    return "\n".join(lines)
+
+
+def main():
+    print(f"{'kind':>10} {'size':>6} {'render ms':>10} {'cached us':>10} {'svg KB':>7}")
+    for kind, make in (("flowchart", synthetic_flowchart), ("gantt", synthetic_gantt)):
+        for n in SIZES:
+            code = make(n)
+            render_ms, svg = timed(lambda: render_mermaid(code))
+            cache = MermaidCache()
+            cache.svg(code)
+            start = time.perf_counter()
+            for _ in range(1000):
+                cache.svg(code)
+            cached_us = (time.perf_counter() - start) * 1000
+            print(f"{kind:>10} {n:>6} {render_ms:>10.1f} {cached_us:>10.1f} {len(svg) / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
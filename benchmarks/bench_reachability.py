@@ -0,0 +1,60 @@
+"""
+到達可能性インデックス（reachability.py）の計測（1,000 → 50,000 ノード）
+
+    uv run benchmarks/bench_reachability.py
+
+build は最初の構築、add / remove は末尾付近のノードに依存先を1つ追加 / 中央のノードの
+依存先を全削除した後の差分更新、impact は先頭・中央・末尾のノードの上流・下流一覧の平均、
+reaches は到達判定1回。50,000 ノードは BITSET_MAX_NODES を超えるため探索で答える。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_dag_svg import synthetic_nodes  # noqa: E402
+from reachability import ReachabilityIndex  # noqa: E402
+
+SIZES = [1_000, 10_000, 50_000]
+
+
+def elapsed_ms(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(
+        f"{'nodes':>8} {'build ms':>9} {'add ms':>7} {'remove ms':>10} "
+        f"{'impact ms':>10} {'reaches us':>11} {'rebuilds':>9}"
+    )
+    for n in SIZES:
+        nodes = synthetic_nodes(n)
+        index = ReachabilityIndex()
+        build_ms = elapsed_ms(lambda: index.update(nodes))
+
+        added = list(nodes)
+        target = added[n - 5]
+        added[n - 5] = dict(target, depends_on=target["depends_on"] + ["n10"])
+        add_ms = elapsed_ms(lambda: index.update(added))
+
+        removed = list(added)
+        removed[n // 2] = dict(removed[n // 2], depends_on=[])
+        remove_ms = elapsed_ms(lambda: index.update(removed))
+
+        queries = ["n0", f"n{n // 2}", f"n{n - 1}"]
+        impact_ms = elapsed_ms(lambda: [index.impact(q) for q in queries]) / len(queries)
+        reaches_us = elapsed_ms(lambda: index.reaches("n0", f"n{n - 1}")) * 1000
+
+        print(
+            f"{n:>8} {build_ms:>9.1f} {add_ms:>7.1f} {remove_ms:>10.1f} "
+            f"{impact_ms:>10.2f} {reaches_us:>11.1f} {index.rebuilds:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+クリティカルパス / 余裕日数計算（schedule.py）の計測（1,000 → 100,000 ノード）
+
+    uv run benchmarks/bench_schedule.py
+
+compute は前進・後退計算とクリティカルパス、as_dict は API 用の辞書の組み立て。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_dag_svg import synthetic_nodes  # noqa: E402
+from schedule import compute_schedule  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    print(
+        f"{'nodes':>8} {'compute ms':>11} {'as_dict ms':>11} "
+        f"{'critical':>9} {'path':>6} {'min slack':>10}"
+    )
+    for n in SIZES:
+        nodes = synthetic_nodes(n)
+        compute_ms, schedule = timed(lambda: compute_schedule(nodes))
+        dict_ms, _ = timed(lambda: compute_schedule(nodes).as_dict())
+        print(
+            f"{n:>8} {compute_ms:>11.1f} {dict_ms - compute_ms:>11.1f} "
+            f"{len(schedule.critical):>9} {len(schedule.critical_path):>6} "
+            f"{schedule.min_slack:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
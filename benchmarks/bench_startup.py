@@ -0,0 +1,87 @@
+"""
+アプリの起動コスト計測（python -X importtime の集計＋最初のリクエストまでの時間）
+
+    uv run benchmarks/bench_startup.py
+
+新しいインタプリタで miwada-test.py を import し、テストクライアントで GET / を
+1回処理するまでを計測する。import 時間の大きいモジュール上位と、起動時に
+読み込まれてはいけない重いモジュール（pandas / matplotlib / networkx / markdown）の
+有無を表示する。
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 起動時（最初のリクエストまで）に import されていてはいけないモジュール
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "networkx", "markdown")
+
+TOP = 15
+
+STARTUP_SCRIPT = f"""
+import importlib.util, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {str(ROOT)!r})
+spec = importlib.util.spec_from_file_location("miwada", {str(ROOT / "miwada-test.py")!r})
+app_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(app_module)
+imported = time.perf_counter()
+response = app_module.app.test_client().get("/")
+served = time.perf_counter()
+print("import_ms", (imported - start) * 1000)
+print("first_request_ms", (served - imported) * 1000)
+print("status", response.status_code)
+print("loaded", ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def parse_importtime(stderr):
+    """-X importtime の出力を (累積 us, 自身 us, ネストの深さ, モジュール名) のリストに"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return rows
+
+
+def main():
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(result.returncode)
+
+    stats = dict(
+        line.split(" ", 1) for line in result.stdout.splitlines() if " " in line
+    )
+    rows = parse_importtime(result.stderr)
+    top_level = [row for row in rows if row[2] == 0]
+
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module (top-level imports)")
+    for cumulative_us, self_us, _, name in sorted(top_level, reverse=True)[:TOP]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+    print()
+    print(f"app import:        {float(stats['import_ms']):8.1f} ms")
+    print(
+        f"first GET /:       {float(stats['first_request_ms']):8.1f} ms "
+        f"(status {stats['status']})"
+    )
+    print(f"process wall time: {wall * 1000:8.1f} ms")
+    loaded = stats.get("loaded", "").strip()
+    print(f"heavy modules loaded at startup: {loaded or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
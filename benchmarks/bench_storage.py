@@ -0,0 +1,62 @@
+"""
+ストレージバックエンドの比較（JSON / SQLite、10,000 → 100,000 ノード）
+
+    uv run benchmarks/bench_storage.py
+
+cold は新しいストアインスタンス（起動直後・別ワーカー相当）での初回アクセス。
+JSON はどの問い合わせでも全体を読み込むが、SQLite はインデックスで対象行だけを読む。
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_dag_svg import synthetic_nodes  # noqa: E402
+from workflow_store import open_workflow_store  # noqa: E402
+
+SIZES = [10_000, 50_000, 100_000]
+BACKENDS = [("json", "workflow.json"), ("sqlite", "workflow.sqlite3")]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(backend, path, nodes):
+    target = f"n{len(nodes) // 2}"
+    save_ms = timed(lambda: open_workflow_store(path).save({"nodes": nodes}))
+    section_ms = timed(lambda: open_workflow_store(path).section_nodes("S3"))
+    node_ms = timed(lambda: open_workflow_store(path).get_node(target))
+    dependents_ms = timed(lambda: open_workflow_store(path).dependents(target))
+
+    store = open_workflow_store(path)
+    store.snapshot()
+    patch_ms = timed(lambda: store.apply_patch({target: {"note": "edited"}}))
+    store.compact()
+    full_ms = timed(lambda: open_workflow_store(path).snapshot())
+    print(
+        f"{backend:>7} {len(nodes):>8} {save_ms:>9.1f} {section_ms:>11.1f} "
+        f"{node_ms:>9.1f} {dependents_ms:>11.1f} {patch_ms:>9.2f} {full_ms:>9.1f}"
+    )
+
+
+def main():
+    print(
+        f"{'backend':>7} {'nodes':>8} {'save ms':>9} {'section ms':>11} "
+        f"{'node ms':>9} {'depends ms':>11} {'patch ms':>9} {'full ms':>9}"
+    )
+    print(f"{'':>17}{'(cold)':>21}{'(cold)':>10}{'(cold)':>12}{'(warm)':>10}{'(cold)':>10}")
+    for n in SIZES:
+        nodes = synthetic_nodes(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            for backend, name in BACKENDS:
+                run(backend, Path(tmp) / name, nodes)
+
+
+if __name__ == "__main__":
+    main()
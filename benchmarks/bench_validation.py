@@ -0,0 +1,65 @@
+"""
+validate_workflow() のスケーリング計測（1,000 → 100,000 ノード）
+
+    uv run benchmarks/bench_validation.py
+
+random: 直前 50 件のうち最大 2 件に依存（一部に依存切れ・期限矛盾・サイクルを混入）
+chain:  全ノードが1本の依存チェーン（再帰実装では RecursionError になるケース）
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_dag_svg import synthetic_nodes  # noqa: E402
+from validation import validate_workflow  # noqa: E402
+
+SIZES = [1_000, 10_000, 50_000, 100_000]
+
+
+def with_defects(nodes):
+    """1,000 ノードごとに依存切れとサイクルを1つずつ入れる"""
+    for i in range(0, len(nodes) - 10, 1_000):
+        nodes[i]["depends_on"] = nodes[i]["depends_on"] + [f"missing{i}", f"n{i + 1}"]
+        nodes[i + 1]["depends_on"] = nodes[i + 1]["depends_on"] + [f"n{i}"]
+    return nodes
+
+
+def chain_nodes(n):
+    return [
+        {
+            "id": f"c{i}",
+            "deadline": "2023-06-01",
+            "depends_on": [f"c{i - 1}"] if i else [],
+        }
+        for i in range(n)
+    ]
+
+
+def run(kind, nodes):
+    edges = sum(len(node["depends_on"]) for node in nodes)
+    start = time.perf_counter()
+    result = validate_workflow(nodes)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{kind:>7} {len(nodes):>8} {edges:>8} {elapsed * 1000:>10.1f} "
+        f"{elapsed / len(nodes) * 1e6:>9.2f} {len(result['errors']):>7} "
+        f"{len(result['warnings']):>8}"
+    )
+
+
+def main():
+    print(
+        f"{'graph':>7} {'nodes':>8} {'edges':>8} {'total ms':>10} {'us/node':>9} "
+        f"{'errors':>7} {'warnings':>8}"
+    )
+    for n in SIZES:
+        run("random", with_defects(synthetic_nodes(n)))
+    for n in SIZES:
+        run("chain", chain_nodes(n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Layered DAG Layout - Sugiyama 方式の階層レイアウト（標準ライブラリのみ）
+
+- ランク付けは最長経路法（依存先が上の層、依存元が下の層）。サイクルに含まれる
+  ノードは入力順に、ランク済みの依存先だけを見て配置する
+- 層内の順序は重心法（barycenter）で下向き・上向きのスイープを交互に行い、辺の交差を減らす。
+  同じ重心は直前の順序を保つ安定ソートなので、同じグラフからは常に同じ配置になる
+- 結果はグラフ構造（id の順序と depends_on）のハッシュごとにメモ化する。ラベルや期限だけの
+  変更では再計算しない
+- 構造が変わった場合は直前のレイアウトの各スイープの結果を再利用し、入力（層の構成・
+  隣接関係・隣接ノードの座標）が変わった層だけを並べ直す。結果は最初から計算した場合と同一
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# 重心法のスイープ回数（下向き・上向きを交互に）
+SWEEPS = 4
+
+# メモ化するレイアウトの数
+CACHE_SIZE = 16
+
+
+def graph_key(nodes):
+    """レイアウトに影響する構造（id の順序と depends_on）のハッシュ"""
+    payload = [[node["id"], node.get("depends_on", [])] for node in nodes]
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _graph(nodes):
+    """ノード id（入力順・重複は先勝ち）と依存先 / 依存元の隣接リスト（重複・自己ループなし）"""
+    predecessors = {}
+    for node in nodes:
+        if node["id"] not in predecessors:
+            predecessors[node["id"]] = node.get("depends_on", [])
+    ids = list(predecessors)
+    for node_id in ids:
+        predecessors[node_id] = [
+            dep_id
+            for dep_id in dict.fromkeys(predecessors[node_id])
+            if dep_id in predecessors and dep_id != node_id
+        ]
+    successors = {node_id: [] for node_id in ids}
+    for node_id in ids:
+        for dep_id in predecessors[node_id]:
+            successors[dep_id].append(node_id)
+    return ids, predecessors, successors
+
+
+def _ranks(ids, predecessors, successors):
+    """最長経路法のランク（依存先の無いノードが 0）。O(V + E)"""
+    indegree = {node_id: len(predecessors[node_id]) for node_id in ids}
+    rank = {}
+
+    def drain(queue):
+        while queue:
+            current = queue.pop()
+            rank[current] = max(
+                (rank[dep] + 1 for dep in predecessors[current] if dep in rank),
+                default=0,
+            )
+            for succ in successors[current]:
+                if succ in rank:
+                    continue
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    queue.append(succ)
+
+    drain([node_id for node_id in reversed(ids) if indegree[node_id] == 0])
+    # サイクルで止まったノードは入力順に配置を再開する
+    for node_id in ids:
+        if node_id not in rank:
+            drain([node_id])
+    return rank
+
+
+def _coords(order):
+    """層内の順序 → 中央揃えの X 座標"""
+    offset = (len(order) - 1) / 2
+    return {node_id: i - offset for i, node_id in enumerate(order)}
+
+
+class LayeredLayout:
+    """階層レイアウトの結果
+
+    positions: id → (x, rank)。x は層の中央を 0 とする順序、rank は 0 が最上層。
+    layers: rank ごとの id のリスト（左から右）。
+    """
+
+    def __init__(self, nodes, key=None, previous=None):
+        self.key = key or graph_key(nodes)
+        ids, self.predecessors, self.successors = _graph(nodes)
+        self.rank = _ranks(ids, self.predecessors, self.successors)
+
+        initial = [[] for _ in range(max(self.rank.values(), default=-1) + 1)]
+        for node_id in ids:
+            initial[self.rank[node_id]].append(node_id)
+
+        self.replaced_layers = 0
+        self._passes = [initial]
+        self._pass_coords = [{}]
+        for order in initial:
+            self._pass_coords[0].update(_coords(order))
+        self._sweep(previous)
+
+        self.layers = self._passes[-1]
+        coords = self._pass_coords[-1]
+        self.positions = {node_id: (coords[node_id], self.rank[node_id]) for node_id in ids}
+        self.width = max((len(order) for order in self.layers), default=0)
+        self.depth = len(self.layers)
+
+    def _changed_nodes(self, previous):
+        """直前のレイアウトから隣接関係・ランクが変わったノード（とその隣接ノード）"""
+        if previous is None:
+            return None
+        changed = set()
+        for node_id, preds in self.predecessors.items():
+            if (
+                previous.predecessors.get(node_id) != preds
+                or previous.successors.get(node_id) != self.successors[node_id]
+            ):
+                changed.add(node_id)
+            elif previous.rank.get(node_id) != self.rank[node_id]:
+                changed.add(node_id)
+                changed.update(preds)
+                changed.update(self.successors[node_id])
+        return changed
+
+    def _sweep(self, previous):
+        changed = self._changed_nodes(previous)
+        # 初期順序（層の構成）が変わって座標が変わったノード
+        moved_before = set()
+        if previous is not None:
+            old_coords = previous._pass_coords[0]
+            moved_before = {
+                node_id
+                for node_id, x in self._pass_coords[0].items()
+                if old_coords.get(node_id) != x
+            }
+        for p in range(1, SWEEPS + 1):
+            down = p % 2 == 1
+            neighbors = self.predecessors if down else self.successors
+            before = self._passes[p - 1]
+            result = [None] * len(before)
+            coord = dict(self._pass_coords[p - 1])
+            old_coords = previous._pass_coords[p] if previous is not None else {}
+            moved = set()
+
+            indexes = range(len(before)) if down else range(len(before) - 1, -1, -1)
+            for i in indexes:
+                order = before[i]
+                if previous is not None and self._reusable(
+                    previous, p, i, order, neighbors, changed, (moved, moved_before)
+                ):
+                    result[i] = previous._passes[p][i]
+                    coord.update(_coords(result[i]))
+                    continue
+
+                keys = {}
+                for node_id in order:
+                    linked = neighbors[node_id]
+                    keys[node_id] = (
+                        sum(coord[n] for n in linked) / len(linked)
+                        if linked
+                        else coord[node_id]
+                    )
+                result[i] = sorted(order, key=keys.__getitem__)
+                new_coords = _coords(result[i])
+                moved.update(
+                    node_id
+                    for node_id, x in new_coords.items()
+                    if old_coords.get(node_id) != x
+                )
+                coord.update(new_coords)
+                self.replaced_layers += 1
+
+            self._passes.append(result)
+            self._pass_coords.append(coord)
+            moved_before = moved
+
+    @staticmethod
+    def _reusable(previous, p, i, order, neighbors, changed, moved_sets):
+        """層 i の入力が直前のレイアウトの同じスイープと同じなら True
+
+        moved_sets は今回・前回のスイープで座標が変わったノードの集合。
+        """
+        if i >= len(previous._passes[p - 1]) or previous._passes[p - 1][i] != order:
+            return False
+        moved_sets = [moved for moved in moved_sets if moved]
+        for node_id in order:
+            if node_id in changed:
+                return False
+            for moved in moved_sets:
+                if any(n in moved for n in neighbors[node_id]):
+                    return False
+        return True
+
+
+class LayoutCache:
+    """グラフ構造のハッシュ → LayeredLayout の LRU。新しい構造は直前の結果から差分計算する"""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._layouts = OrderedDict()
+        self._last = None
+        self._lock = threading.Lock()
+
+    def get(self, nodes):
+        key = graph_key(nodes)
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+                return layout
+            previous = self._last
+
+        layout = LayeredLayout(nodes, key, previous)
+        with self._lock:
+            self._layouts[key] = layout
+            while len(self._layouts) > self.size:
+                self._layouts.popitem(last=False)
+            self._last = layout
+        return layout
+
+
+_CACHE = LayoutCache()
+
+
+def layered_layout(nodes):
+    """nodes の階層レイアウト（プロセス内でメモ化）"""
+    return _CACHE.get(nodes)
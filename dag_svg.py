@@ -0,0 +1,514 @@
+"""
+DAG SVG - タイムライン形式の DAG SVG 生成（縦軸=タスク順序、横軸=日付）
+
+- id → ノードの辞書と、期限の事前パースにより O(V+E)
+- 出力は文字列の連結ではなくチャンク単位のジェネレータ（Flask でストリーミング可能）
+- マークアップは従来の generate_dag_svg と完全に同一（data-node-id / data-from / data-to）
+- 大規模ワークフロー向けに、行範囲・日付範囲で切り出したタイル（全体と同じ座標系）と
+  セクション単位に集約した粗い表示（LOD、日付軸は共通）も生成できる
+- 依存関係の階層で配置する表示（LayeredDagLayout、dag_layered の階層レイアウト）も選べる
+- schedule（schedule.compute_schedule の結果）を渡すと、ノードに data-slack を付け、
+  クリティカルなノードと、その間のエッジに critical クラスを付ける
+"""
+
+import traceback
+from datetime import datetime, timedelta
+
+from dag_layered import layered_layout
+
+# ストリーミング時に1チャンクへまとめる要素数
+CHUNK_SIZE = 1000
+
+# ノード矩形の半幅（日付範囲での切り出し時の余白）
+NODE_HALF_WIDTH = 60
+
+# クリティカルパス上のノード・エッジの線の色
+CRITICAL_COLOR = "#d62728"
+
+# LOD 表示での1セクションあたりのレーンの高さ
+LOD_LANE_HEIGHT = 40
+
+SECTION_COLORS = [
+    "#FF6B6B",
+    "#4ECDC4",
+    "#45B7D1",
+    "#FFA07A",
+    "#98D8C8",
+    "#F7DC6F",
+    "#BB8FCE",
+    "#85C1E2",
+]
+
+
+def _parse_date(value, cache):
+    """YYYY-MM-DD をパース（同じ文字列は一度だけ）。不正なら None"""
+    try:
+        return cache[value]
+    except KeyError:
+        try:
+            parsed = datetime.strptime(value, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            parsed = None
+        cache[value] = parsed
+        return parsed
+
+
+def _chunked(parts, size=CHUNK_SIZE):
+    buf = []
+    for part in parts:
+        buf.append(part)
+        if len(buf) >= size:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+
+
+def _marker_parts():
+    yield '<defs><marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">'
+    yield '<polygon points="0 0, 10 3.5, 0 7" fill="#666" class="dag-arrow-marker" data-node-id="marker"/></marker></defs>'
+
+
+class DagLayout:
+    """DAG SVG の座標計算結果（全体表示・タイル・LOD で共有）"""
+
+    width = 1200
+    margin_left = 100
+    margin_right = 50
+    margin_top = 80
+    margin_bottom = 50
+
+    def __init__(self, nodes, section_filter=None, schedule=None):
+        self.schedule = schedule
+
+        # セクションでフィルタ
+        if section_filter:
+            filtered_nodes = [n for n in nodes if n.get("section") == section_filter]
+        else:
+            filtered_nodes = nodes
+        self.filtered_nodes = filtered_nodes
+
+        # id → ノード（重複 id は先勝ち）と依存関係の隣接リスト（挿入順・重複なし）
+        node_by_id = {}
+        successors = {}
+        for node in filtered_nodes:
+            node_by_id.setdefault(node["id"], node)
+            successors.setdefault(node["id"], {})
+        for node in filtered_nodes:
+            edges = successors[node["id"]]
+            for dep_id in node.get("depends_on", []):
+                if dep_id in successors:
+                    edges[dep_id] = None
+        self.node_by_id = node_by_id
+        self.successors = successors
+
+        # ラベルの欠落はストリーム開始前に KeyError として検出される
+        self.labels = {
+            node_id: node["label"][:20] for node_id, node in node_by_id.items()
+        }
+
+        # 期限を一度だけパース
+        date_cache = {}
+        node_dates = [
+            _parse_date(n.get("deadline", ""), date_cache) for n in filtered_nodes
+        ]
+        valid_dates = [d for d in node_dates if d is not None]
+
+        if not valid_dates:
+            # 日付がない場合はフォールバック
+            min_date = datetime(2023, 1, 1)
+            max_date = datetime(2023, 12, 31)
+        else:
+            min_date = min(valid_dates)
+            max_date = max(valid_dates)
+
+        date_range = (max_date - min_date).days
+        if date_range == 0:
+            date_range = 1
+        self.min_date = min_date
+        self.max_date = max_date
+        self.date_range = date_range
+
+        self.height = max(600, len(filtered_nodes) * 50 + 100)
+        self.usable_width = self.width - self.margin_left - self.margin_right
+        usable_height = self.height - self.margin_top - self.margin_bottom
+
+        # タスク位置を計算（縦軸=タスク順序、横軸=日付）
+        normalized_pos = {}
+        row_of = {}
+        task_height = usable_height / max(len(filtered_nodes), 1)
+        for i, node in enumerate(filtered_nodes):
+            y_pos = self.margin_top + i * task_height + task_height / 2
+            node_date = node_dates[i]
+            if node_date is not None:
+                days_from_start = (node_date - min_date).days
+                x_pos = (
+                    self.margin_left + (days_from_start / date_range) * self.usable_width
+                )
+            else:
+                x_pos = self.margin_left + self.usable_width / 2
+            normalized_pos[node["id"]] = (x_pos, y_pos)
+            row_of[node["id"]] = i
+        self.task_height = task_height
+        self.normalized_pos = normalized_pos
+        self.row_of = row_of
+
+        self._predecessors = None
+        self._edges_by_span = None
+        self._section_summary = None
+
+    @property
+    def row_count(self):
+        return len(self.filtered_nodes)
+
+    def x_for_date(self, value):
+        """日付文字列を X 座標に変換（不正なら None）"""
+        parsed = _parse_date(value, {})
+        if parsed is None:
+            return None
+        return (
+            self.margin_left
+            + ((parsed - self.min_date).days / self.date_range) * self.usable_width
+        )
+
+    def row_top(self, row):
+        """行の上端の Y 座標（row=0 はヘッダを含めて 0）"""
+        if row <= 0:
+            return 0
+        if row >= self.row_count:
+            return self.height
+        return self.margin_top + row * self.task_height
+
+    # ---------- 全体表示用のマークアップ ----------
+
+    def header_parts(self, height=None):
+        width = self.width
+        height = self.height if height is None else height
+        margin_left, margin_top = self.margin_left, self.margin_top
+        date_range = self.date_range
+
+        yield from _marker_parts()
+
+        # 背景とグリッド
+        yield f'<rect width="{width}" height="{height}" fill="#f9f9f9"/>'
+
+        # X軸（日付軸）のラベル
+        yield '<g class="x-axis">'
+        yield f'<line x1="{margin_left}" y1="{margin_top - 20}" x2="{width - self.margin_right}" y2="{margin_top - 20}" stroke="#333" stroke-width="1"/>'
+
+        num_labels = min(8, date_range + 1)
+        for i in range(num_labels):
+            date_offset = (date_range * i) / (num_labels - 1) if num_labels > 1 else 0
+            label_date = self.min_date + timedelta(days=int(date_offset))
+            x_label = (
+                margin_left + (date_offset / date_range) * self.usable_width
+                if date_range > 0
+                else margin_left
+            )
+            yield f'<line x1="{x_label}" y1="{margin_top - 20}" x2="{x_label}" y2="{margin_top - 15}" stroke="#333" stroke-width="1"/>'
+            yield f'<text x="{x_label}" y="{margin_top - 25}" text-anchor="middle" fill="#333" font-size="10">{label_date.strftime("%Y-%m-%d")}</text>'
+
+        yield "</g>"
+
+        # Y軸（タスク軸）のラベル
+        yield '<g class="y-axis">'
+        yield f'<text x="{margin_left - 10}" y="{margin_top - 30}" text-anchor="end" fill="#333" font-size="12" font-weight="bold">タスク</text>'
+        yield f'<text x="{width / 2}" y="{margin_top - 45}" text-anchor="middle" fill="#333" font-size="14" font-weight="bold">ワークフローDAG（タイムライン表示）</text>'
+        yield "</g>"
+
+    def _critical(self, node_id):
+        return self.schedule is not None and node_id in self.schedule.critical
+
+    def edge_markup(self, from_node, to_node):
+        x1, y1 = self.normalized_pos[from_node]
+        x2, y2 = self.normalized_pos[to_node]
+
+        # 矢印がノードの端で終わるように調整
+        dx, dy = x2 - x1, y2 - y1
+        length = (dx**2 + dy**2) ** 0.5
+        if length > 0:
+            x2 = x2 - (dx / length) * 60
+            y2 = y2 - (dy / length) * 20
+
+        if self._critical(from_node) and self._critical(to_node):
+            stroke = f'stroke="{CRITICAL_COLOR}" stroke-width="3"'
+            css_class = "dag-edge critical"
+        else:
+            stroke = 'stroke="#666" stroke-width="2"'
+            css_class = "dag-edge"
+        return (
+            f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" '
+            f'{stroke} marker-end="url(#arrowhead)" '
+            f'class="{css_class}" data-from="{from_node}" data-to="{to_node}"/>'
+        )
+
+    def node_markup(self, node_id):
+        x, y = self.normalized_pos[node_id]
+        label = self.labels[node_id]
+        deadline = self.node_by_id[node_id].get("deadline", "")
+
+        attrs = 'class="dag-node"'
+        stroke = 'stroke="#333" stroke-width="2"'
+        if self.schedule is not None:
+            if self._critical(node_id):
+                attrs = 'class="dag-node critical"'
+                stroke = f'stroke="{CRITICAL_COLOR}" stroke-width="3"'
+            slack = self.schedule.slack.get(node_id)
+            if slack is not None:
+                attrs += f' data-slack="{slack}"'
+        markup = (
+            f'<g {attrs} data-node-id="{node_id}">'
+            f'<rect x="{x - 60}" y="{y - 20}" width="120" height="40" '
+            f'fill="#4ECDC4" {stroke} rx="5"/>'
+            f'<text x="{x}" y="{y - 5}" text-anchor="middle" fill="#333" font-size="11" font-weight="bold">{node_id}</text>'
+            f'<text x="{x}" y="{y + 10}" text-anchor="middle" fill="#333" font-size="9">{label[:15]}</text>'
+        )
+        if deadline:
+            markup += f'<text x="{x}" y="{y + 35}" text-anchor="middle" fill="#666" font-size="8">{deadline}</text>'
+        return markup + "</g>"
+
+    def iter_svg(self):
+        """全体の SVG をチャンクごとに返す"""
+        yield (
+            f'<svg width="{self.width}" height="{self.height}" xmlns="http://www.w3.org/2000/svg">'
+            + "".join(self.header_parts())
+        )
+        # エッジ描画（依存関係の矢印）
+        yield from _chunked(
+            self.edge_markup(from_node, to_node)
+            for from_node, targets in self.successors.items()
+            for to_node in targets
+        )
+        # ノード描画
+        yield from _chunked(self.node_markup(node_id) for node_id in self.normalized_pos)
+        yield "</svg>"
+
+    # ---------- タイル（行範囲・日付範囲での切り出し） ----------
+
+    def _edge_indexes(self):
+        if self._predecessors is None:
+            predecessors = {}
+            spans = []
+            for from_node, targets in self.successors.items():
+                for to_node in targets:
+                    predecessors.setdefault(to_node, []).append(from_node)
+                    span = abs(self.row_of[from_node] - self.row_of[to_node])
+                    spans.append((-span, from_node, to_node))
+            spans.sort(key=lambda item: item[0])
+            self._predecessors = predecessors
+            self._edges_by_span = spans
+        return self._predecessors, self._edges_by_span
+
+    def _window_rows(self, row_start, row_end):
+        row_start = max(0, row_start)
+        row_end = min(self.row_count, row_end)
+        return row_start, max(row_start, row_end)
+
+    def _x_window(self, date_from=None, date_to=None):
+        x_min = self.x_for_date(date_from) if date_from else None
+        x_max = self.x_for_date(date_to) if date_to else None
+        return (
+            float("-inf") if x_min is None else x_min - NODE_HALF_WIDTH,
+            float("inf") if x_max is None else x_max + NODE_HALF_WIDTH,
+        )
+
+    def _tile_open(self, row_start, row_end):
+        y0 = self.row_top(row_start)
+        y1 = self.row_top(row_end) if row_end < self.row_count else self.height
+        return (
+            f'<svg width="{self.width}" height="{y1 - y0}" '
+            f'viewBox="0 {y0} {self.width} {y1 - y0}" '
+            f'xmlns="http://www.w3.org/2000/svg" class="dag-tile" '
+            f'data-rows="{row_start}:{row_end}">'
+            + "".join(self.header_parts())
+        )
+
+    def iter_tile(self, row_start, row_end, date_from=None, date_to=None):
+        """行範囲 [row_start, row_end) と日付範囲に交差するノード・エッジだけの SVG
+
+        座標は全体表示と同じで、viewBox で該当範囲を切り出す。
+        """
+        row_start, row_end = self._window_rows(row_start, row_end)
+        x_min, x_max = self._x_window(date_from, date_to)
+        predecessors, edges_by_span = self._edge_indexes()
+
+        window_ids = []
+        for i in range(row_start, row_end):
+            node_id = self.filtered_nodes[i]["id"]
+            if self.row_of[node_id] == i:
+                window_ids.append(node_id)
+
+        # 端点がウィンドウ内のエッジ ＋ ウィンドウを跨ぐ長いエッジ
+        edges = {}
+        for node_id in window_ids:
+            for to_node in self.successors[node_id]:
+                edges[(node_id, to_node)] = None
+            for from_node in predecessors.get(node_id, ()):
+                edges[(from_node, node_id)] = None
+        window = row_end - row_start
+        for neg_span, from_node, to_node in edges_by_span:
+            if -neg_span < window:
+                break
+            lo, hi = sorted((self.row_of[from_node], self.row_of[to_node]))
+            if lo < row_start and hi >= row_end:
+                edges[(from_node, to_node)] = None
+
+        def edge_parts():
+            for from_node, to_node in edges:
+                x1 = self.normalized_pos[from_node][0]
+                x2 = self.normalized_pos[to_node][0]
+                if min(x1, x2) <= x_max and max(x1, x2) >= x_min:
+                    yield self.edge_markup(from_node, to_node)
+
+        yield self._tile_open(row_start, row_end)
+        yield from _chunked(edge_parts())
+        yield from _chunked(
+            self.node_markup(node_id)
+            for node_id in window_ids
+            if x_min <= self.normalized_pos[node_id][0] <= x_max
+        )
+        yield "</svg>"
+
+    # ---------- LOD（セクション単位の集約表示） ----------
+
+    def section_summary(self):
+        """セクションごとの件数・日付範囲（X 座標）と、セクション間のエッジ本数"""
+        if self._section_summary is None:
+            sections = {}
+            for node in self.filtered_nodes:
+                x = self.normalized_pos[node["id"]][0]
+                summary = sections.get(node.get("section", ""))
+                if summary is None:
+                    sections[node.get("section", "")] = {
+                        "count": 1,
+                        "x_min": x,
+                        "x_max": x,
+                    }
+                else:
+                    summary["count"] += 1
+                    summary["x_min"] = min(summary["x_min"], x)
+                    summary["x_max"] = max(summary["x_max"], x)
+
+            links = {}
+            for from_node, targets in self.successors.items():
+                src = self.node_by_id[from_node].get("section", "")
+                for to_node in targets:
+                    dst = self.node_by_id[to_node].get("section", "")
+                    if src != dst:
+                        links[(src, dst)] = links.get((src, dst), 0) + 1
+            self._section_summary = (sections, links)
+        return self._section_summary
+
+    def iter_lod_svg(self, date_from=None, date_to=None):
+        """セクションごとに1本のバーへ集約した粗い表示（ズームアウト用）
+
+        縦軸はセクション（1セクション1レーン）、横軸は全体表示と同じ日付軸。
+        """
+        x_min, x_max = self._x_window(date_from, date_to)
+        sections, links = self.section_summary()
+        lanes = {section: i for i, section in enumerate(sections)}
+        height = self.margin_top + len(sections) * LOD_LANE_HEIGHT + self.margin_bottom
+
+        def lane_center(section):
+            summary = sections[section]
+            return (
+                (summary["x_min"] + summary["x_max"]) / 2,
+                self.margin_top + (lanes[section] + 0.5) * LOD_LANE_HEIGHT,
+            )
+
+        def parts():
+            for (src, dst), count in links.items():
+                x1, y1 = lane_center(src)
+                x2, y2 = lane_center(dst)
+                yield (
+                    f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" '
+                    f'stroke="#666" stroke-width="{min(8, 1 + count // 10)}" '
+                    'marker-end="url(#arrowhead)" class="dag-section-edge" '
+                    f'data-from="{src}" data-to="{dst}" data-count="{count}"/>'
+                )
+            for section, summary in sections.items():
+                if (
+                    summary["x_min"] - NODE_HALF_WIDTH > x_max
+                    or summary["x_max"] + NODE_HALF_WIDTH < x_min
+                ):
+                    continue
+                y_top = self.margin_top + lanes[section] * LOD_LANE_HEIGHT
+                x = summary["x_min"] - NODE_HALF_WIDTH
+                bar_width = summary["x_max"] - summary["x_min"] + 2 * NODE_HALF_WIDTH
+                color = SECTION_COLORS[lanes[section] % len(SECTION_COLORS)]
+                yield (
+                    f'<g class="dag-section" data-section="{section}">'
+                    f'<rect x="{x}" y="{y_top + 5}" width="{bar_width}" '
+                    f'height="{LOD_LANE_HEIGHT - 10}" fill="{color}" '
+                    'stroke="#333" stroke-width="1" opacity="0.8" rx="5"/>'
+                    f'<text x="{x + 5}" y="{y_top + LOD_LANE_HEIGHT / 2 + 4}" '
+                    f'fill="#333" font-size="11" font-weight="bold">'
+                    f'{section} ({summary["count"]})</text></g>'
+                )
+
+        yield (
+            f'<svg width="{self.width}" height="{height}" '
+            'xmlns="http://www.w3.org/2000/svg" class="dag-lod">'
+            + "".join(self.header_parts(height))
+        )
+        yield from _chunked(parts())
+        yield "</svg>"
+
+
+class LayeredDagLayout(DagLayout):
+    """依存関係の階層で配置する DAG SVG の座標（縦軸=階層、横軸=階層内の順序）
+
+    全体表示（iter_svg）用。タイル・LOD は日付軸の DagLayout を使う。
+    """
+
+    column_width = 160
+    layer_height = 100
+
+    def __init__(self, nodes, section_filter=None, schedule=None):
+        super().__init__(nodes, section_filter, schedule)
+        layout = layered_layout(self.filtered_nodes)
+        self.width = max(
+            DagLayout.width,
+            layout.width * self.column_width + self.margin_left + self.margin_right,
+        )
+        self.height = max(
+            600, layout.depth * self.layer_height + self.margin_top + self.margin_bottom
+        )
+        center = self.margin_left + (self.width - self.margin_left - self.margin_right) / 2
+        self.normalized_pos = {
+            node_id: (
+                center + x * self.column_width,
+                self.margin_top + rank * self.layer_height + self.layer_height / 2,
+            )
+            for node_id, (x, rank) in layout.positions.items()
+        }
+
+    def header_parts(self, height=None):
+        height = self.height if height is None else height
+        yield from _marker_parts()
+        yield f'<rect width="{self.width}" height="{height}" fill="#f9f9f9"/>'
+        yield f'<text x="{self.width / 2}" y="{self.margin_top - 45}" text-anchor="middle" fill="#333" font-size="14" font-weight="bold">ワークフローDAG（階層表示）</text>'
+
+
+def iter_dag_svg(nodes, section_filter=None, layout=None, schedule=None):
+    """DAG SVG をチャンクごとに返すジェネレータを作る
+
+    レイアウト計算はこの関数の呼び出し時に済ませるため、入力不正による例外は
+    最初のチャンクを返す前に送出される。
+    """
+    if layout is None:
+        layout = DagLayout(nodes, section_filter, schedule)
+    return layout.iter_svg()
+
+
+def generate_dag_svg(nodes, section_filter=None, schedule=None):
+    """タイムライン形式でDAGを生成（縦軸=タスク順序、横軸=日付）
+    section_filter: セクション名を指定すると、そのセクションのノードのみを表示
+    schedule: クリティカルパスの強調表示に使う compute_schedule() の結果
+    """
+    try:
+        return "".join(iter_dag_svg(nodes, section_filter, schedule=schedule))
+    except Exception as e:
+        print(f"DAG SVG generation error: {e}")
+        traceback.print_exc()
+        return None
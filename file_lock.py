@@ -0,0 +1,94 @@
+"""
+File Lock - プロセス間の排他ロックと共有カウンタ（標準ライブラリのみ）
+
+- 複数ワーカープロセス（gunicorn 等）で workflow.json の保存やレンダリングを直列化する
+- POSIX は fcntl.flock、Windows は msvcrt.locking を使う
+- 同一プロセス内では再入可能（スレッド間の排他も兼ねる）
+"""
+
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """ロックファイルによるプロセス間の排他ロック（with 文で使う）"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SharedCounter:
+    """ファイルに保存した単調増加カウンタ（全ワーカーで共有する世代番号）
+
+    increment() は対応する FileLock を保持した状態で呼ぶこと。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def value(self):
+        try:
+            with open(self.path, "r", encoding="ascii") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def increment(self):
+        value = self.value() + 1
+        self.set(value)
+        return value
+
+    def set(self, value):
+        """一時ファイル経由で置き換える（読み手が途中の値を見ないように）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="ascii") as f:
+            f.write(str(value))
+        os.replace(tmp_path, self.path)
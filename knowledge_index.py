@@ -0,0 +1,122 @@
+"""
+Knowledge Index - knowledge_dir 配下のファイル一覧のキャッシュ
+
+- ディレクトリごとに1回だけ走査し、同じ knowledge_dir を指すタスク間で共有
+- ツリー内の各ディレクトリの mtime を記録し、変化した時だけ再走査
+  （ファイルの追加・削除・リネームは親ディレクトリの mtime を変える）
+- mtime の確認自体も RECHECK_INTERVAL 秒に1回だけ。それまではメモリから返す
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+# ディレクトリの mtime を再確認するまでの秒数
+RECHECK_INTERVAL = 1.0
+
+
+def _dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class _DirEntry:
+    __slots__ = ("links", "dir_stamps", "checked_at")
+
+    def __init__(self, links, dir_stamps, checked_at):
+        self.links = links
+        self.dir_stamps = dir_stamps  # ディレクトリ → mtime_ns（無ければ None）
+        self.checked_at = checked_at
+
+    def is_stale(self):
+        return any(_dir_mtime(path) != stamp for path, stamp in self.dir_stamps.items())
+
+
+class KnowledgeIndex:
+    """knowledge_dir の値 → ファイルリンク一覧のインデックス"""
+
+    def __init__(self, base_dir, static_dir):
+        self.base_dir = Path(base_dir)
+        self.static_dir = Path(static_dir)
+        self._lock = threading.Lock()
+        self._resolved = {}  # knowledge_dir の値 → (解決済みパス or None, 確認時刻)
+        self._entries = {}  # 解決済みパス → _DirEntry
+
+    def links(self, knowledge_dir_value):
+        """build_knowledge_file_links() と同じ形式のリンク一覧を返す
+
+        リスト内の dict は共有されるので書き換えないこと。
+        """
+        if not knowledge_dir_value:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            knowledge_dir = self._resolve(knowledge_dir_value, now)
+            if knowledge_dir is None:
+                return []
+            entry = self._entries.get(knowledge_dir)
+            if entry is None or (
+                now - entry.checked_at >= RECHECK_INTERVAL and entry.is_stale()
+            ):
+                entry = self._entries[knowledge_dir] = self._scan(knowledge_dir, now)
+            elif now - entry.checked_at >= RECHECK_INTERVAL:
+                entry.checked_at = now
+            return list(entry.links)
+
+    def invalidate(self):
+        """次回アクセス時に強制的に再走査させる"""
+        with self._lock:
+            self._resolved.clear()
+            self._entries.clear()
+
+    def _resolve(self, knowledge_dir_value, now):
+        """static/ 配下に解決できればそのパスを返す（範囲外なら None）"""
+        cached = self._resolved.get(knowledge_dir_value)
+        if cached is not None and now - cached[1] < RECHECK_INTERVAL:
+            return cached[0]
+
+        knowledge_dir = Path(knowledge_dir_value)
+        if not knowledge_dir.is_absolute():
+            knowledge_dir = self.base_dir / knowledge_dir
+        resolved = None
+        try:
+            knowledge_dir = knowledge_dir.resolve()
+            static_root = self.static_dir.resolve()
+            common_root = os.path.commonpath([str(static_root), str(knowledge_dir)])
+            if common_root == str(static_root):
+                resolved = knowledge_dir
+        except (OSError, ValueError, RuntimeError):
+            pass
+        self._resolved[knowledge_dir_value] = (resolved, now)
+        return resolved
+
+    def _scan(self, knowledge_dir, now):
+        """ディレクトリツリーを走査してリンク一覧と各ディレクトリの mtime を記録"""
+        dir_stamps = {knowledge_dir: _dir_mtime(knowledge_dir)}
+        if not knowledge_dir.is_dir():
+            return _DirEntry([], dir_stamps, now)
+
+        static_root = self.static_dir.resolve()
+        links = []
+        for path in sorted(knowledge_dir.rglob("*")):
+            if path.is_dir():
+                dir_stamps[path] = _dir_mtime(path)
+                continue
+            if not path.is_file():
+                continue
+            try:
+                resolved = path.resolve()
+                rel_to_static = resolved.relative_to(static_root).as_posix()
+                rel_to_knowledge = resolved.relative_to(knowledge_dir).as_posix()
+            except (OSError, ValueError, RuntimeError):
+                continue
+            links.append(
+                {
+                    "label": rel_to_knowledge,
+                    "url": f"/static/{rel_to_static}",
+                }
+            )
+        return _DirEntry(links, dir_stamps, now)
@@ -0,0 +1,138 @@
+"""
+Knowledge Pages - /knowledge/<node_id> 用 Markdown → HTML のコンパイル済みキャッシュ
+
+- キーは (Markdown ファイルパス, mtime, size, knowledge_dir の値)。
+  リンク書き換え済みの最終 HTML と ETag を保持する
+- Markdown ファイルの探索結果はディレクトリの mtime が変わるまで再利用
+- markdown.Markdown インスタンスはスレッド（ワーカー）ごとに1つを使い回す
+- Mermaid ブロックは変換前に取り出し、mermaid_svg で描画した SVG を HTML に埋め込む
+"""
+
+import hashlib
+import os
+import re
+import stat
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from mermaid_svg import MermaidCache, inline_mermaid_blocks, split_mermaid_blocks
+
+# キャッシュするページ数の上限（古い順に追い出す）
+MAX_PAGES = 128
+
+_LINK_ATTR = re.compile(r'((?:src|href)=["\'])([^"\']+)(["\'])')
+_ABSOLUTE_PREFIXES = ("http://", "https://", "/", "#", "mailto:", "tel:")
+
+
+def rewrite_relative_links(html_content, knowledge_dir_value):
+    """相対リンク（src / href）を knowledge_dir 基準の URL に書き換える"""
+    knowledge_dir_str = knowledge_dir_value.replace("\\", "/").strip("/")
+    if not knowledge_dir_str:
+        return html_content
+    base_url = f"/{knowledge_dir_str}/"
+
+    def _rewrite_link(match):
+        prefix, url, suffix = match.group(1), match.group(2), match.group(3)
+        if url.startswith(_ABSOLUTE_PREFIXES):
+            return match.group(0)
+        if url.startswith("./"):
+            url = url[2:]
+        return f"{prefix}{base_url}{url}{suffix}"
+
+    return _LINK_ATTR.sub(_rewrite_link, html_content)
+
+
+class KnowledgePages:
+    """knowledge_dir の値 → 表示用 HTML のキャッシュ"""
+
+    def __init__(self, base_dir, max_pages=MAX_PAGES, diagrams=None):
+        self.base_dir = Path(base_dir)
+        self.max_pages = max_pages
+        self.diagrams = diagrams if diagrams is not None else MermaidCache()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._md_files = {}  # ディレクトリ → (mtime_ns, 最初の .md ファイル or None)
+        self._pages = OrderedDict()  # キャッシュキー → (HTML or None, ETag)
+
+    def _markdown(self):
+        md = getattr(self._local, "md", None)
+        if md is None:
+            # markdown は最初のナレッジ表示まで import しない（起動時間短縮）
+            import markdown
+
+            md = self._local.md = markdown.Markdown()
+        return md
+
+    def find_markdown(self, knowledge_dir_value):
+        """knowledge_dir 内の最初の .md ファイルを返す（無ければ None）"""
+        knowledge_dir = Path(knowledge_dir_value)
+        if not knowledge_dir.is_absolute():
+            knowledge_dir = self.base_dir / knowledge_dir
+
+        try:
+            st = os.stat(knowledge_dir)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISDIR(st.st_mode):
+            print(f"Knowledge directory not found: {knowledge_dir}")
+            return None
+
+        cached = self._md_files.get(knowledge_dir)
+        if cached is not None and cached[0] == st.st_mtime_ns:
+            md_file = cached[1]
+        else:
+            md_files = list(knowledge_dir.glob("*.md"))
+            md_file = md_files[0] if md_files else None
+            self._md_files[knowledge_dir] = (st.st_mtime_ns, md_file)
+        if md_file is None:
+            print(f"No .md files found in {knowledge_dir}")
+        return md_file
+
+    def render(self, knowledge_dir_value):
+        """(HTML, ETag) を返す。表示する Markdown が無ければ (None, None)"""
+        md_file = self.find_markdown(knowledge_dir_value)
+        if md_file is None:
+            return None, None
+        try:
+            st = os.stat(md_file)
+        except OSError as e:
+            print(f"Error reading knowledge directory {md_file.parent}: {e}")
+            return None, None
+
+        key = (str(md_file), st.st_mtime_ns, st.st_size, knowledge_dir_value)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                return page
+
+        try:
+            with open(md_file, "r", encoding="utf-8") as f:
+                md_content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error reading knowledge directory {md_file.parent}: {e}")
+            return None, None
+
+        if md_content:
+            md_content, blocks = split_mermaid_blocks(md_content)
+            html_content = self._markdown().reset().convert(md_content)
+            html_content = rewrite_relative_links(html_content, knowledge_dir_value)
+            if blocks:
+                html_content = inline_mermaid_blocks(html_content, blocks, self.diagrams)
+            etag = hashlib.sha1(html_content.encode("utf-8")).hexdigest()[:16]
+            page = (html_content, etag)
+        else:
+            page = (None, None)
+
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return page
+
+    def invalidate(self):
+        with self._lock:
+            self._md_files.clear()
+            self._pages.clear()
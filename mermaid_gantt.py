@@ -0,0 +1,185 @@
+"""
+Mermaid Gantt - Mermaid gantt 記法のパーサ / シリアライザ（Flask と Dash で共用）
+
+- 正規表現はモジュール読み込み時に1回だけコンパイルし、入力全体を1回の finditer で走査する
+  （定型のタスク行は正規表現だけでフィールドまで分解する）
+- タスク行は `タスク名 : [タグ,] [id,] 開始, 終了`。開始は日付か `after <id> ...`、
+  終了は日付か期間（3d / 2w）。タグ（crit / done / active / milestone）は読み飛ばす
+- 解析結果・シリアライザの入力は共通のタスク形式
+  {"id", "section", "task", "start", "end", "depends_on"}（depends_on は `after` の依存先）
+"""
+
+import re
+from datetime import date, timedelta
+
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+DURATION_RE = re.compile(r"(\d+)([dw])")
+
+_DATE = r"\d{4}-\d{2}-\d{2}"
+_SEP = r"[ \t]*,[ \t]*"
+# 入力全体に1回だけ適用し、1行を section 行・タスク行（よく使う形はフィールドまで分解）・
+# その他のタスク行（名前 : 残り）のいずれかとして取り出す
+_LINE_RE = re.compile(
+    rf"""
+    ^[ \t]*(?:
+        section(?:[ \t]+(?P<section>[^\n]*))?
+      | (?P<name>[^:\n%][^:\n]*):[ \t]*
+        (?:(?:crit|done|active|milestone){_SEP})*
+        (?:(?!after[ \t]|{_DATE}[ \t]*(?:,|$))(?P<id>[^,\n]*[^,\s]){_SEP})?
+        (?:(?P<start>{_DATE})|after[ \t]+(?P<after>[^,\n]*[^,\s]))
+        (?:{_SEP}(?:(?P<end>{_DATE})|(?P<count>\d+)(?P<unit>[dw])))?[ \t]*$
+      | (?P<other>[^:\n%][^:\n]*):(?P<rest>[^\n]*)
+    )
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+DEFAULT_SECTION = "Default"
+DEFAULT_TITLE = "Gantt Chart"
+
+_TAGS = frozenset(("crit", "done", "active", "milestone"))
+# コロンを含むがタスク行ではないディレクティブ
+_DIRECTIVES = frozenset(
+    ("axisFormat", "tickInterval", "todayMarker", "accTitle", "accDescr", "title")
+)
+
+
+def _add_days(value, days, cache):
+    """value に days 日を足した日付。cache は (日付, 日数) → 結果"""
+    key = (value, days)
+    if key not in cache:
+        try:
+            cache[key] = (date.fromisoformat(value) + timedelta(days=days)).isoformat()
+        except ValueError:
+            cache[key] = value
+    return cache[key]
+
+
+def _parse_fields(rest):
+    """タスク行の残りをトークンごとに解釈する（_LINE_RE の定型に合わない行用）
+
+    (id, 日付のリスト, 依存先のリスト, 期間の日数) を返す。
+    """
+    task_id = None
+    dates = []
+    depends_on = []
+    duration = None
+    for token in rest.split(","):
+        token = token.strip()
+        if DATE_RE.fullmatch(token):
+            dates.append(token)
+        elif token.startswith("after "):
+            depends_on.extend(token[6:].split())
+        elif match := DURATION_RE.fullmatch(token):
+            count, unit = match.groups()
+            duration = int(count) * (7 if unit == "w" else 1)
+        elif not token or token in _TAGS or token.startswith("until "):
+            continue
+        elif task_id is None:
+            task_id = token
+    return task_id, dates, depends_on, duration
+
+
+def parse_gantt(code):
+    """Mermaid gantt コードをタスクのリストに変換する
+
+    id の無いタスクには出現順に id1, id2, ... を振る。`after` の開始日は
+    依存先の終了日の最大値（前方参照は最後にまとめて解決する）。開始の無い
+    期間だけのタスクは直前のタスクの終了日から始める。日付も `after` も無く
+    開始が決まらない行は読み飛ばす。
+    """
+    tasks = []
+    end_by_id = {}
+    pending = []
+    section = DEFAULT_SECTION
+    date_cache = {}
+    for match in _LINE_RE.finditer(code):
+        (
+            name,
+            task_id,
+            start,
+            after,
+            end,
+            count,
+            unit,
+            other,
+        ) = match.group("name", "id", "start", "after", "end", "count", "unit", "other")
+        if name is not None:
+            name = name.rstrip()
+            if name.partition(" ")[0] in _DIRECTIVES:
+                continue
+            depends_on = after.split() if after else []
+            duration = int(count) * (7 if unit == "w" else 1) if count else None
+            end = end or ""
+        elif other is not None:
+            name = other.rstrip()
+            if name.partition(" ")[0] in _DIRECTIVES:
+                continue
+            task_id, dates, depends_on, duration = _parse_fields(match.group("rest"))
+            if depends_on:
+                start, end = None, dates[0] if dates else ""
+            elif dates:
+                start, end = dates[0], dates[1] if len(dates) > 1 else ""
+            elif duration is not None and tasks and tasks[-1]["end"]:
+                start, end = tasks[-1]["end"], ""
+            else:
+                continue
+        else:
+            section = (match.group("section") or "").strip()
+            continue
+
+        task = {
+            "id": task_id or f"id{len(tasks) + 1}",
+            "section": section,
+            "task": name,
+            "start": start or "",
+            "end": end,
+            "depends_on": depends_on,
+        }
+        if depends_on:
+            pending.append((task, duration))
+        elif duration is not None:
+            task["end"] = _add_days(start, duration, date_cache)
+        elif not end:
+            task["end"] = start
+        tasks.append(task)
+        end_by_id[task["id"]] = task["end"]
+
+    for task, duration in pending:
+        ends = [end_by_id[dep] for dep in task["depends_on"] if end_by_id.get(dep)]
+        if ends:
+            task["start"] = max(ends)
+        if duration is not None and task["start"]:
+            task["end"] = _add_days(task["start"], duration, date_cache)
+        elif not task["end"]:
+            task["end"] = task["start"]
+        elif not task["start"]:
+            task["start"] = task["end"]
+        end_by_id[task["id"]] = task["end"]
+    return tasks
+
+
+def serialize_gantt(tasks, title=DEFAULT_TITLE):
+    """タスクを Mermaid gantt コードに変換する
+
+    Mermaid の開始は日付か `after` のどちらか一方。depends_on がチャート内の
+    タスクだけで、`after` にしても開始日が変わらない（または開始日が無い）場合は
+    `after <id> ...` を、それ以外は開始日を書き出す。
+    """
+    tasks = list(tasks)
+    end_by_id = {task["id"]: task.get("end") or "" for task in tasks}
+    lines = ["gantt", "    dateFormat YYYY-MM-DD", f"    title {title}"]
+    section = None
+    for task in tasks:
+        if task["section"] != section:
+            section = task["section"]
+            lines.append(f"    section {section}")
+        start = task.get("start") or ""
+        depends_on = task.get("depends_on")
+        if depends_on and all(dep in end_by_id for dep in depends_on):
+            ends = [end_by_id[dep] for dep in depends_on]
+            if not start or (all(ends) and max(ends) == start):
+                start = "after " + " ".join(depends_on)
+        fields = [task["id"], start, task.get("end") or ""]
+        lines.append(f"    {task['task']} : {', '.join(f for f in fields if f)}")
+    return "\n".join(lines)
@@ -0,0 +1,781 @@
+"""
+Mermaid SVG - Mermaid の gantt / flowchart をサーバ側で SVG に描画（mermaid.js・外部通信不要）
+
+- gantt は mermaid_gantt.parse_gantt で解析し、timeline_svg の TimelineLayout で描く
+- flowchart（graph）は TD / TB / LR / BT / RL、subgraph（入れ子可）、ノードの形
+  （[] () ([]) [[]] [()] (()) {} {{}} >]）、リンク（--> --- -.-> ==> と |ラベル| / -- ラベル -->）、
+  A & B --> C に対応する。配置は dag_layered の階層レイアウトで、同じ subgraph のノードは
+  層の中で隣り合うように並べ直す
+- classDef / class / style / linkStyle / click と subgraph 内の direction は読み飛ばす
+- 対応していない図（sequenceDiagram など）は None（呼び出し側はソースのまま表示する）
+- MermaidCache はブロックのソースのハッシュ → SVG のメモリ LRU。RenderCache を渡すと
+  ディスクにも保存し、複数ワーカープロセスで共有する
+- Markdown 中の <div class="mermaid"> / <pre class="mermaid"> / ```mermaid ブロックは
+  split_mermaid_blocks() で取り出し、変換後の HTML に inline_mermaid_blocks() で SVG を埋め込む
+"""
+
+import hashlib
+import re
+import threading
+import traceback
+import unicodedata
+from collections import OrderedDict
+from html import escape, unescape
+
+from dag_layered import LayeredLayout
+from mermaid_gantt import parse_gantt
+from render_cache import RENDERER_VERSION
+from timeline_svg import TimelineLayout
+
+# 描画結果が変わる変更を入れたら上げる（キャッシュのキーに含める）
+MERMAID_VERSION = 1
+
+# メモリにキャッシュする図の数
+CACHE_SIZE = 256
+
+FONT_SIZE = 13
+LINE_HEIGHT = 18
+NODE_PADDING_X = 16
+NODE_PADDING_Y = 10
+NODE_GAP = 30  # 同じ層のノードの間隔
+LAYER_GAP = 60  # 層の間隔（subgraph の見出しが入る）
+CLUSTER_PADDING = 12
+CLUSTER_TITLE_HEIGHT = 22
+MARGIN = 20
+
+# subgraph の枠から外部のノードを押し出す処理の最大反復回数
+SEPARATE_ROUNDS = 20
+
+NODE_FILL = "#ECECFF"
+NODE_STROKE = "#9370DB"
+CLUSTER_FILL = "#ffffde"
+CLUSTER_STROKE = "#aaaa33"
+EDGE_COLOR = "#333333"
+
+_HEADER_RE = re.compile(r"^(?:flowchart|graph)(?:\s+(TD|TB|LR|BT|RL))?\s*;?$")
+_SUBGRAPH_RE = re.compile(r'^subgraph\s+(?:(\w+)\s*\[(.*)\]|"(.*)"|(.+?))\s*$')
+_IGNORED_RE = re.compile(r"^(?:direction|classDef|class|style|linkStyle|click)\b")
+_ID_RE = re.compile(r"\s*(\w+)")
+_CLASS_SUFFIX_RE = re.compile(r":::\w+")
+_AMP_RE = re.compile(r"\s*&")
+_LINK_RE = re.compile(
+    r"""
+    \s*(?:
+        (?:--|==|-\.)\s+(?P<inline>[^|]*?)\s+(?P<closing>-{2,}>|-{3,}|\.-+>|\.-+|={2,}>|={3,})
+      | (?P<arrow><?(?:-{2,}>|-{3,}|-\.+->|-\.+-|={2,}>|={3,}|--[ox]))
+    )
+    (?:\s*\|(?P<piped>[^|]*)\|)?
+    """,
+    re.VERBOSE,
+)
+_BREAK_RE = re.compile(r"\\n|<br\s*/?>", re.IGNORECASE)
+
+# (開き, 閉じ, 形)。長い記号から順に試す
+_SHAPES = (
+    ("([", "])", "stadium"),
+    ("[[", "]]", "subroutine"),
+    ("[(", ")]", "cylinder"),
+    ("((", "))", "circle"),
+    ("{{", "}}", "hexagon"),
+    ("[", "]", "rect"),
+    ("(", ")", "round"),
+    ("{", "}", "diamond"),
+    (">", "]", "flag"),
+)
+
+_BLOCK_RE = re.compile(
+    r"""
+    ^[ \t]*(?:
+        <(?P<tag>div|pre)\s+class=["']mermaid["']\s*>(?P<html>.*?)</(?P=tag)>
+      | ```[ \t]*mermaid[ \t]*\n(?P<fence>.*?)^[ \t]*```
+    )[ \t]*$
+    """,
+    re.MULTILINE | re.DOTALL | re.VERBOSE,
+)
+_PLACEHOLDER_RE = re.compile(r"<p>@@mermaid-(\d+)@@</p>")
+
+
+def mermaid_key(code):
+    """ブロックのソースのハッシュ（キャッシュキー）"""
+    data = f"{MERMAID_VERSION}\0{RENDERER_VERSION}\0{code.strip()}"
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _text_width(text):
+    """おおよその描画幅（全角は1文字分、半角は 0.6 文字分）"""
+    return sum(
+        FONT_SIZE if unicodedata.east_asian_width(char) in "WF" else FONT_SIZE * 0.6
+        for char in text
+    )
+
+
+def _label_lines(label):
+    label = label.strip()
+    if len(label) >= 2 and label[0] == label[-1] == '"':
+        label = label[1:-1]
+    return [line.strip() for line in _BREAK_RE.split(label)] or [""]
+
+
+def _text_markup(lines, x, y):
+    """中心 (x, y) に複数行のテキストを置く"""
+    top = y - (len(lines) - 1) * LINE_HEIGHT / 2 + FONT_SIZE * 0.35
+    spans = "".join(
+        f'<tspan x="{x:.1f}" y="{top + i * LINE_HEIGHT:.1f}">{escape(line)}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    return f'<text text-anchor="middle" font-size="{FONT_SIZE}" fill="#333">{spans}</text>'
+
+
+# ==================== gantt ====================
+
+
+class MermaidGanttLayout(TimelineLayout):
+    """Mermaid gantt 用のタイムライン（見出しは title 行）"""
+
+    def __init__(self, code):
+        match = re.search(r"^\s*title\s+(.+?)\s*$", code, re.MULTILINE)
+        if match:
+            self.title = match.group(1)
+        tasks = [
+            dict(task, next_to_list=task["depends_on"]) for task in parse_gantt(code)
+        ]
+        super().__init__(tasks)
+
+
+# ==================== flowchart ====================
+
+
+class Flowchart:
+    """flowchart の解析結果
+
+    nodes: id → {"lines", "shape"}（出現順）。edges: (始点, 終点, ラベル, 線種, 矢印の有無)。
+    subgraphs: id → {"title", "parent", "members"}。
+    """
+
+    def __init__(self, code):
+        self.direction = "TD"
+        self.nodes = {}
+        self.edges = []
+        self.subgraphs = {}
+        self.node_subgraph = {}
+        self._stack = []
+        self._paths = {}
+
+        lines = code.splitlines()
+        body = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("%%"):
+                continue
+            body.append(line)
+        if not body:
+            raise ValueError("Empty flowchart")
+        header = _HEADER_RE.match(body[0])
+        if header is None:
+            raise ValueError(f"Unsupported flowchart header: {body[0]}")
+        self.direction = header.group(1) or "TD"
+
+        for line in body[1:]:
+            for statement in line.split(";"):
+                statement = statement.strip()
+                if statement:
+                    self._statement(statement)
+
+    def _statement(self, statement):
+        subgraph = _SUBGRAPH_RE.match(statement)
+        if subgraph:
+            sub_id, label, quoted, bare = subgraph.groups()
+            if sub_id is None:
+                sub_id = title = quoted if quoted is not None else bare
+            else:
+                title = label
+            self.subgraphs.setdefault(
+                sub_id,
+                {
+                    "title": _label_lines(title)[0] if title else sub_id,
+                    "parent": self._stack[-1] if self._stack else None,
+                    "members": [],
+                },
+            )
+            self._stack.append(sub_id)
+            return
+        if statement == "end":
+            if self._stack:
+                self._stack.pop()
+            return
+        if _IGNORED_RE.match(statement):
+            return
+
+        statement = _CLASS_SUFFIX_RE.sub("", statement)
+        group, pos = self._group(statement, 0)
+        while group:
+            link = _LINK_RE.match(statement, pos)
+            if link is None:
+                break
+            targets, pos = self._group(statement, link.end())
+            arrow = link.group("arrow") or link.group("closing")
+            label = link.group("piped") or link.group("inline") or ""
+            style = "dotted" if "." in arrow else "thick" if "=" in arrow else "solid"
+            head = arrow[-1] in ">ox"
+            for source in group:
+                for target in targets:
+                    self.edges.append((source, target, label.strip(), style, head))
+            group = targets
+
+    def _group(self, text, pos):
+        """A & B & C を読み、(id のリスト, 次の位置) を返す"""
+        ids = []
+        while True:
+            node_id, pos = self._node(text, pos)
+            if node_id is None:
+                return ids, pos
+            ids.append(node_id)
+            amp = _AMP_RE.match(text, pos)
+            if amp is None:
+                return ids, pos
+            pos = amp.end()
+
+    def _node(self, text, pos):
+        match = _ID_RE.match(text, pos)
+        if match is None:
+            return None, pos
+        node_id = match.group(1)
+        pos = match.end()
+        for opening, closing, shape in _SHAPES:
+            if text.startswith(opening, pos):
+                start = pos + len(opening)
+                if text.startswith('"', start):
+                    quote_end = text.find('"', start + 1)
+                    end = text.find(closing, quote_end + 1 if quote_end >= 0 else start)
+                else:
+                    end = text.find(closing, start)
+                if end < 0:
+                    raise ValueError(f"Unclosed node label: {text[pos:]}")
+                self._declare(node_id, _label_lines(text[start:end]), shape)
+                return node_id, end + len(closing)
+        self._declare(node_id, None, None)
+        return node_id, pos
+
+    def _declare(self, node_id, lines, shape):
+        if node_id in self.subgraphs and lines is None:
+            # subgraph への参照（ノードにはしない）
+            return
+        node = self.nodes.get(node_id)
+        if node is None:
+            node = self.nodes[node_id] = {"lines": [node_id], "shape": "rect"}
+        if lines is not None:
+            node["lines"] = lines
+            node["shape"] = shape
+        if self._stack and node_id not in self.node_subgraph:
+            self.node_subgraph[node_id] = self._stack[-1]
+            self.subgraphs[self._stack[-1]]["members"].append(node_id)
+
+    def subgraph_depth(self, sub_id):
+        """subgraph の入れ子の深さ（最も外側が 0）"""
+        level = 0
+        while self.subgraphs[sub_id]["parent"] is not None:
+            sub_id = self.subgraphs[sub_id]["parent"]
+            level += 1
+        return level
+
+    def subgraph_path(self, node_id):
+        """外側から内側への subgraph の id のタプル（解析後に呼ぶ。ノードごとにメモ化）"""
+        path = self._paths.get(node_id)
+        if path is None:
+            path = []
+            current = self.node_subgraph.get(node_id)
+            while current is not None:
+                path.append(current)
+                current = self.subgraphs[current]["parent"]
+            path = self._paths[node_id] = tuple(reversed(path))
+        return path
+
+
+class FlowchartLayout:
+    """flowchart の座標計算結果"""
+
+    def __init__(self, chart, key):
+        self.chart = chart
+        self.marker_id = f"mermaid-arrow-{key[:12]}"
+        horizontal = chart.direction in ("LR", "RL")
+
+        # 寸法
+        self.size = {}
+        for node_id, node in chart.nodes.items():
+            width = max(_text_width(line) for line in node["lines"]) + NODE_PADDING_X * 2
+            height = len(node["lines"]) * LINE_HEIGHT + NODE_PADDING_Y * 2
+            if node["shape"] == "diamond":
+                width, height = width * 1.4, height * 1.4
+            elif node["shape"] == "circle":
+                width = height = max(width, height)
+            self.size[node_id] = (width, height)
+
+        # 階層レイアウト（subgraph への辺はその入口・出口のノードへの辺として扱う）
+        depends_on = {node_id: [] for node_id in chart.nodes}
+        for source, target, *_ in chart.edges:
+            for s in self._endpoints(source, exits=True):
+                for t in self._endpoints(target, exits=False):
+                    depends_on[t].append(s)
+        layout = LayeredLayout(
+            [{"id": node_id, "depends_on": deps} for node_id, deps in depends_on.items()]
+        )
+
+        # 層ごとに、同じ subgraph のノードが隣り合うように並べ直して詰める
+        # （across は層の中の方向、along は層を進める方向の中心座標）
+        self._horizontal = horizontal
+        layers = []
+        across = {}
+        along = {}
+        position = 0.0
+        # 層の間には入れ子の subgraph の見出しと余白が収まる間隔を取る
+        layer_gap = LAYER_GAP + (CLUSTER_PADDING + CLUSTER_TITLE_HEIGHT) * max(
+            (chart.subgraph_depth(sub_id) for sub_id in chart.subgraphs), default=-1
+        )
+        keys = self._order_keys(layout.positions)
+        for layer in layout.layers:
+            layer = sorted(layer, key=keys.__getitem__)
+            thickness = max(self._extent(n)[1] for n in layer)
+            offset = 0.0
+            previous_path = None
+            for node_id in layer:
+                path = chart.subgraph_path(node_id)
+                if previous_path is not None:
+                    offset += NODE_GAP
+                    if path != previous_path:
+                        offset += CLUSTER_PADDING * 2
+                extent = self._extent(node_id)[0]
+                across[node_id] = offset + extent / 2
+                along[node_id] = position + thickness / 2
+                offset += extent
+                previous_path = path
+            for node_id in layer:
+                across[node_id] -= offset / 2
+            layers.append(layer)
+            position += thickness + layer_gap
+        self._separate_clusters(layers, across, along, keys)
+
+        centers = {
+            node_id: (along[node_id], across[node_id])
+            if horizontal
+            else (across[node_id], along[node_id])
+            for node_id in across
+        }
+        if chart.direction == "BT":
+            centers = {n: (x, -y) for n, (x, y) in centers.items()}
+        elif chart.direction == "RL":
+            centers = {n: (-x, y) for n, (x, y) in centers.items()}
+
+        self.boxes = {}
+        for node_id, (x, y) in centers.items():
+            width, height = self.size[node_id]
+            self.boxes[node_id] = (x - width / 2, y - height / 2, x + width / 2, y + height / 2)
+        self.clusters = self._cluster_boxes()
+
+        # 全体を原点に寄せる
+        all_boxes = list(self.boxes.values()) + list(self.clusters.values())
+        if all_boxes:
+            min_x = min(box[0] for box in all_boxes)
+            min_y = min(box[1] for box in all_boxes)
+            max_x = max(box[2] for box in all_boxes)
+            max_y = max(box[3] for box in all_boxes)
+        else:
+            min_x = min_y = max_x = max_y = 0
+        dx, dy = MARGIN - min_x, MARGIN - min_y
+
+        def shift(box):
+            return (box[0] + dx, box[1] + dy, box[2] + dx, box[3] + dy)
+
+        self.boxes = {n: shift(box) for n, box in self.boxes.items()}
+        self.clusters = {s: shift(box) for s, box in self.clusters.items()}
+        self.width = max_x - min_x + MARGIN * 2
+        self.height = max_y - min_y + MARGIN * 2
+
+    def _extent(self, node_id):
+        """(層の中の方向の幅, 層を進める方向の幅)"""
+        width, height = self.size[node_id]
+        return (height, width) if self._horizontal else (width, height)
+
+    def _cluster_span(self, sub_id, across, along):
+        """subgraph の (層の中の方向の下端, 上端, 層を進める方向の始端, 終端)。空なら None
+
+        _cluster_boxes() と同じく子の枠を含める。見出しは最終的な図の上側（BT では反転前の終端側）。
+        """
+        chart = self.chart
+        contents = []
+        for node_id in chart.subgraphs[sub_id]["members"]:
+            width, thickness = self._extent(node_id)
+            contents.append(
+                (
+                    across[node_id] - width / 2,
+                    across[node_id] + width / 2,
+                    along[node_id] - thickness / 2,
+                    along[node_id] + thickness / 2,
+                )
+            )
+        for child in self._children.get(sub_id, ()):
+            span = self._cluster_span(child, across, along)
+            if span is not None:
+                contents.append(span)
+        if not contents:
+            return None
+        pads = self._pads
+        low = min(span[0] for span in contents) - pads[0]
+        high = max(span[1] for span in contents) + pads[1]
+        title_width = _text_width(chart.subgraphs[sub_id]["title"]) + CLUSTER_PADDING * 2
+        if not self._horizontal and high - low < title_width:
+            center = (low + high) / 2
+            low, high = center - title_width / 2, center + title_width / 2
+        return (
+            low,
+            high,
+            min(span[2] for span in contents) - pads[2],
+            max(span[3] for span in contents) + pads[3],
+        )
+
+    def _separate_clusters(self, layers, across, along, keys):
+        """subgraph の枠に掛かる外部のノードを、同じ層の中で枠の外まで押し出す
+
+        押し出す向きは並び順のキーで決める（どの層でも同じ向き）。内側の subgraph から順に、
+        動かなくなるまで繰り返す。枠どうしが層をまたいで食い違い収まらない場合は
+        押し出す前の配置に戻す（枠が外部のノードに掛かることがある）。
+        """
+        initial = dict(across)
+        # 各層が層を進める方向に占める範囲（押し出しでは変わらない）
+        layer_ranges = [
+            (
+                min(along[n] - self._extent(n)[1] / 2 for n in layer),
+                max(along[n] + self._extent(n)[1] / 2 for n in layer),
+            )
+            for layer in layers
+        ]
+        chart = self.chart
+        self._children = {}
+        for sub_id, info in chart.subgraphs.items():
+            self._children.setdefault(info["parent"], []).append(sub_id)
+        # (層の中の方向の下側, 上側, 層を進める方向の始端側, 終端側) の余白
+        title_pad = CLUSTER_PADDING + CLUSTER_TITLE_HEIGHT
+        self._pads = [CLUSTER_PADDING] * 4
+        if self._horizontal:
+            self._pads[0] = title_pad
+        elif chart.direction == "BT":
+            self._pads[3] = title_pad
+        else:
+            self._pads[2] = title_pad
+        order = sorted(
+            (sub_id for sub_id in chart.subgraphs if sub_id in self._group_keys),
+            key=chart.subgraph_depth,
+            reverse=True,
+        )
+        for _ in range(SEPARATE_ROUNDS):
+            moved = False
+            for sub_id in order:
+                low, high, start, end = self._cluster_span(sub_id, across, along)
+                cluster_key = self._cluster_key(sub_id)
+                for layer, (layer_start, layer_end) in zip(layers, layer_ranges):
+                    if layer_end <= start or layer_start >= end:
+                        continue
+                    for i, node_id in enumerate(layer):
+                        if sub_id in chart.subgraph_path(node_id):
+                            continue
+                        width, thickness = self._extent(node_id)
+                        if along[node_id] + thickness / 2 <= start or along[node_id] - thickness / 2 >= end:
+                            continue
+                        node_low = across[node_id] - width / 2
+                        node_high = across[node_id] + width / 2
+                        if node_high + NODE_GAP / 2 <= low or node_low - NODE_GAP / 2 >= high:
+                            continue
+                        if keys[node_id][: len(cluster_key)] < cluster_key:
+                            shift = node_high - (low - NODE_GAP / 2)
+                            for other in layer[: i + 1]:
+                                across[other] -= shift
+                        else:
+                            shift = (high + NODE_GAP / 2) - node_low
+                            for other in layer[i:]:
+                                across[other] += shift
+                        moved = True
+            if not moved:
+                return
+        across.update(initial)
+
+    def _endpoints(self, node_id, exits):
+        """辺の端点のノード。subgraph なら出口（exits）/ 入口のノード"""
+        if node_id in self.chart.nodes:
+            return [node_id]
+        members = [
+            n for n in self.chart.nodes if node_id in self.chart.subgraph_path(n)
+        ]
+        inside = set(members)
+        boundary = [
+            n
+            for n in members
+            if not any(
+                (s == n and t in inside) if exits else (t == n and s in inside)
+                for s, t, *_ in self.chart.edges
+            )
+        ]
+        return boundary or members
+
+    def _order_keys(self, positions):
+        """ノード → 層の中での並び順のキー
+
+        外側の subgraph から順に (subgraph のノードの平均 X, id) を並べ、最後に自分の X を置く。
+        同じ subgraph のノードは層の中で隣り合い、兄弟の subgraph やその外のノードとの
+        左右はどの層でも同じになる。
+        """
+        chart = self.chart
+        sums = {}
+        for node_id, (x, _) in positions.items():
+            for sub_id in chart.subgraph_path(node_id):
+                total, count = sums.get(sub_id, (0.0, 0))
+                sums[sub_id] = (total + x, count + 1)
+        self._group_keys = {
+            sub_id: (total / count, sub_id) for sub_id, (total, count) in sums.items()
+        }
+        return {
+            node_id: tuple(self._group_keys[sub_id] for sub_id in chart.subgraph_path(node_id))
+            + ((x, ""),)
+            for node_id, (x, _) in positions.items()
+        }
+
+    def _cluster_key(self, sub_id):
+        path = [sub_id]
+        while self.chart.subgraphs[path[-1]]["parent"] is not None:
+            path.append(self.chart.subgraphs[path[-1]]["parent"])
+        return tuple(self._group_keys[s] for s in reversed(path))
+
+    def _cluster_boxes(self):
+        """subgraph の枠（内側から順に、子の枠も含めて求める）"""
+        subgraphs = self.chart.subgraphs
+
+        boxes = {}
+        for sub_id in sorted(subgraphs, key=self.chart.subgraph_depth, reverse=True):
+            contents = [self.boxes[n] for n in subgraphs[sub_id]["members"] if n in self.boxes]
+            contents += [
+                boxes[child]
+                for child, info in subgraphs.items()
+                if info["parent"] == sub_id and child in boxes
+            ]
+            if not contents:
+                continue
+            left = min(box[0] for box in contents) - CLUSTER_PADDING
+            top = min(box[1] for box in contents) - CLUSTER_PADDING - CLUSTER_TITLE_HEIGHT
+            right = max(box[2] for box in contents) + CLUSTER_PADDING
+            bottom = max(box[3] for box in contents) + CLUSTER_PADDING
+            title_width = _text_width(subgraphs[sub_id]["title"]) + CLUSTER_PADDING * 2
+            if right - left < title_width:
+                center = (left + right) / 2
+                left, right = center - title_width / 2, center + title_width / 2
+            boxes[sub_id] = (left, top, right, bottom)
+        return boxes
+
+    def _box(self, node_id):
+        return self.boxes.get(node_id) or self.clusters.get(node_id)
+
+    @staticmethod
+    def _clip(box, toward):
+        """box の中心から toward への線分が box の境界と交わる点"""
+        cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        dx, dy = toward[0] - cx, toward[1] - cy
+        if dx == 0 and dy == 0:
+            return cx, cy
+        half_w, half_h = (box[2] - box[0]) / 2, (box[3] - box[1]) / 2
+        scale = min(
+            half_w / abs(dx) if dx else float("inf"),
+            half_h / abs(dy) if dy else float("inf"),
+        )
+        return cx + dx * scale, cy + dy * scale
+
+    def node_markup(self, node_id):
+        node = self.chart.nodes[node_id]
+        left, top, right, bottom = self.boxes[node_id]
+        cx, cy = (left + right) / 2, (top + bottom) / 2
+        width, height = right - left, bottom - top
+        paint = f'fill="{NODE_FILL}" stroke="{NODE_STROKE}" stroke-width="1"'
+        shape = node["shape"]
+        if shape == "diamond":
+            outline = (
+                f'<polygon points="{cx:.1f},{top:.1f} {right:.1f},{cy:.1f} '
+                f'{cx:.1f},{bottom:.1f} {left:.1f},{cy:.1f}" {paint}/>'
+            )
+        elif shape == "hexagon":
+            inset = min(height / 2, width / 4)
+            outline = (
+                f'<polygon points="{left + inset:.1f},{top:.1f} {right - inset:.1f},{top:.1f} '
+                f'{right:.1f},{cy:.1f} {right - inset:.1f},{bottom:.1f} '
+                f'{left + inset:.1f},{bottom:.1f} {left:.1f},{cy:.1f}" {paint}/>'
+            )
+        elif shape == "flag":
+            outline = (
+                f'<polygon points="{left:.1f},{top:.1f} {right:.1f},{top:.1f} '
+                f'{right:.1f},{bottom:.1f} {left:.1f},{bottom:.1f} '
+                f'{left + height / 3:.1f},{cy:.1f}" {paint}/>'
+            )
+        elif shape == "circle":
+            outline = f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{width / 2:.1f}" {paint}/>'
+        else:
+            radius = {"round": 8, "stadium": height / 2, "cylinder": 12}.get(shape, 0)
+            outline = (
+                f'<rect x="{left:.1f}" y="{top:.1f}" width="{width:.1f}" height="{height:.1f}" '
+                f'rx="{radius:.1f}" {paint}/>'
+            )
+            if shape == "subroutine":
+                outline += (
+                    f'<line x1="{left + 6:.1f}" y1="{top:.1f}" x2="{left + 6:.1f}" y2="{bottom:.1f}" stroke="{NODE_STROKE}"/>'
+                    f'<line x1="{right - 6:.1f}" y1="{top:.1f}" x2="{right - 6:.1f}" y2="{bottom:.1f}" stroke="{NODE_STROKE}"/>'
+                )
+        return (
+            f'<g class="mermaid-node" data-node-id="{escape(node_id)}">'
+            f"{outline}{_text_markup(node['lines'], cx, cy)}</g>"
+        )
+
+    def edge_parts(self):
+        """(辺のマークアップ, ラベルのマークアップ) を返す"""
+        edges = []
+        labels = []
+        for source, target, label, style, head in self.chart.edges:
+            source_box, target_box = self._box(source), self._box(target)
+            if source_box is None or target_box is None or source == target:
+                continue
+            source_center = ((source_box[0] + source_box[2]) / 2, (source_box[1] + source_box[3]) / 2)
+            target_center = ((target_box[0] + target_box[2]) / 2, (target_box[1] + target_box[3]) / 2)
+            x1, y1 = self._clip(source_box, target_center)
+            x2, y2 = self._clip(target_box, source_center)
+            attrs = f'stroke="{EDGE_COLOR}" stroke-width="{2.5 if style == "thick" else 1.2}"'
+            if style == "dotted":
+                attrs += ' stroke-dasharray="4 3"'
+            if head:
+                attrs += f' marker-end="url(#{self.marker_id})"'
+            edges.append(
+                f'<line class="mermaid-edge" data-from="{escape(source)}" data-to="{escape(target)}" '
+                f'x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" {attrs}/>'
+            )
+            if label:
+                lines = _label_lines(label)
+                mx, my = (x1 + x2) / 2, (y1 + y2) / 2
+                width = max(_text_width(line) for line in lines) + 8
+                height = len(lines) * LINE_HEIGHT + 4
+                labels.append(
+                    f'<rect x="{mx - width / 2:.1f}" y="{my - height / 2:.1f}" '
+                    f'width="{width:.1f}" height="{height:.1f}" fill="white" fill-opacity="0.9"/>'
+                    + _text_markup(lines, mx, my)
+                )
+        return edges, labels
+
+    def iter_svg(self):
+        yield (
+            f'<svg xmlns="http://www.w3.org/2000/svg" class="mermaid-flowchart" '
+            f'width="{self.width:.0f}" height="{self.height:.0f}" '
+            f'viewBox="0 0 {self.width:.0f} {self.height:.0f}" font-family="sans-serif">'
+        )
+        yield (
+            f'<defs><marker id="{self.marker_id}" markerWidth="10" markerHeight="7" '
+            'refX="9" refY="3.5" orient="auto">'
+            f'<polygon points="0 0, 10 3.5, 0 7" fill="{EDGE_COLOR}"/></marker></defs>'
+        )
+        # 外側の subgraph から描く
+        for sub_id in sorted(self.clusters, key=self.chart.subgraph_depth):
+            left, top, right, bottom = self.clusters[sub_id]
+            yield (
+                f'<g class="mermaid-cluster" data-subgraph-id="{escape(sub_id)}">'
+                f'<rect x="{left:.1f}" y="{top:.1f}" width="{right - left:.1f}" '
+                f'height="{bottom - top:.1f}" fill="{CLUSTER_FILL}" stroke="{CLUSTER_STROKE}" stroke-width="1"/>'
+                f'<text x="{(left + right) / 2:.1f}" y="{top + 16:.1f}" text-anchor="middle" '
+                f'font-size="{FONT_SIZE}" fill="#333">{escape(self.chart.subgraphs[sub_id]["title"])}</text></g>'
+            )
+        edges, labels = self.edge_parts()
+        yield "".join(edges)
+        yield "".join(self.node_markup(node_id) for node_id in self.chart.nodes)
+        yield "".join(labels)
+        yield "</svg>"
+
+
+# ==================== 入口 ====================
+
+
+def render_mermaid(code, key=None):
+    """Mermaid のソースを SVG 文字列に変換する
+
+    対応していない図の種類なら None。解析できない場合は ValueError を送出する。
+    """
+    first = next(
+        (
+            line.strip()
+            for line in code.splitlines()
+            if line.strip() and not line.strip().startswith("%%")
+        ),
+        "",
+    )
+    kind = first.split(None, 1)[0] if first else ""
+    if kind == "gantt":
+        return "".join(MermaidGanttLayout(code).iter_svg())
+    if kind in ("flowchart", "graph"):
+        return "".join(FlowchartLayout(Flowchart(code), key or mermaid_key(code)).iter_svg())
+    return None
+
+
+class MermaidCache:
+    """ブロックのソースのハッシュ → SVG の LRU（store を渡すとディスクにも保存）"""
+
+    def __init__(self, store=None, size=CACHE_SIZE):
+        self.store = store
+        self.size = size
+        self._svgs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def svg(self, code):
+        """SVG 文字列を返す。対応していない・描画できない場合は None"""
+        key = mermaid_key(code)
+        with self._lock:
+            if key in self._svgs:
+                self._svgs.move_to_end(key)
+                return self._svgs[key]
+
+        svg = self.store.get_text(key, ".mermaid.svg") if self.store is not None else None
+        if svg is None:
+            try:
+                svg = render_mermaid(code, key)
+            except Exception as e:
+                print(f"Mermaid rendering error: {e}")
+                traceback.print_exc()
+                svg = None
+            if svg is not None and self.store is not None:
+                self.store.put(key, ".mermaid.svg", svg)
+
+        with self._lock:
+            self._svgs[key] = svg
+            while len(self._svgs) > self.size:
+                self._svgs.popitem(last=False)
+        return svg
+
+
+def split_mermaid_blocks(text):
+    """Markdown から Mermaid ブロックを取り出し、プレースホルダの段落に置き換える
+
+    (置き換え後のテキスト, ブロックのソースのリスト) を返す。
+    """
+    blocks = []
+
+    def replace(match):
+        if match.group("tag"):
+            code = unescape(match.group("html"))
+        else:
+            code = match.group("fence")
+        blocks.append(code.strip("\n"))
+        return f"\n@@mermaid-{len(blocks) - 1}@@\n"
+
+    return _BLOCK_RE.sub(replace, text), blocks
+
+
+def inline_mermaid_blocks(html_content, blocks, cache):
+    """プレースホルダを SVG に置き換える（描画できないブロックはソースのまま表示）"""
+
+    def replace(match):
+        index = int(match.group(1))
+        if index >= len(blocks):
+            return match.group(0)
+        svg = cache.svg(blocks[index])
+        if svg is None:
+            return f'<pre class="mermaid">{escape(blocks[index])}</pre>'
+        return f'<div class="mermaid-diagram">{svg}</div>'
+
+    return _PLACEHOLDER_RE.sub(replace, html_content)
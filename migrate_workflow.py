@@ -0,0 +1,69 @@
+"""
+workflow のストレージ間移行（JSON ⇔ SQLite）
+
+    uv run migrate_workflow.py                                   # data/workflow.json → data/workflow.sqlite3
+    uv run migrate_workflow.py data/workflow.json data/big.sqlite3
+    uv run migrate_workflow.py data/workflow.sqlite3 data/workflow.json --force
+
+- 形式は拡張子で判定（.sqlite / .sqlite3 / .db は SQLite、他は JSON）
+- 移行元の未圧縮の変更ログ・ジャーナルも反映した最新状態を書き出す
+- version は移行元の値以上を引き継ぐ（画像の公開順序や競合検出が逆行しない）
+- 移行先に既にデータがある場合は --force を付けない限り上書きしない
+
+移行後は WORKFLOW_DATA=data/workflow.sqlite3 を指定してアプリを起動する。
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from workflow_store import open_workflow_store
+
+BASE_DIR = Path(__file__).parent
+
+
+def migrate(source, destination, force=False):
+    """source の workflow を destination に書き出し、書き込んだノード数を返す"""
+    if source.resolve() == destination.resolve():
+        raise ValueError("Source and destination are the same file")
+    if not source.exists():
+        raise FileNotFoundError(f"Source not found: {source}")
+
+    workflow = open_workflow_store(source).snapshot().as_workflow()
+    target = open_workflow_store(destination)
+    if target.snapshot().nodes and not force:
+        raise FileExistsError(
+            f"Destination already has data: {destination} (use --force to overwrite)"
+        )
+    snapshot = target.save(workflow)
+    target.compact()
+    return len(snapshot.nodes), snapshot.version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert workflow storage")
+    parser.add_argument(
+        "source", nargs="?", type=Path, default=BASE_DIR / "data" / "workflow.json"
+    )
+    parser.add_argument(
+        "destination",
+        nargs="?",
+        type=Path,
+        default=BASE_DIR / "data" / "workflow.sqlite3",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="overwrite existing destination data"
+    )
+    args = parser.parse_args()
+
+    try:
+        count, version = migrate(args.source, args.destination, args.force)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Migrated {count} nodes: {args.source} -> {args.destination} (version {version})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
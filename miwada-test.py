@@ -11,18 +11,18 @@ Workflow Visualization - Flask App with DAG and Timeline PNG Generation
 - 完全なフォーム処理（JavaScript不要）
 """
 
-import json
+import hashlib
+import io
 import os
-import re
-import traceback
-from collections import defaultdict
-from datetime import datetime
+import sys
+import threading
 from pathlib import Path
 
-import markdown
-import pandas as pd
 from flask import (
     Flask,
+    Response,
+    jsonify,
+    make_response,
     redirect,
     render_template,
     request,
@@ -31,434 +31,21 @@ from flask import (
     url_for,
 )
 
-# ==================== VALIDATION ENGINE ====================
-
-
-class ValidationError(Exception):
-    pass
-
-
-def validate_workflow(nodes):
-    errors = []
-    warnings = []
-    node_by_id = {node["id"]: node for node in nodes}
-
-    # 存在しない依存関係のチェック
-    for node in nodes:
-        for dep_id in node.get("depends_on", []):
-            if dep_id not in node_by_id:
-                errors.append(
-                    f"Node '{node['id']}': Dependency '{dep_id}' does not exist"
-                )
-
-    # サイクル検出
-    cycle_errors = detect_cycles(nodes, node_by_id)
-    errors.extend(cycle_errors)
-
-    # 期限矛盾チェック
-    deadline_errors = check_deadline_contradictions(nodes, node_by_id)
-    warnings.extend(deadline_errors)
-
-    return {"valid": len(errors) == 0, "errors": errors, "warnings": warnings}
-
-
-def check_deadline_contradictions(nodes, node_by_id):
-    """親ノードの期限が子ノードより古い場合は警告"""
-    warnings = []
-    for node in nodes:
-        try:
-            parent_date = datetime.strptime(node.get("deadline", ""), "%Y-%m-%d")
-        except:
-            continue
-
-        for dep_id in node.get("depends_on", []):
-            parent_node = node_by_id.get(dep_id)
-            if parent_node:
-                try:
-                    dep_date = datetime.strptime(
-                        parent_node.get("deadline", ""), "%Y-%m-%d"
-                    )
-                    if dep_date > parent_date:
-                        warnings.append(
-                            f"Deadline contradiction: '{dep_id}' (親) has deadline {parent_node['deadline']} "
-                            f"but '{node['id']}' (子) has earlier deadline {node['deadline']}"
-                        )
-                except:
-                    pass
-
-    return warnings
-
-
-def detect_cycles(nodes, node_by_id):
-    errors = []
-    graph = defaultdict(list)
-    for node in nodes:
-        for dep_id in node.get("depends_on", []):
-            graph[dep_id].append(node["id"])
-
-    visited = set()
-    rec_stack = set()
-
-    def has_cycle(node_id, path):
-        visited.add(node_id)
-        rec_stack.add(node_id)
-
-        for neighbor in graph.get(node_id, []):
-            if neighbor not in visited:
-                if has_cycle(neighbor, path + [node_id]):
-                    return True
-            elif neighbor in rec_stack:
-                cycle_path = path + [node_id, neighbor]
-                errors.append(f"Cycle detected: {' -> '.join(cycle_path)}")
-                return True
-
-        rec_stack.remove(node_id)
-        return False
-
-    for node in nodes:
-        if node["id"] not in visited:
-            has_cycle(node["id"], [])
-
-    return errors
-
-
-# ==================== DAG GENERATOR ====================
-
-
-def generate_dag_svg(nodes, section_filter=None):
-    """タイムライン形式でDAGを生成（縦軸=タスク順序、横軸=日付）
-    section_filter: セクション名を指定すると、そのセクションのノードのみを表示
-    """
-    try:
-        from datetime import datetime
-
-        import networkx as nx
-
-        # セクションでフィルタ
-        if section_filter:
-            filtered_nodes = [n for n in nodes if n.get("section") == section_filter]
-        else:
-            filtered_nodes = nodes
-
-        # グラフ構造を作成（依存関係の矢印描画用）
-        G = nx.DiGraph()
-        for node in filtered_nodes:
-            G.add_node(node["id"], label=node["label"])
-        for node in filtered_nodes:
-            for dep_id in node.get("depends_on", []):
-                if any(n["id"] == dep_id for n in filtered_nodes):
-                    G.add_edge(node["id"], dep_id)
-
-        # 日付範囲を取得
-        valid_dates = []
-        for node in filtered_nodes:
-            deadline = node.get("deadline", "")
-            if deadline:
-                try:
-                    valid_dates.append(datetime.strptime(deadline, "%Y-%m-%d"))
-                except:
-                    pass
-
-        if not valid_dates:
-            # 日付がない場合はフォールバック
-            min_date = datetime(2023, 1, 1)
-            max_date = datetime(2023, 12, 31)
-        else:
-            min_date = min(valid_dates)
-            max_date = max(valid_dates)
-
-        date_range = (max_date - min_date).days
-        if date_range == 0:
-            date_range = 1
-
-        # SVG生成
-        width, height = 1200, max(600, len(filtered_nodes) * 50 + 100)
-        margin_left = 100
-        margin_right = 50
-        margin_top = 80
-        margin_bottom = 50
-
-        usable_width = width - margin_left - margin_right
-        usable_height = height - margin_top - margin_bottom
-
-        # タスク位置を計算（縦軸=タスク順序、横軸=日付）
-        normalized_pos = {}
-        task_height = usable_height / max(len(filtered_nodes), 1)
-
-        for i, node in enumerate(filtered_nodes):
-            node_id = node["id"]
-            deadline = node.get("deadline", "")
-
-            # Y座標: タスクの順序（上から下へ）
-            y_pos = margin_top + i * task_height + task_height / 2
-
-            # X座標: 日付に基づく位置
-            if deadline:
-                try:
-                    node_date = datetime.strptime(deadline, "%Y-%m-%d")
-                    days_from_start = (node_date - min_date).days
-                    x_pos = margin_left + (days_from_start / date_range) * usable_width
-                except:
-                    x_pos = margin_left + usable_width / 2
-            else:
-                x_pos = margin_left + usable_width / 2
-
-            normalized_pos[node_id] = (x_pos, y_pos)
-
-            normalized_pos[node_id] = (x_pos, y_pos)
-
-        # SVG開始
-        svg = f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">'
-        svg += '<defs><marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">'
-        svg += '<polygon points="0 0, 10 3.5, 0 7" fill="#666" class="dag-arrow-marker" data-node-id="marker"/></marker></defs>'
-
-        # 背景とグリッド
-        svg += f'<rect width="{width}" height="{height}" fill="#f9f9f9"/>'
-
-        # X軸（日付軸）のラベル
-        svg += '<g class="x-axis">'
-        svg += f'<line x1="{margin_left}" y1="{margin_top - 20}" x2="{width - margin_right}" y2="{margin_top - 20}" stroke="#333" stroke-width="1"/>'
-
-        # 日付ラベルを表示
-        num_labels = min(8, date_range + 1)
-        for i in range(num_labels):
-            date_offset = (date_range * i) / (num_labels - 1) if num_labels > 1 else 0
-            label_date = min_date + pd.Timedelta(days=int(date_offset))
-            x_label = (
-                margin_left + (date_offset / date_range) * usable_width
-                if date_range > 0
-                else margin_left
-            )
-            svg += f'<line x1="{x_label}" y1="{margin_top - 20}" x2="{x_label}" y2="{margin_top - 15}" stroke="#333" stroke-width="1"/>'
-            svg += f'<text x="{x_label}" y="{margin_top - 25}" text-anchor="middle" fill="#333" font-size="10">{label_date.strftime("%Y-%m-%d")}</text>'
-
-        svg += "</g>"
-
-        # Y軸（タスク軸）のラベル
-        svg += '<g class="y-axis">'
-        svg += f'<text x="{margin_left - 10}" y="{margin_top - 30}" text-anchor="end" fill="#333" font-size="12" font-weight="bold">タスク</text>'
-        svg += f'<text x="{width / 2}" y="{margin_top - 45}" text-anchor="middle" fill="#333" font-size="14" font-weight="bold">ワークフローDAG（タイムライン表示）</text>'
-        svg += "</g>"
-
-        # エッジ描画（依存関係の矢印）
-        for edge in G.edges():
-            from_node, to_node = edge
-            if from_node in normalized_pos and to_node in normalized_pos:
-                x1, y1 = normalized_pos[from_node]
-                x2, y2 = normalized_pos[to_node]
-
-                # 矢印がノードの端で終わるように調整
-                dx, dy = x2 - x1, y2 - y1
-                length = (dx**2 + dy**2) ** 0.5
-                if length > 0:
-                    # ノードサイズを考慮した調整
-                    x2 = x2 - (dx / length) * 60
-                    y2 = y2 - (dy / length) * 20
-
-                svg += f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" '
-                svg += 'stroke="#666" stroke-width="2" marker-end="url(#arrowhead)" '
-                svg += f'class="dag-edge" data-from="{from_node}" data-to="{to_node}"/>'
-
-        # ノード描画
-        for node_id, (x, y) in normalized_pos.items():
-            node_data = next((n for n in filtered_nodes if n["id"] == node_id), None)
-            if node_data:
-                label = node_data["label"][:20]
-                deadline = node_data.get("deadline", "")
-
-                svg += f'<g class="dag-node" data-node-id="{node_id}">'
-                svg += f'<rect x="{x - 60}" y="{y - 20}" width="120" height="40" '
-                svg += 'fill="#4ECDC4" stroke="#333" stroke-width="2" rx="5"/>'
-                svg += f'<text x="{x}" y="{y - 5}" text-anchor="middle" fill="#333" font-size="11" font-weight="bold">{node_id}</text>'
-                svg += f'<text x="{x}" y="{y + 10}" text-anchor="middle" fill="#333" font-size="9">{label[:15]}</text>'
-                if deadline:
-                    svg += f'<text x="{x}" y="{y + 35}" text-anchor="middle" fill="#666" font-size="8">{deadline}</text>'
-                svg += "</g>"
-
-        svg += "</svg>"
-        return svg
-    except Exception as e:
-        print(f"DAG SVG generation error: {e}")
-        traceback.print_exc()
-        return None
-
-
-def generate_dag_png(nodes):
-    """Graphviz/networkxを使ったDAG PNG生成"""
-    try:
-        import pygraphviz as pgv
-
-        use_graphviz = True
-    except ImportError:
-        use_graphviz = False
-
-    if use_graphviz:
-        try:
-            G = pgv.AGraph(directed=True)
-            G.graph_attr["rankdir"] = "TB"
-            G.graph_attr["size"] = "12,8"
-            G.graph_attr["ratio"] = "fill"
-
-            for node in nodes:
-                G.add_node(
-                    node["id"],
-                    label=node["label"][:20],
-                    shape="box",
-                    style="filled",
-                    fillcolor="lightblue",
-                )
-
-            for node in nodes:
-                for dep_id in node.get("depends_on", []):
-                    G.add_edge(dep_id, node["id"])
-
-            output_path = BASE_DIR / "static" / "dag.png"
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            G.draw(str(output_path), prog="dot", format="png")
-            return str(output_path)
-        except Exception as e:
-            print(f"Graphviz error: {e}")
-            return None
-    else:
-        # networkx + matplotlib fallback
-        try:
-            import matplotlib.pyplot as plt
-            import networkx as nx
-            from matplotlib.patches import FancyBboxPatch
-
-            G = nx.DiGraph()
-
-            for node in nodes:
-                G.add_node(node["id"], label=node["label"])
-
-            for node in nodes:
-                for dep_id in node.get("depends_on", []):
-                    G.add_edge(dep_id, node["id"])
-
-            pos = nx.spring_layout(G, k=2, iterations=50)
-
-            fig, ax = plt.subplots(1, 1, figsize=(14, 10))
-
-            # ノード描画
-            for node_id, (x, y) in pos.items():
-                label = [n["label"] for n in nodes if n["id"] == node_id][0]
-                bbox = FancyBboxPatch(
-                    (x - 0.08, y - 0.04),
-                    0.16,
-                    0.08,
-                    boxstyle="round,pad=0.01",
-                    edgecolor="black",
-                    facecolor="lightblue",
-                )
-                ax.add_patch(bbox)
-                ax.text(
-                    x, y, node_id, ha="center", va="center", fontsize=9, weight="bold"
-                )
-
-            # エッジ描画
-            nx.draw_networkx_edges(G, pos, ax=ax, arrowsize=20, arrowstyle="->")
-
-            ax.set_xlim(-1.2, 1.2)
-            ax.set_ylim(-1.2, 1.2)
-            ax.axis("off")
-            ax.set_title("Workflow DAG", fontsize=14, weight="bold")
-
-            output_path = BASE_DIR / "static" / "dag.png"
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            plt.tight_layout()
-            plt.savefig(str(output_path), dpi=100, bbox_inches="tight")
-            plt.close()
-            return str(output_path)
-        except Exception as e:
-            print(f"networkx error: {e}")
-            return None
-
-
-def generate_timeline_png(tasks):
-    """matplotlib を使ったタイムライン/ガントチャートPNG生成"""
-    try:
-        import matplotlib.dates as mdates
-        import matplotlib.pyplot as plt
-        from matplotlib.patches import Rectangle
-
-        if not tasks:
-            return None
-
-        df = pd.DataFrame(tasks)
-
-        fig, ax = plt.subplots(figsize=(14, 10))
-
-        sections = df["section"].unique() if "section" in df.columns else ["Default"]
-        colors_list = [
-            "#FF6B6B",
-            "#4ECDC4",
-            "#45B7D1",
-            "#FFA07A",
-            "#98D8C8",
-            "#F7DC6F",
-            "#BB8FCE",
-            "#85C1E2",
-        ]
-        color_map = {
-            s: colors_list[i % len(colors_list)] for i, s in enumerate(sections)
-        }
-
-        y_pos = 0
-        y_labels = []
-        y_ticks = []
-
-        for _, row in df.iterrows():
-            try:
-                start_date = pd.to_datetime(row["start"])
-                end_date = pd.to_datetime(row["end"])
-            except:
-                continue
-
-            duration_days = (end_date - start_date).days + 1
-            section = row.get("section", "Default")
-            task_name = row["task"]
-            color = color_map.get(section, "gray")
-
-            # バー表示（最短1日）
-            rect = Rectangle(
-                (start_date, y_pos - 0.3),
-                max(1, duration_days),
-                0.6,
-                facecolor=color,
-                edgecolor="black",
-                linewidth=1,
-                alpha=0.8,
-            )
-            ax.add_patch(rect)
-
-            y_labels.append(f"{section} - {task_name}")
-            y_ticks.append(y_pos)
-            y_pos += 1
-
-        ax.set_yticks(y_ticks)
-        ax.set_yticklabels(y_labels, fontsize=9)
-        ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
-        ax.xaxis.set_major_locator(mdates.MonthLocator())
-        plt.xticks(rotation=45, ha="right")
-
-        ax.set_xlabel("Date", fontsize=11, weight="bold")
-        ax.set_ylabel("Tasks", fontsize=11, weight="bold")
-        ax.set_title("Project Timeline (Gantt Chart)", fontsize=14, weight="bold")
-        ax.grid(True, axis="x", alpha=0.3)
-
-        ax.set_ylim(-1, y_pos)
-
-        output_path = BASE_DIR / "static" / "timeline.png"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        plt.tight_layout()
-        plt.savefig(str(output_path), dpi=100, bbox_inches="tight")
-        plt.close()
-        return str(output_path)
-    except Exception as e:
-        print(f"Timeline PNG generation error: {e}")
-        traceback.print_exc()
-        return None
-
+from dag_svg import DagLayout, LayeredDagLayout, generate_dag_svg, iter_dag_svg
+from knowledge_index import KnowledgeIndex
+from knowledge_pages import KnowledgePages
+from mermaid_gantt import parse_gantt, serialize_gantt
+from mermaid_svg import MermaidCache
+from ndjson_io import iter_ndjson, iter_node_batches
+from pdf_export import ExportJobs
+from reachability import ReachabilityIndex
+from render_cache import RenderCache, render_key
+from render_queue import RenderQueue
+from renderers import generate_dag_png, generate_timeline_png
+from schedule import compute_schedule
+from timeline_svg import iter_timeline_svg
+from validation import IncrementalValidator
+from workflow_store import VersionConflict, open_workflow_store
 
 # ==================== FLASK APPLICATION ====================
 
@@ -466,21 +53,46 @@ app = Flask(__name__, template_folder="templates", static_folder="static")
 
 BASE_DIR = Path(__file__).parent
 WORKFLOW_JSON = BASE_DIR / "data" / "workflow.json"
+# 保存先（拡張子 .sqlite3 などを指定すると SQLite バックエンドを使う）
+WORKFLOW_DATA = BASE_DIR / os.environ.get("WORKFLOW_DATA", WORKFLOW_JSON)
+WORKFLOW_STORE = open_workflow_store(WORKFLOW_DATA)
+DAG_PNG = BASE_DIR / "static" / "dag.png"
+TIMELINE_PNG = BASE_DIR / "static" / "timeline.png"
+
+# これを超えるノード数の DAG はページに埋め込まず、タイルとして遅延読み込みする
+DAG_INLINE_MAX_NODES = 500
+DAG_TILE_ROWS = 200
+
+# タスク表の1ページの行数（初期表示の HTML はワークフローの大きさによらずこの行数まで）
+TABLE_PAGE_SIZE = 100
+# /api/tasks で一度に返す行数の上限
+TABLE_MAX_PAGE_SIZE = 500
+# 依存先タイプアヘッド検索の候補数
+SEARCH_LIMIT = 20
+
+RENDER_CACHE = RenderCache(BASE_DIR / "static" / "render_cache")
+RENDER_QUEUE = RenderQueue(cache=RENDER_CACHE)
+RENDER_QUEUE.register("dag", generate_dag_png, DAG_PNG)
+RENDER_QUEUE.register("timeline", generate_timeline_png, TIMELINE_PNG)
+WORKFLOW_VALIDATOR = IncrementalValidator()
+# 上流 / 下流の到達可能性（編集間で差分だけ更新）
+REACHABILITY_INDEX = ReachabilityIndex()
+KNOWLEDGE_INDEX = KnowledgeIndex(BASE_DIR, BASE_DIR / "static")
+# Mermaid の図はブロックのソースのハッシュでキャッシュ（ディスクはワーカー間で共有）
+MERMAID_CACHE = MermaidCache(RENDER_CACHE)
+KNOWLEDGE_PAGES = KnowledgePages(BASE_DIR, diagrams=MERMAID_CACHE)
+# knowledge の Markdown → PDF 一括変換（バックグラウンドで1件ずつ）
+PDF_EXPORT_JOBS = ExportJobs(BASE_DIR)
 
 
 def load_workflow():
-    """workflow.json を読み込む"""
-    if WORKFLOW_JSON.exists():
-        with open(WORKFLOW_JSON, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"nodes": []}
+    """workflow を読み込む（ストアのパース済みスナップショットから）"""
+    return WORKFLOW_STORE.snapshot().as_workflow()
 
 
-def save_workflow(workflow):
-    """workflow.json に保存"""
-    WORKFLOW_JSON.parent.mkdir(parents=True, exist_ok=True)
-    with open(WORKFLOW_JSON, "w", encoding="utf-8") as f:
-        json.dump(workflow, f, ensure_ascii=False, indent=2)
+def save_workflow(workflow, base_version=None):
+    """workflow をストアに保存（base_version が古ければ VersionConflict）"""
+    WORKFLOW_STORE.save(workflow, base_version)
 
 
 def load_tasks_from_nodes(nodes):
@@ -506,51 +118,46 @@ def load_tasks_from_nodes(nodes):
     return tasks
 
 
+def tasks_from_gantt(gantt_tasks):
+    """Mermaid gantt の解析結果をタスク形式（load_tasks_from_nodes と同じキー）に変換"""
+    return [
+        {
+            "id": t["id"],
+            "section": t["section"],
+            "task": t["task"],
+            "start": t["start"],
+            "end": t["end"],
+            "next_to": t["depends_on"][0] if t["depends_on"] else "",
+            "next_to_list": t["depends_on"],
+            "doc": "",
+            "action": "",
+            "lesson": "",
+            "qms_path": "",
+            "knowledge_dir": "",
+            "decision": False,
+        }
+        for t in gantt_tasks
+    ]
+
+
 def build_knowledge_file_links(knowledge_dir_value):
-    if not knowledge_dir_value:
-        return []
+    """knowledge_dir 配下のファイルリンク一覧（KNOWLEDGE_INDEX にキャッシュ）"""
+    return KNOWLEDGE_INDEX.links(knowledge_dir_value)
 
-    knowledge_dir = Path(knowledge_dir_value)
-    if not knowledge_dir.is_absolute():
-        knowledge_dir = BASE_DIR / knowledge_dir
 
-    try:
-        knowledge_dir = knowledge_dir.resolve()
-    except Exception:
-        return []
+def _node_patch(old, new):
+    """old を new で置き換える merge patch（変わっていないキーは含めない）"""
+    patch = {key: value for key, value in new.items() if old.get(key) != value}
+    patch.update({key: None for key in old if key not in new})
+    return patch
 
-    static_root = (BASE_DIR / "static").resolve()
-    try:
-        common_root = os.path.commonpath([str(static_root), str(knowledge_dir)])
-    except ValueError:
-        return []
-
-    if common_root != str(static_root):
-        return []
-
-    if not knowledge_dir.exists() or not knowledge_dir.is_dir():
-        return []
-
-    links = []
-    for path in sorted(knowledge_dir.rglob("*")):
-        if not path.is_file():
-            continue
-        try:
-            rel_to_static = path.resolve().relative_to(static_root).as_posix()
-            rel_to_knowledge = path.resolve().relative_to(knowledge_dir).as_posix()
-        except Exception:
-            continue
-        links.append(
-            {
-                "label": rel_to_knowledge,
-                "url": f"/static/{rel_to_static}",
-            }
-        )
-    return links
 
+def save_nodes_from_tasks(tasks, base_version=None):
+    """タスクをノード形式に変換して保存
 
-def save_nodes_from_tasks(tasks):
-    """タスクをノード形式に変換して保存"""
+    送信された行（表示中のページ）のノードだけを置き換え、他のノードはそのまま残す。
+    既存ノードの更新は変更のあったキーだけのパッチとして適用する。
+    """
     nodes = []
     for task in tasks:
         depends_on_list = [dep for dep in task.get("next_to_list", []) if dep]
@@ -572,72 +179,190 @@ def save_nodes_from_tasks(tasks):
         }
         nodes.append(node)
 
-    workflow = {"nodes": nodes}
-    save_workflow(workflow)
+    existing = {node["id"]: WORKFLOW_STORE.get_node(node["id"]) for node in nodes}
+    if all(old is not None for old in existing.values()):
+        patches = {}
+        for node in nodes:
+            patch = _node_patch(existing[node["id"]], node)
+            if patch:
+                patches[node["id"]] = patch
+        WORKFLOW_STORE.apply_patch(patches, base_version)
+        return
+
+    # 新しい id を含む場合は全体を保存（未知の id は末尾に追加）
+    posted = {node["id"]: node for node in nodes}
+    workflow = WORKFLOW_STORE.snapshot().as_workflow()
+    workflow["nodes"] = [posted.pop(n["id"], n) for n in workflow["nodes"]]
+    workflow["nodes"].extend(posted.values())
+    save_workflow(workflow, base_version)
+
+
+def snapshot_render_key(snapshot, kind, section_filter=None, fmt="png"):
+    """スナップショットごとにメモ化したレンダーキャッシュのキー"""
+    return snapshot.derive(
+        ("render_key", kind, section_filter, fmt),
+        lambda s: render_key(kind, s.nodes, section_filter, fmt),
+    )
+
+
+def cached_dag_svg(snapshot, section_filter=None):
+    """DAG SVG をレンダーキャッシュ経由で取得（無ければ生成して保存）"""
+    key = snapshot_render_key(snapshot, "dag", section_filter, "svg")
+    svg = RENDER_CACHE.get_text(key, ".svg")
+    if svg is None:
+        svg = generate_dag_svg(
+            list(snapshot.nodes), section_filter, snapshot_schedule(snapshot)
+        )
+        if svg is not None:
+            RENDER_CACHE.put(key, ".svg", svg)
+    return svg
+
+
+def snapshot_dag_layout(snapshot, section_filter=None):
+    """スナップショットごとにメモ化した DAG レイアウト（タイル配信用）"""
+    return snapshot.derive(
+        ("dag_layout", section_filter),
+        lambda s: DagLayout(list(s.nodes), section_filter, snapshot_schedule(s)),
+    )
+
+
+def snapshot_reachability(snapshot):
+    """スナップショットに対する到達可能性の問い合わせ口（共有インデックスは前回から差分だけ更新）
+
+    共有インデックスが後のスナップショットで更新された後でも、返したビューは
+    このスナップショットのグラフで答える。
+    """
+    return snapshot.derive(
+        "reachability", lambda s: REACHABILITY_INDEX.update(s.nodes)
+    )
+
+
+def snapshot_schedule(snapshot):
+    """スナップショットごとにメモ化したクリティカルパス / 余裕日数"""
+    return snapshot.derive("schedule", lambda s: compute_schedule(s.nodes))
+
+
+def snapshot_validation(snapshot):
+    """スナップショットの検証結果（前回の検証状態から差分だけ再評価）"""
+    return snapshot.derive("validation", lambda s: WORKFLOW_VALIDATOR.update(s.nodes))
 
 
-def regenerate_images():
-    """DAGとタイムラインPNGを再生成"""
-    workflow = load_workflow()
-    nodes = workflow.get("nodes", [])
+def regenerate_images(wait=False):
+    """DAGとタイムラインPNGの再生成をレンダーキューに投入
+
+    描画内容が変わっていなければキャッシュから即座に公開される。
+    wait=True の場合は生成完了まで待つ（起動時用）
+    """
+    snapshot = WORKFLOW_STORE.snapshot()
+    nodes = list(snapshot.nodes)
     tasks = load_tasks_from_nodes(nodes)
+    # 全ワーカー共通の世代番号。古い世代の画像で新しい画像を上書きしない
+    version = snapshot.stamp[1]
+
+    RENDER_QUEUE.submit(
+        "dag", nodes, key=snapshot_render_key(snapshot, "dag"), version=version
+    )
+    RENDER_QUEUE.submit(
+        "timeline",
+        tasks,
+        key=snapshot_render_key(snapshot, "timeline"),
+        version=version,
+    )
+    if wait:
+        RENDER_QUEUE.wait()
+
 
-    generate_dag_png(nodes)
-    generate_timeline_png(tasks)
+def warm_caches(wait=False):
+    """起動直後にレンダーキャッシュ・DAG SVG・検証結果を温める
+
+    既定ではバックグラウンドスレッドから呼び、リクエストの受付を待たせない。
+    """
+    snapshot = WORKFLOW_STORE.snapshot()
+    regenerate_images(wait=wait)
+    if len(snapshot.nodes) <= DAG_INLINE_MAX_NODES:
+        cached_dag_svg(snapshot)
+    snapshot_validation(snapshot)
+    snapshot_reachability(snapshot)
+    snapshot_schedule(snapshot)
+
+
+def task_rows(nodes):
+    """タスク表の行（knowledge_files 付き）"""
+    tasks = load_tasks_from_nodes(nodes)
+    for task in tasks:
+        task["knowledge_files"] = build_knowledge_file_links(
+            task.get("knowledge_dir", "")
+        )
+    return tasks
 
 
 @app.route("/")
 def index():
-    """メイン画面"""
-    workflow = load_workflow()
-    nodes = workflow.get("nodes", [])
-    tasks = load_tasks_from_nodes(nodes)
+    """メイン画面（タスク表は TABLE_PAGE_SIZE 行ずつのページ表示）"""
+    snapshot = WORKFLOW_STORE.snapshot()
 
     # セクション一覧を抽出
-    all_sections = sorted(
-        list(set(t.get("section", "") for t in tasks if t.get("section")))
-    )
+    all_sections = WORKFLOW_STORE.sections()
 
     # セクションフィルタを取得
     selected_section = request.args.get("section", "")
+    section_filter = (
+        selected_section if selected_section and selected_section != "all" else None
+    )
 
-    # フィルタリング
-    if selected_section and selected_section != "all":
-        filtered_tasks = [t for t in tasks if t.get("section") == selected_section]
-    else:
-        filtered_tasks = tasks
+    # 表示するページの行だけを取得（ストアのインデックスで引く）
+    page = max(request.args.get("page", 1, type=int), 1)
+    page_nodes, total_rows = WORKFLOW_STORE.nodes_page(
+        (page - 1) * TABLE_PAGE_SIZE, TABLE_PAGE_SIZE, section_filter
+    )
+    page_count = max(-(-total_rows // TABLE_PAGE_SIZE), 1)
+    if page > page_count:
+        page = page_count
+        page_nodes, total_rows = WORKFLOW_STORE.nodes_page(
+            (page - 1) * TABLE_PAGE_SIZE, TABLE_PAGE_SIZE, section_filter
+        )
+    filtered_tasks = task_rows(page_nodes)
 
-    # 全タスクにknowledge_filesを付与
+    # 依存先の表示名（ドロップダウンには選択済みの依存先だけを描画する）
+    dep_labels = {}
     for task in filtered_tasks:
-        task["knowledge_files"] = build_knowledge_file_links(
-            task.get("knowledge_dir", "")
-        )
+        for dep_id in task["next_to_list"]:
+            if dep_id not in dep_labels:
+                dep_node = WORKFLOW_STORE.get_node(dep_id)
+                dep_labels[dep_id] = dep_node.get("label", "") if dep_node else ""
 
     # Mermaidコード生成
-    lines = ["gantt", "    dateFormat YYYY-MM-DD", "    title Gantt Chart"]
-    curr_sec = None
-    for t in filtered_tasks:
-        if t["section"] != curr_sec:
-            curr_sec = t["section"]
-            lines.append(f"    section {curr_sec}")
-        lines.append(f"    {t['task']} : {t['id']}, {t['start']}, {t['end']}")
-    mermaid_code = "\n".join(lines)
+    mermaid_code = serialize_gantt(
+        dict(t, depends_on=t["next_to_list"]) for t in filtered_tasks
+    )
 
     # DAG SVG生成（セクションでフィルタ）
-    section_filter = (
-        selected_section if selected_section and selected_section != "all" else None
-    )
-    dag_svg = generate_dag_svg(nodes, section_filter)
+    if section_filter:
+        dag_node_count = total_rows
+    else:
+        dag_node_count = len(snapshot.nodes)
+    dag_tiled = dag_node_count > DAG_INLINE_MAX_NODES
+    dag_svg = None if dag_tiled else cached_dag_svg(snapshot, section_filter)
+    schedule = snapshot_schedule(snapshot)
 
     return render_template(
         "index.html",
         tasks=filtered_tasks,
-        all_tasks=tasks,
-        nodes=nodes,
+        dep_labels=dep_labels,
+        page=page,
+        page_count=page_count,
+        page_start=(page - 1) * TABLE_PAGE_SIZE,
+        total_rows=total_rows,
         mermaid_code=mermaid_code,
+        mermaid_svg=MERMAID_CACHE.svg(mermaid_code),
         all_sections=all_sections,
         selected_section=selected_section,
         dag_svg=dag_svg,
+        dag_tiled=dag_tiled,
+        critical_path=schedule.critical_path,
+        min_slack=schedule.min_slack,
+        section_filter=section_filter or "",
+        workflow_version=snapshot.version,
     )
 
 
@@ -648,9 +373,6 @@ def update():
         # フォームデータを取得
         tasks = []
 
-        workflow = load_workflow()
-        nodes = workflow.get("nodes", [])
-
         # フォームの各タスク行を処理
         i = 0
         while f"id_{i}" in request.form:
@@ -673,108 +395,393 @@ def update():
             tasks.append(task)
             i += 1
 
+        # 編集の基にした version（古いフォームからの送信は 409 で拒否）
+        base_version = request.form.get("base_version", "")
+        base_version = int(base_version) if base_version else None
+
         if tasks:
-            save_nodes_from_tasks(tasks)
+            save_nodes_from_tasks(tasks, base_version)
+            snapshot_validation(WORKFLOW_STORE.snapshot())
+            snapshot_reachability(WORKFLOW_STORE.snapshot())
 
-        # PNGを再生成
+        # PNGを再生成（バックグラウンド）
         regenerate_images()
 
-        return redirect(url_for("index"))
+        # 編集していたセクション・ページに戻る
+        return redirect(
+            url_for(
+                "index",
+                section=request.form.get("section_filter") or None,
+                page=request.form.get("page", type=int),
+            )
+        )
+    except VersionConflict as e:
+        return f"Error: {str(e)}", 409
     except Exception as e:
         return f"Error: {str(e)}", 400
 
 
+def _apply_node_patches(patches):
+    """パッチを適用して JSON レスポンスを返す（404: 未知の id / 400: 不正なパッチ）"""
+    try:
+        updated = WORKFLOW_STORE.apply_patch(patches)
+        snapshot_validation(WORKFLOW_STORE.snapshot())
+        snapshot_reachability(WORKFLOW_STORE.snapshot())
+        return updated, None
+    except KeyError as e:
+        return None, (jsonify({"error": f"Node not found: {e.args[0]}"}), 404)
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+
+
+@app.route("/api/tasks")
+def api_tasks():
+    """タスク表の行範囲（offset / limit / section）。総数と合わせて返す"""
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    limit = request.args.get("limit", TABLE_PAGE_SIZE, type=int)
+    limit = min(max(limit, 0), TABLE_MAX_PAGE_SIZE)
+    section = request.args.get("section") or None
+    nodes, total = WORKFLOW_STORE.nodes_page(offset, limit, section)
+    return jsonify(
+        {"offset": offset, "limit": limit, "total": total, "tasks": task_rows(nodes)}
+    )
+
+
+@app.route("/api/tasks/search")
+def api_tasks_search():
+    """依存先ピッカー用のタイプアヘッド検索（id / タスク名の部分一致）"""
+    query = request.args.get("q", "")
+    limit = min(max(request.args.get("limit", SEARCH_LIMIT, type=int), 1), 100)
+    exclude = request.args.get("exclude", "")
+    nodes = WORKFLOW_STORE.search_nodes(query, limit + 1)
+    results = [
+        {
+            "id": node["id"],
+            "task": node.get("label", ""),
+            "section": node.get("section", ""),
+        }
+        for node in nodes
+        if node["id"] != exclude
+    ]
+    return jsonify({"query": query, "results": results[:limit]})
+
+
+@app.route("/api/nodes/<node_id>", methods=["GET"])
+def get_node(node_id):
+    """単一ノードの取得"""
+    node = WORKFLOW_STORE.get_node(node_id)
+    if node is None:
+        return jsonify({"error": f"Node not found: {node_id}"}), 404
+    return jsonify(node)
+
+
+@app.route("/api/nodes/<node_id>/dependents")
+def node_dependents(node_id):
+    """node_id に直接依存しているノードの id 一覧"""
+    if WORKFLOW_STORE.get_node(node_id) is None:
+        return jsonify({"error": f"Node not found: {node_id}"}), 404
+    return jsonify({"id": node_id, "dependents": WORKFLOW_STORE.dependents(node_id)})
+
+
+@app.route("/api/nodes/<node_id>/impact")
+def node_impact(node_id):
+    """node_id の上流（推移的な依存先）と下流（推移的に依存しているノード）"""
+    snapshot = WORKFLOW_STORE.snapshot()
+    impact = snapshot_reachability(snapshot).impact(node_id)
+    if impact is None:
+        return jsonify({"error": f"Node not found: {node_id}"}), 404
+    return jsonify(dict(impact, id=node_id, version=snapshot.version))
+
+
+@app.route("/api/schedule")
+def api_schedule():
+    """全ノードの最早・最遅日程、余裕日数（日）とクリティカルパス"""
+    snapshot = WORKFLOW_STORE.snapshot()
+    return jsonify(
+        dict(snapshot_schedule(snapshot).as_dict(), version=snapshot.version)
+    )
+
+
+@app.route("/api/nodes/<node_id>/schedule")
+def node_schedule(node_id):
+    """1ノードの最早・最遅日程と余裕日数（サイクル上のノードは null）"""
+    if WORKFLOW_STORE.get_node(node_id) is None:
+        return jsonify({"error": f"Node not found: {node_id}"}), 404
+    snapshot = WORKFLOW_STORE.snapshot()
+    entry = snapshot_schedule(snapshot).as_dict()["nodes"].get(node_id)
+    return jsonify({"id": node_id, "schedule": entry, "version": snapshot.version})
+
+
+@app.route("/api/nodes/<node_id>", methods=["PATCH"])
+def patch_node(node_id):
+    """単一ノードの部分更新（JSON Merge Patch）"""
+    patch = request.get_json(silent=True)
+    if not isinstance(patch, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+
+    updated, error = _apply_node_patches({node_id: patch})
+    if error:
+        return error
+    regenerate_images()
+    return jsonify(updated[0])
+
+
+@app.route("/api/nodes", methods=["PATCH"])
+def patch_nodes():
+    """複数ノードの部分更新（{"<id>": merge patch, ...}）"""
+    patches = request.get_json(silent=True)
+    if not isinstance(patches, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+
+    updated, error = _apply_node_patches(patches)
+    if error:
+        return error
+    regenerate_images()
+    return jsonify({"nodes": updated})
+
+
+@app.route("/api/parse-mermaid", methods=["POST"])
+def parse_mermaid():
+    """Mermaid gantt コードをタスク形式に変換（{"code": "..."} → {"parsed": [...]}）"""
+    payload = request.get_json(silent=True)
+    code = payload.get("code") if isinstance(payload, dict) else None
+    if not isinstance(code, str):
+        return (
+            jsonify({"error": "Request body must be a JSON object with a 'code' string"}),
+            400,
+        )
+    return jsonify({"parsed": tasks_from_gantt(parse_gantt(code))})
+
+
+@app.route("/api/import", methods=["POST"])
+def import_nodes():
+    """NDJSON（1行 = 1ノード）で workflow 全体を置き換える
+
+    本文は行ごとに読み、検証しながら IMPORT_BATCH_SIZE 件ずつストアへ書き込む。
+    不正な行があれば何も変更せず 400（行番号付き）、?base_version= が古ければ 409。
+    """
+    base_version = request.args.get("base_version", type=int)
+    try:
+        count, version = WORKFLOW_STORE.import_nodes(
+            iter_node_batches(request.stream), base_version
+        )
+    except VersionConflict as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    regenerate_images()
+    return jsonify({"imported": count, "version": version})
+
+
+@app.route("/api/export")
+def export_nodes():
+    """全ノードを NDJSON（1行 = 1ノード）でストリーミング出力"""
+    return Response(
+        iter_ndjson(WORKFLOW_STORE.iter_nodes()),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=workflow.ndjson"},
+    )
+
+
 @app.route("/validate", methods=["GET", "POST"])
 def validate():
     """検証結果表示"""
-    workflow = load_workflow()
-    nodes = workflow.get("nodes", [])
-    validation_result = validate_workflow(nodes)
+    snapshot = WORKFLOW_STORE.snapshot()
+    nodes = list(snapshot.nodes)
+    validation_result = snapshot_validation(snapshot)
 
     return render_template("validate.html", result=validation_result, nodes=nodes)
 
 
+def _send_rendered(name, path):
+    """現在の内容の画像をキャッシュから配信（無ければ最後に成功した画像）
+
+    ETag / 世代ヘッダ付き。見つからなければ None
+    """
+    generation, etag = RENDER_QUEUE.current(name)
+    key = snapshot_render_key(WORKFLOW_STORE.snapshot(), name)
+    data = RENDER_CACHE.get(key, ".png")
+    if data is not None:
+        response = send_file(io.BytesIO(data), mimetype="image/png", etag=key[:16])
+    elif path.exists():
+        response = send_file(str(path), mimetype="image/png", etag=etag or True)
+    else:
+        return None
+    response.headers["X-Render-Generation"] = str(generation)
+    return response
+
+
 @app.route("/dag.png")
 def dag_png():
     """DAG PNG ファイル配信"""
-    dag_file = BASE_DIR / "static" / "dag.png"
-    if dag_file.exists():
-        return send_file(str(dag_file), mimetype="image/png")
-    return "DAG not generated yet", 404
+    return _send_rendered("dag", DAG_PNG) or ("DAG not generated yet", 404)
 
 
 @app.route("/timeline.png")
 def timeline_png():
     """Timeline PNG ファイル配信"""
-    timeline_file = BASE_DIR / "static" / "timeline.png"
-    if timeline_file.exists():
-        return send_file(str(timeline_file), mimetype="image/png")
-    return "Timeline not generated yet", 404
+    return _send_rendered("timeline", TIMELINE_PNG) or (
+        "Timeline not generated yet",
+        404,
+    )
 
 
-@app.route("/knowledge/<node_id>")
-def knowledge(node_id):
-    """ナレッジビュー（Markdown → HTML）"""
-    workflow = load_workflow()
-    nodes = workflow.get("nodes", [])
-    node = next((n for n in nodes if n["id"] == node_id), None)
+@app.route("/timeline.svg")
+def timeline_svg():
+    """ガントチャート SVG をストリーミング配信（?section=&from=&to=）"""
+    section = request.args.get("section", "")
+    section_filter = section if section and section != "all" else None
+    snapshot = WORKFLOW_STORE.snapshot()
+    tasks = load_tasks_from_nodes(snapshot.nodes)
+    try:
+        chunks = iter_timeline_svg(
+            tasks,
+            section_filter,
+            request.args.get("from"),
+            request.args.get("to"),
+            snapshot_schedule(snapshot),
+        )
+    except Exception as e:
+        return f"Error: {str(e)}", 400
+    return Response(chunks, mimetype="image/svg+xml")
+
+
+@app.route("/dag.svg")
+def dag_svg():
+    """DAG SVG をストリーミング配信（?section=<name> でフィルタ、?layout=layered で階層表示）"""
+    section = request.args.get("section", "")
+    section_filter = section if section and section != "all" else None
+    layered = request.args.get("layout") == "layered"
+    snapshot = WORKFLOW_STORE.snapshot()
+
+    kind = "dag-layered" if layered else "dag"
+    key = snapshot_render_key(snapshot, kind, section_filter, "svg")
+    cached = RENDER_CACHE.get(key, ".svg")
+    if cached is not None:
+        return Response(cached, mimetype="image/svg+xml")
+    try:
+        nodes = list(snapshot.nodes)
+        schedule = snapshot_schedule(snapshot)
+        layout = LayeredDagLayout(nodes, section_filter, schedule) if layered else None
+        chunks = iter_dag_svg(nodes, section_filter, layout, schedule)
+    except Exception as e:
+        return f"Error: {str(e)}", 400
+    return Response(chunks, mimetype="image/svg+xml")
+
+
+def _dag_request_layout():
+    section = request.args.get("section", "")
+    section_filter = section if section and section != "all" else None
+    return snapshot_dag_layout(WORKFLOW_STORE.snapshot(), section_filter)
+
+
+@app.route("/api/dag/tiles")
+def dag_tiles():
+    """DAG タイルの分割情報（?section=<name>）"""
+    layout = _dag_request_layout()
+    tiles = []
+    for row_start in range(0, max(layout.row_count, 1), DAG_TILE_ROWS):
+        row_end = min(row_start + DAG_TILE_ROWS, layout.row_count)
+        top = layout.row_top(row_start)
+        bottom = layout.row_top(row_end) if row_end < layout.row_count else layout.height
+        tiles.append({"rows": f"{row_start}:{row_end}", "top": top, "height": bottom - top})
+    return jsonify(
+        {
+            "width": layout.width,
+            "height": layout.height,
+            "row_count": layout.row_count,
+            "row_height": layout.task_height,
+            "min_date": layout.min_date.strftime("%Y-%m-%d"),
+            "max_date": layout.max_date.strftime("%Y-%m-%d"),
+            "tiles": tiles,
+        }
+    )
 
-    if not node:
-        return "Node not found", 404
 
-    # knowledge_dir を確認して markdown ファイルを探す
-    knowledge_dir = Path(node.get("knowledge_dir", ""))
-    md_content = ""
+@app.route("/dag/tile.svg")
+def dag_tile_svg():
+    """行範囲（?rows=<start>:<end>）と日付範囲（?from=&to=）に交差する部分の DAG SVG"""
+    try:
+        row_start, row_end = (int(v) for v in request.args.get("rows", "").split(":"))
+    except ValueError:
+        return "Error: rows must be <start>:<end>", 400
+    layout = _dag_request_layout()
+    chunks = layout.iter_tile(
+        row_start, row_end, request.args.get("from"), request.args.get("to")
+    )
+    return Response(chunks, mimetype="image/svg+xml")
+
 
-    # 相対パスを絶対パスに変換
-    if not knowledge_dir.is_absolute():
-        knowledge_dir = BASE_DIR / knowledge_dir
+@app.route("/dag/lod.svg")
+def dag_lod_svg():
+    """セクションごとに集約した DAG 概観（?from=&to= で日付範囲を指定可）"""
+    layout = _dag_request_layout()
+    chunks = layout.iter_lod_svg(request.args.get("from"), request.args.get("to"))
+    return Response(chunks, mimetype="image/svg+xml")
+
+
+@app.route("/api/render-status")
+def render_status():
+    """DAG / タイムライン画像の生成状況（fresh = 最新の要求まで反映済み）"""
+    return jsonify(RENDER_QUEUE.status())
 
-    try:
-        if knowledge_dir.exists() and knowledge_dir.is_dir():
-            # ディレクトリ内の .md ファイルを探す
-            md_files = list(knowledge_dir.glob("*.md"))
-            if md_files:
-                with open(md_files[0], "r", encoding="utf-8") as f:
-                    md_content = f.read()
-            else:
-                print(f"No .md files found in {knowledge_dir}")
-        else:
-            print(f"Knowledge directory not found: {knowledge_dir}")
-    except Exception as e:
-        print(f"Error reading knowledge directory {knowledge_dir}: {e}")
 
-    html_content = (
-        markdown.markdown(md_content)
-        if md_content
-        else f"<p>No knowledge found for {node_id}</p>"
+@app.route("/api/knowledge/export-pdf", methods=["POST"])
+def export_knowledge_pdf():
+    """全ノードの knowledge_dir 配下の Markdown を PDF に一括変換（管理用、?force=1 で全件再出力）
+
+    変換はバックグラウンドで行い、すぐに 202 を返す。進み具合は
+    /api/knowledge/export-pdf/status で確認する。実行中なら新しい変換は始めない。
+    """
+    status, _ = PDF_EXPORT_JOBS.start(
+        WORKFLOW_STORE.snapshot().nodes,
+        force=request.args.get("force") in ("1", "true"),
+    )
+    return (
+        jsonify(status),
+        202,
+        {"Location": url_for("export_knowledge_pdf_status")},
     )
 
-    if md_content:
-        knowledge_dir_str = node.get("knowledge_dir", "").replace("\\", "/").strip("/")
-        if knowledge_dir_str:
-            base_url = f"/{knowledge_dir_str}/"
-
-            def _rewrite_link(match):
-                prefix, url, suffix = match.group(1), match.group(2), match.group(3)
-                if url.startswith(("http://", "https://", "/", "#", "mailto:", "tel:")):
-                    return match.group(0)
-                if url.startswith("./"):
-                    url = url[2:]
-                return f"{prefix}{base_url}{url}{suffix}"
-
-            html_content = re.sub(
-                r'((?:src|href)=["\'])([^"\']+)(["\'])',
-                _rewrite_link,
-                html_content,
-            )
 
-    return render_template(
-        "knowledge.html",
-        node_id=node_id,
-        node_label=node["label"],
-        content=html_content,
+@app.route("/api/knowledge/export-pdf/status")
+def export_knowledge_pdf_status():
+    """最後に開始した PDF 一括変換の状態（running / done / failed / error と集計結果）"""
+    return jsonify(PDF_EXPORT_JOBS.status())
+
+
+@app.route("/knowledge/<node_id>")
+def knowledge(node_id):
+    """ナレッジビュー（Markdown → HTML）"""
+    node = WORKFLOW_STORE.get_node(node_id)
+
+    if not node:
+        return "Node not found", 404
+
+    # コンパイル済みの HTML（リンク書き換え済み）をキャッシュから取得
+    html_content, content_etag = KNOWLEDGE_PAGES.render(node.get("knowledge_dir", ""))
+    if html_content is None:
+        html_content = f"<p>No knowledge found for {node_id}</p>"
+
+    etag = hashlib.sha1(
+        f"{content_etag}\0{node_id}\0{node['label']}".encode("utf-8")
+    ).hexdigest()[:16]
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = make_response(
+        render_template(
+            "knowledge.html",
+            node_id=node_id,
+            node_label=node["label"],
+            content=html_content,
+        )
     )
+    response.set_etag(etag)
+    return response
 
 
 @app.route("/static/<path:filename>")
@@ -784,9 +791,17 @@ def static_file(filename):
 
 
 if __name__ == "__main__":
-    # 起動時にPNG生成
-    print("Generating DAG and Timeline images on startup...")
-    regenerate_images()
-    print("Images generated successfully.")
+    use_reloader = True
+    # リローダーは監視用の親プロセスでもここを通るため（--wait-render の場合も）、
+    # 実際にリクエストを処理するプロセスでだけキャッシュを温める
+    serving = not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+    if serving:
+        if "--wait-render" in sys.argv:
+            # 従来どおり画像生成の完了を待ってから受付を始める
+            print("Generating DAG and Timeline images on startup...")
+            warm_caches(wait=True)
+            print("Images generated successfully.")
+        else:
+            threading.Thread(target=warm_caches, daemon=True).start()
 
-    app.run(debug=True, host="127.0.0.1", port=5000)
+    app.run(debug=True, use_reloader=use_reloader, host="127.0.0.1", port=5000)
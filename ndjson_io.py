@@ -0,0 +1,74 @@
+"""
+NDJSON I/O - workflow ノードの一括インポート / エクスポート（1行 = 1ノード）
+
+- インポートは行を逐次読み、1行ずつ検証して batch_size 件ごとにストアへ渡す
+  （リクエスト全体やノード全件をメモリに載せない）
+- 検証は行単位で、エラーには行番号を付ける（id の重複検出のため id の集合だけは保持する）
+- エクスポートはストアのノード列を1行ずつ直列化し、まとめたチャンクで返すジェネレータ
+"""
+
+import json
+
+from dag_svg import _chunked
+from workflow_store import node_field_error
+
+# ストアに一度に渡すノード数
+IMPORT_BATCH_SIZE = 1000
+# レスポンスの1チャンクにまとめる行数
+EXPORT_CHUNK_LINES = 500
+
+
+class NdjsonError(ValueError):
+    """NDJSON の行が不正（メッセージに行番号を含む）"""
+
+    def __init__(self, line_no, message):
+        super().__init__(f"Line {line_no}: {message}")
+        self.line_no = line_no
+
+
+def validate_node(node, seen_ids):
+    """1ノードを検証し、問題があればメッセージを返す（無ければ None）"""
+    if not isinstance(node, dict):
+        return "Each line must be a JSON object"
+    node_id = node.get("id")
+    if not isinstance(node_id, str) or not node_id:
+        return "'id' must be a non-empty string"
+    if node_id in seen_ids:
+        return f"Duplicate node id: {node_id}"
+    error = node_field_error(node)
+    if error:
+        return f"{error} ({node_id})"
+    return None
+
+
+def iter_node_batches(lines, batch_size=IMPORT_BATCH_SIZE):
+    """NDJSON の行（bytes / str）を検証済みノードのバッチ（list）にして返す
+
+    空行は読み飛ばす。不正な行があれば NdjsonError を送出する。
+    """
+    seen_ids = set()
+    batch = []
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            node = json.loads(line)
+        except ValueError as e:
+            raise NdjsonError(line_no, f"Invalid JSON: {e}") from None
+        error = validate_node(node, seen_ids)
+        if error:
+            raise NdjsonError(line_no, error)
+        seen_ids.add(node["id"])
+        batch.append(node)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_ndjson(nodes, chunk_lines=EXPORT_CHUNK_LINES):
+    """ノード列を NDJSON のチャンク（str）にして返す"""
+    return _chunked(
+        (json.dumps(node, ensure_ascii=False) + "\n" for node in nodes), chunk_lines
+    )
@@ -0,0 +1,637 @@
+"""
+PDF Export - knowledge_dir 配下の Markdown（Marp / Mermaid を含む）を PDF に一括変換
+
+    uv run pdf_export.py                          # 全ノードの knowledge_dir
+    uv run pdf_export.py --force                  # ソースが変わっていなくても再出力
+    uv run pdf_export.py --dir another_marp_markdown2pdf --workers 4
+
+- 各ノードの knowledge_dir（static/ 配下に解決できるものだけ、重複は1回）を再帰的に走査し、
+  *.md を同じ場所の *.pdf に出力する（ナレッジのファイル一覧にそのまま並ぶ）
+- 変換はプロセスプール（spawn）で並列に行う。変換が1件だけなら自プロセスで行う
+- マニフェスト（static/pdf_manifest.json）にソースの SHA-256 を記録し、
+  ハッシュが変わらず PDF も残っているファイルは変換しない
+- PDF は reportlab（platypus）で組版する。見出し・段落・箇条書き（チェックボックス）・引用・
+  コードブロック・表・改ページ（Marp のスライド区切り、page-break の div）に対応し、
+  Mermaid のブロックはソースをそのまま枠付きで載せる
+- 日本語は reportlab 組み込みの CID フォント（HeiseiKakuGo-W5）を使う（フォントファイル不要）
+- Web からは ExportJobs でバックグラウンドスレッドに渡す（リクエストは待たない）。
+  状態は static/pdf_export_status.json に書くので、どのワーカーからでも参照できる
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import threading
+import traceback
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from html import escape
+from pathlib import Path
+
+from file_lock import FileLock
+from workflow_store import _write_json
+
+BASE_DIR = Path(__file__).parent
+MANIFEST_PATH = BASE_DIR / "static" / "pdf_manifest.json"
+
+# 組版の出力が変わる変更を入れたら上げる（マニフェストのハッシュが一致しなくなる）
+EXPORTER_VERSION = 1
+
+# 並列変換のワーカー数の既定値
+DEFAULT_WORKERS = 4
+
+FONT_NAME = "HeiseiKakuGo-W5"
+
+# コードブロック1行の最大幅（半角換算）。超える行は折り返す
+CODE_COLUMNS = 100
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_RE = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+_CHECKBOX_RE = re.compile(r"^\[([ xX])\]\s+")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)\s*([\w-]*)")
+_RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+_MERMAID_DIV_RE = re.compile(r'^\s*<div\s+class="mermaid"\s*>\s*$')
+_PAGE_BREAK_RE = re.compile(r"page-break-(before|after)\s*:\s*always")
+_HTML_LINE_RE = re.compile(r"^\s*</?[a-zA-Z][^>]*>\s*$")
+
+_INLINE_RE = re.compile(
+    r"`(?P<code>[^`]+)`"
+    r"|!\[(?P<alt>[^\]]*)\]\([^)]*\)"
+    r"|\[(?P<text>[^\]]+)\]\((?P<href>[^)\s]+)[^)]*\)"
+    r"|\*\*(?P<bold>.+?)\*\*"
+    r"|__(?P<bold2>.+?)__"
+    r"|\*(?P<italic>[^*]+)\*"
+)
+
+
+# ==================== Markdown → reportlab ====================
+
+
+def _inline(text):
+    """インライン記法を reportlab の Paragraph マークアップに変換"""
+    parts = []
+    pos = 0
+    for match in _INLINE_RE.finditer(text):
+        parts.append(escape(text[pos : match.start()], quote=False))
+        pos = match.end()
+        if match.group("code") is not None:
+            parts.append(f'<font backColor="#eeeeee">{escape(match.group("code"), quote=False)}</font>')
+        elif match.group("alt") is not None:
+            parts.append(f"[{escape(match.group('alt'), quote=False)}]")
+        elif match.group("text") is not None:
+            parts.append(
+                f'<link href="{escape(match.group("href"))}" color="blue">'
+                f"{_inline(match.group('text'))}</link>"
+            )
+        elif match.group("bold") is not None or match.group("bold2") is not None:
+            parts.append(f"<b>{_inline(match.group('bold') or match.group('bold2'))}</b>")
+        else:
+            parts.append(f"<i>{_inline(match.group('italic'))}</i>")
+    parts.append(escape(text[pos:], quote=False))
+    return "".join(parts)
+
+
+def _wrap_code(lines, columns=CODE_COLUMNS):
+    """全角を2桁として columns 桁で折り返す"""
+    wrapped = []
+    for line in lines:
+        line = line.expandtabs(4)
+        current = []
+        width = 0
+        for char in line:
+            char_width = 2 if unicodedata.east_asian_width(char) in "WF" else 1
+            if width + char_width > columns:
+                wrapped.append("".join(current))
+                current, width = [], 0
+            current.append(char)
+            width += char_width
+        wrapped.append("".join(current))
+    return "\n".join(wrapped)
+
+
+def _styles():
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(FONT_NAME))
+        # 太字・斜体は同じフォント（<b> / <i> を使えるようにする）
+        pdfmetrics.registerFontFamily(
+            FONT_NAME, normal=FONT_NAME, bold=FONT_NAME, italic=FONT_NAME, boldItalic=FONT_NAME
+        )
+
+    body = ParagraphStyle(
+        "body", fontName=FONT_NAME, fontSize=10.5, leading=16, spaceAfter=6, wordWrap="CJK"
+    )
+    styles = {"body": body}
+    for level, size in enumerate((20, 16, 13.5, 12, 11, 10.5), start=1):
+        styles[f"h{level}"] = ParagraphStyle(
+            f"h{level}",
+            parent=body,
+            fontSize=size,
+            leading=size * 1.4,
+            spaceBefore=size * 0.6,
+            spaceAfter=size * 0.4,
+            textColor=colors.HexColor("#222222"),
+        )
+    styles["quote"] = ParagraphStyle(
+        "quote",
+        parent=body,
+        leftIndent=14,
+        borderPadding=(2, 0, 2, 6),
+        borderColor=colors.HexColor("#bbbbbb"),
+        borderWidth=0,
+        textColor=colors.HexColor("#555555"),
+    )
+    styles["code"] = ParagraphStyle(
+        "code",
+        parent=body,
+        fontSize=8,
+        leading=11,
+        backColor=colors.HexColor("#f4f4f4"),
+        borderPadding=6,
+        spaceBefore=4,
+        spaceAfter=10,
+    )
+    styles["cell"] = ParagraphStyle("cell", parent=body, fontSize=9, leading=13, spaceAfter=0)
+    return styles
+
+
+def _table(rows, styles):
+    from reportlab.lib import colors
+    from reportlab.platypus import Paragraph, Table, TableStyle
+
+    cells = [
+        [Paragraph(_inline(cell.strip()), styles["cell"]) for cell in row.strip().strip("|").split("|")]
+        for row in rows
+    ]
+    columns = max(len(row) for row in cells)
+    cells = [row + [""] * (columns - len(row)) for row in cells]
+    table = Table(cells, repeatRows=1, hAlign="LEFT")
+    table.setStyle(
+        TableStyle(
+            [
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#999999")),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e8e8e8")),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ]
+        )
+    )
+    return table
+
+
+def markdown_flowables(text):
+    """Markdown テキストを reportlab の Flowable のリストに変換
+
+    (flowables, marp) を返す。marp はフロントマターに marp: true があるか。
+    """
+    from reportlab.platypus import HRFlowable, PageBreak, Paragraph, Preformatted, Spacer
+
+    styles = _styles()
+    lines = text.splitlines()
+    flow = []
+    paragraph = []
+    marp = False
+    i = 0
+
+    # フロントマター
+    if lines and lines[0].strip() == "---":
+        for j in range(1, len(lines)):
+            if lines[j].strip() == "---":
+                marp = any(re.match(r"\s*marp\s*:\s*true\b", line) for line in lines[1:j])
+                i = j + 1
+                break
+
+    def flush():
+        if paragraph:
+            flow.append(Paragraph(_inline(" ".join(paragraph)), styles["body"]))
+            paragraph.clear()
+
+    def code_block(code_lines, label=None):
+        if label:
+            flow.append(Paragraph(f"<i>{escape(label)}</i>", styles["cell"]))
+        flow.append(Preformatted(_wrap_code(code_lines), styles["code"]))
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        fence = _FENCE_RE.match(line)
+        if fence:
+            flush()
+            end = i + 1
+            while end < len(lines) and not lines[end].strip().startswith(fence.group(1)):
+                end += 1
+            lang = fence.group(2)
+            code_block(lines[i + 1 : end], "Mermaid" if lang == "mermaid" else None)
+            i = end + 1
+            continue
+
+        if _MERMAID_DIV_RE.match(line):
+            flush()
+            end = i + 1
+            while end < len(lines) and lines[end].strip() != "</div>":
+                end += 1
+            code_block(lines[i + 1 : end], "Mermaid")
+            i = end + 1
+            continue
+
+        if _PAGE_BREAK_RE.search(line) or (marp and stripped == "---"):
+            flush()
+            if flow and not isinstance(flow[-1], PageBreak):
+                flow.append(PageBreak())
+            i += 1
+            continue
+
+        if not stripped or _HTML_LINE_RE.match(line):
+            flush()
+            i += 1
+            continue
+
+        heading = _HEADING_RE.match(line)
+        if heading:
+            flush()
+            level = len(heading.group(1))
+            flow.append(Paragraph(_inline(heading.group(2)), styles[f"h{level}"]))
+            i += 1
+            continue
+
+        if _RULE_RE.match(line):
+            flush()
+            flow.append(HRFlowable(width="100%", thickness=0.5, spaceBefore=4, spaceAfter=8))
+            i += 1
+            continue
+
+        if stripped.startswith("|") and i + 1 < len(lines) and _TABLE_SEPARATOR_RE.match(lines[i + 1]):
+            flush()
+            rows = [line]
+            i += 2
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                rows.append(lines[i])
+                i += 1
+            flow.append(_table(rows, styles))
+            flow.append(Spacer(1, 8))
+            continue
+
+        if stripped.startswith(">"):
+            flush()
+            quoted = []
+            while i < len(lines) and lines[i].strip().startswith(">"):
+                quoted.append(lines[i].strip()[1:].strip())
+                i += 1
+            flow.append(Paragraph(_inline(" ".join(q for q in quoted if q)), styles["quote"]))
+            continue
+
+        item = _LIST_RE.match(line)
+        if item:
+            flush()
+            indent, marker, content = item.groups()
+            checkbox = _CHECKBOX_RE.match(content)
+            if checkbox:
+                bullet = "■" if checkbox.group(1) in "xX" else "□"
+                content = content[checkbox.end() :]
+            elif marker[0].isdigit():
+                bullet = marker
+            else:
+                bullet = "・"
+            level = len(indent.expandtabs(4)) // 2
+            style = styles["body"].clone(
+                "item", leftIndent=14 + level * 14, bulletIndent=level * 14, spaceAfter=2
+            )
+            flow.append(Paragraph(_inline(content), style, bulletText=bullet))
+            i += 1
+            continue
+
+        paragraph.append(stripped)
+        i += 1
+
+    flush()
+    while flow and isinstance(flow[-1], PageBreak):
+        flow.pop()
+    return flow, marp
+
+
+def _temp_beside(target):
+    """target と同じディレクトリに一意な一時ファイルを作ってパスを返す
+
+    名前に pid しか含めないと、同じプロセスの別スレッド（CLI と ExportJobs など）と衝突する。
+    static/ から配信するので、mkstemp の 0600 を通常のファイルと同じ権限に戻す。
+    """
+    fd, tmp = tempfile.mkstemp(
+        dir=target.parent, prefix=f".{target.name}.", suffix=".tmp"
+    )
+    os.close(fd)
+    os.chmod(tmp, 0o644)
+    return Path(tmp)
+
+
+def render_markdown_pdf(source, output):
+    """Markdown ファイルを PDF に変換（ワーカープロセスから呼ばれる）
+
+    一時ファイルに書いてから置き換える。出力先のパス（str）を返す。
+    """
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.platypus import SimpleDocTemplate
+
+    source, output = Path(source), Path(output)
+    text = source.read_text(encoding="utf-8")
+    flow, marp = markdown_flowables(text)
+    tmp = _temp_beside(output)
+    try:
+        doc = SimpleDocTemplate(
+            str(tmp),
+            pagesize=landscape(A4) if marp else A4,
+            title=source.stem,
+            leftMargin=50,
+            rightMargin=50,
+            topMargin=50,
+            bottomMargin=50,
+        )
+        doc.build(flow or [_empty_page()])
+        os.replace(tmp, output)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return str(output)
+
+
+def _empty_page():
+    from reportlab.platypus import Spacer
+
+    return Spacer(1, 1)
+
+
+# ==================== 一括変換 ====================
+
+
+def _source_hash(path):
+    digest = hashlib.sha256(f"pdf-export-v{EXPORTER_VERSION}\n".encode("ascii"))
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def knowledge_dirs(nodes, base_dir=BASE_DIR):
+    """ノードの knowledge_dir を static/ 配下に解決したパスの一覧（重複なし・出現順）"""
+    static_root = (Path(base_dir) / "static").resolve()
+    dirs = {}
+    for node in nodes:
+        value = node.get("knowledge_dir")
+        if not value or value in dirs:
+            continue
+        path = Path(value)
+        if not path.is_absolute():
+            path = Path(base_dir) / path
+        try:
+            path = path.resolve()
+            inside = os.path.commonpath([str(static_root), str(path)]) == str(static_root)
+        except (OSError, ValueError, RuntimeError):
+            inside = False
+        dirs[value] = path if inside and path.is_dir() else None
+    return list(dict.fromkeys(path for path in dirs.values() if path is not None))
+
+
+def _load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest.get("files", {}) if isinstance(manifest, dict) else {}
+
+
+def _save_manifest(path, files):
+    """マニフェストのロック保持中に呼ぶ（一時ファイル → fsync → rename）"""
+    _write_json(
+        path,
+        {"exporter_version": EXPORTER_VERSION, "files": dict(sorted(files.items()))},
+    )
+
+
+def _manifest_key(path, base_dir):
+    try:
+        return path.relative_to(Path(base_dir).resolve()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def export_pdfs(
+    directories,
+    base_dir=BASE_DIR,
+    manifest_path=MANIFEST_PATH,
+    force=False,
+    workers=DEFAULT_WORKERS,
+):
+    """directories 配下の *.md を PDF に変換し、結果の集計を返す
+
+    {"exported": [ソース...], "skipped": 件数, "failed": [{"source", "error"}...]}。
+    マニフェストの更新はプロセス間ロックの中で行う（同時実行しても二重に変換しない）。
+    """
+    manifest_path = Path(manifest_path)
+    sources = []
+    for directory in directories:
+        sources.extend(sorted(Path(directory).resolve().rglob("*.md")))
+    sources = list(dict.fromkeys(sources))
+
+    with FileLock(manifest_path.with_name(manifest_path.name + ".lock")):
+        files = _load_manifest(manifest_path)
+        jobs = {}
+        skipped = 0
+        for source in sources:
+            key = _manifest_key(source, base_dir)
+            digest = _source_hash(source)
+            output = source.with_suffix(".pdf")
+            entry = files.get(key)
+            if (
+                not force
+                and entry is not None
+                and entry.get("sha256") == digest
+                and output.exists()
+            ):
+                skipped += 1
+                continue
+            jobs[key] = (source, output, digest)
+
+        exported = []
+        failed = []
+
+        def finish(key, error):
+            source, output, digest = jobs[key]
+            if error is None:
+                files[key] = {"sha256": digest, "pdf": _manifest_key(output, base_dir)}
+                exported.append(key)
+            else:
+                files.pop(key, None)
+                failed.append({"source": key, "error": str(error)})
+
+        if len(jobs) == 1 or workers <= 1:
+            for key, (source, output, _) in jobs.items():
+                try:
+                    render_markdown_pdf(source, output)
+                    finish(key, None)
+                except Exception as e:
+                    finish(key, e)
+        elif jobs:
+            # スレッド実行中のサーバから fork すると reportlab 等がデッドロックし得るため spawn
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(jobs)),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                futures = {
+                    executor.submit(render_markdown_pdf, source, output): key
+                    for key, (source, output, _) in jobs.items()
+                }
+                for future in as_completed(futures):
+                    finish(futures[future], future.exception())
+
+        # 消えたソースの記録を落とす
+        present = {_manifest_key(source, base_dir) for source in sources}
+        scanned = [_manifest_key(Path(d).resolve(), base_dir) for d in directories]
+        stale = [
+            key
+            for key in files
+            if key not in present and any(key.startswith(d + "/") for d in scanned)
+        ]
+        for key in stale:
+            del files[key]
+        if jobs or stale:
+            _save_manifest(manifest_path, files)
+
+    exported.sort()
+    failed.sort(key=lambda item: item["source"])
+    return {"exported": exported, "skipped": skipped, "failed": failed}
+
+
+def export_knowledge_pdfs(nodes, base_dir=BASE_DIR, force=False, workers=DEFAULT_WORKERS):
+    """全ノードの knowledge_dir 配下の Markdown を PDF に変換"""
+    return export_pdfs(
+        knowledge_dirs(nodes, base_dir),
+        base_dir=base_dir,
+        manifest_path=Path(base_dir) / "static" / "pdf_manifest.json",
+        force=force,
+        workers=workers,
+    )
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class ExportJobs:
+    """Web から起動する一括変換をバックグラウンドスレッドで1件ずつ実行する
+
+    状態（running / done / failed / error と集計結果）は状態ファイルに書く。
+    同じプロセスで実行中に start() が呼ばれても新しいジョブは始めず、実行中の状態を返す。
+    別のワーカーで実行中なら、マニフェストのロックが空くのを待ってから実行する
+    （その間に変換済みになったファイルは変換しない）。
+    """
+
+    def __init__(self, base_dir=BASE_DIR, status_path=None, workers=DEFAULT_WORKERS):
+        self.base_dir = Path(base_dir)
+        if status_path is None:
+            status_path = self.base_dir / "static" / "pdf_export_status.json"
+        self.status_path = Path(status_path)
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, nodes, force=False):
+        """ジョブを開始して (状態, 開始したか) を返す"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self.status(), False
+            status = {"state": "running", "force": force, "started_at": _now()}
+            self._write_status(status)
+            self._thread = threading.Thread(
+                target=self._run, args=(tuple(nodes), force, status), daemon=True
+            )
+            self._thread.start()
+            return status, True
+
+    def _run(self, nodes, force, status):
+        try:
+            result = export_knowledge_pdfs(nodes, self.base_dir, force, self.workers)
+            status = dict(
+                status, state="failed" if result["failed"] else "done", result=result
+            )
+        except Exception as e:
+            traceback.print_exc()
+            status = dict(status, state="error", error=str(e) or type(e).__name__)
+        status["finished_at"] = _now()
+        self._write_status(status)
+
+    def _write_status(self, status):
+        self.status_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _temp_beside(self.status_path)
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(status, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.status_path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def status(self):
+        """最後に開始したジョブの状態（一度も実行していなければ state = idle）"""
+        try:
+            with open(self.status_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"state": "idle"}
+
+    def wait(self, timeout=None):
+        """このプロセスで実行中のジョブが終わるまで待つ"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return thread is None or not thread.is_alive()
+
+
+def main():
+    from workflow_store import open_workflow_store
+
+    parser = argparse.ArgumentParser(description="Export knowledge Markdown files to PDF")
+    parser.add_argument(
+        "--data",
+        type=Path,
+        default=BASE_DIR / os.environ.get("WORKFLOW_DATA", BASE_DIR / "data" / "workflow.json"),
+        help="workflow data (JSON or SQLite)",
+    )
+    parser.add_argument(
+        "--dir",
+        dest="dirs",
+        type=Path,
+        action="append",
+        default=[],
+        help="additional directory to export (repeatable)",
+    )
+    parser.add_argument("--force", action="store_true", help="re-export unchanged files")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    nodes = open_workflow_store(args.data).snapshot().nodes
+    directories = knowledge_dirs(nodes) + [d for d in args.dirs if d.is_dir()]
+    result = export_pdfs(directories, force=args.force, workers=args.workers)
+    for source in result["exported"]:
+        print(f"Exported: {source}")
+    for failure in result["failed"]:
+        print(f"Failed: {failure['source']}: {failure['error']}", file=sys.stderr)
+    print(
+        f"{len(result['exported'])} exported, {result['skipped']} unchanged, "
+        f"{len(result['failed'])} failed"
+    )
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""
+Reachability - depends_on の推移的な依存関係（上流 / 下流）のインデックス（影響範囲の問い合わせ用）
+
+- 辺は依存先 → 依存元（依存先が上流）。validation.py / schedule.py と同じ向き
+- 各ノードに整数のスロットを割り当て、下流・上流の集合を int のビット集合で持つ（推移閉包）。
+  到達判定は O(1)、件数は bit_count()、一覧は集合の大きさに比例する時間で取り出せる
+- ReachabilityIndex.update(nodes) は前回との差分だけを反映する
+  - 辺の追加: 依存先とその上流の下流集合、依存元とその下流の上流集合に OR するだけ
+  - 辺の削除: 削除前の閉包から影響を受ける範囲を求め、その範囲だけ隣接ノードから組み直す
+  - サイクルができる場合・変更が大きい場合・id が重複している場合は全体を再構築する
+    （サイクルを含むグラフは強連結成分ごとに閉包を求め、次の update() でも再構築する）
+- ノード数が BITSET_MAX_NODES を超える場合は推移閉包を持たず（メモリが O(V^2) ビットになるため）、
+  問い合わせごとに隣接リストを幅優先探索する
+- update() は渡したノード列に対する問い合わせ口（ReachabilityView）を返す。
+  インデックスがその後の update() で先に進んでいれば、ビューは自分のノード列から
+  組んだ別のインデックスで答える（古いスナップショットに新しいグラフを返さない）
+"""
+
+import threading
+
+from validation import strongly_connected_components
+
+# 推移閉包（ビット集合）を持つ最大ノード数。約 V^2 / 8 バイト（2万ノードで 50MB 程度）
+BITSET_MAX_NODES = 20_000
+
+# 変更されたノードがこの割合を超えたら差分ではなく全体を再構築する
+REBUILD_FRACTION = 0.125
+
+
+def _slots(mask):
+    """ビット集合に含まれるスロット番号を小さい順に返す"""
+    text = bin(mask)[:1:-1]
+    i = text.find("1")
+    while i >= 0:
+        yield i
+        i = text.find("1", i + 1)
+
+
+class ReachabilityIndex:
+    """ノード間の到達可能性（上流 / 下流）を編集間で保持するインデックス
+
+    update(nodes) で最新のノード列に追従し、upstream() / downstream() / impact() で
+    問い合わせる。インデックス自体への問い合わせは常に最後の update() の内容に対して答える。
+    特定のノード列に対して答えさせたい場合は update() が返すビューを使う。
+    """
+
+    def __init__(self, max_nodes=BITSET_MAX_NODES):
+        self.max_nodes = max_nodes
+        self.rebuilds = 0  # 全体を再構築した回数
+        self.updates = 0  # update() の回数（ビューが最新かどうかの判定に使う）
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._slot = {}  # id → スロット
+        self._ids = []  # スロット → id（空きは None）
+        self._free = []  # 空きスロット
+        self._position = {}  # id → 並び順の位置
+        self._deps = {}  # id → depends_on（複製）
+        self._dependents = {}  # 依存先 id（存在しない id も含む）→ 参照しているノード id
+        self._succ = []  # スロット → 依存元スロットの集合
+        self._pred = []  # スロット → 依存先スロットの集合
+        self._desc = []  # スロット → 下流のビット集合
+        self._anc = []  # スロット → 上流のビット集合
+        self._closure = False
+        self._acyclic = True
+
+    # ---------- 更新 ----------
+
+    def update(self, nodes):
+        """最新のノード列に追従し、そのノード列に対する ReachabilityView を返す"""
+        with self._lock:
+            nodes = list(nodes)
+            node_by_id = {node["id"]: node for node in nodes}
+            if (
+                len(node_by_id) != len(nodes)
+                or not self._acyclic
+                or (len(node_by_id) <= self.max_nodes) != self._closure
+                or not self._apply(node_by_id)
+            ):
+                self._rebuild(node_by_id)
+            self._position = {node_id: i for i, node_id in enumerate(node_by_id)}
+            self.updates += 1
+            return ReachabilityView(self, self.updates, nodes)
+
+    def _rebuild(self, node_by_id):
+        self._reset()
+        self.rebuilds += 1
+        for node_id, node in node_by_id.items():
+            self._allocate(node_id)
+            self._set_deps(node_id, list(node.get("depends_on", [])))
+        for node_id, node in node_by_id.items():
+            slot = self._slot[node_id]
+            for dep_id in self._deps[node_id]:
+                dep_slot = self._slot.get(dep_id)
+                if dep_slot is not None:
+                    self._succ[dep_slot].add(slot)
+                    self._pred[slot].add(dep_slot)
+
+        self._closure = len(node_by_id) <= self.max_nodes
+        successors = {slot: self._succ[slot] for slot in range(len(self._ids))}
+        # 成分は逆トポロジカル順（下流が先）
+        components = strongly_connected_components(successors)
+        self._acyclic = all(
+            len(component) == 1 and component[0] not in self._succ[component[0]]
+            for component in components
+        )
+        if self._closure:
+            self._close_components(components, self._succ, self._desc)
+            self._close_components(reversed(components), self._pred, self._anc)
+
+    @staticmethod
+    def _close_components(components, adjacency, closure):
+        """成分を依存される側から順に処理して閉包を求める"""
+        for component in components:
+            members = 0
+            for slot in component:
+                members |= 1 << slot
+            reach = 0
+            for slot in component:
+                for other in adjacency[slot]:
+                    reach |= (1 << other) | closure[other]
+            if len(component) > 1:
+                reach |= members
+            for slot in component:
+                closure[slot] = reach
+
+    def _allocate(self, node_id):
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = node_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(node_id)
+            self._succ.append(set())
+            self._pred.append(set())
+            self._desc.append(0)
+            self._anc.append(0)
+        self._slot[node_id] = slot
+        return slot
+
+    def _set_deps(self, node_id, depends_on):
+        for dep_id in set(self._deps.get(node_id, ())):
+            self._dependents[dep_id].discard(node_id)
+        for dep_id in set(depends_on):
+            self._dependents.setdefault(dep_id, set()).add(node_id)
+        self._deps[node_id] = depends_on
+
+    def _live_edges(self, node_ids, exists):
+        """node_ids に入る辺（依存先 id, 依存元 id）のうち両端が exists のもの"""
+        edges = set()
+        for node_id in node_ids:
+            if not exists(node_id):
+                continue
+            for dep_id in self._deps.get(node_id, ()):
+                if exists(dep_id):
+                    edges.add((dep_id, node_id))
+        return edges
+
+    def _apply(self, node_by_id):
+        """差分を反映する。全体の再構築が必要なら False"""
+        old_ids = self._slot
+        added = [node_id for node_id in node_by_id if node_id not in old_ids]
+        removed = [node_id for node_id in old_ids if node_id not in node_by_id]
+        # 追加されたノードも含む
+        changed = [
+            node_id
+            for node_id, node in node_by_id.items()
+            if node.get("depends_on", []) != self._deps.get(node_id)
+        ]
+        if len(removed) + len(changed) > max(
+            len(node_by_id) * REBUILD_FRACTION, 1
+        ):
+            return False
+        if not (removed or changed):
+            return True
+
+        # 辺が変わりうるノード: depends_on の変更と、追加・削除された id を参照するノード
+        affected = set(changed)
+        for node_id in added + removed:
+            affected.update(self._dependents.get(node_id, ()))
+        affected.update(removed)
+        old_edges = self._live_edges(affected, old_ids.__contains__)
+        for node_id in changed:
+            self._set_deps(node_id, list(node_by_id[node_id].get("depends_on", [])))
+        for node_id in removed:
+            self._set_deps(node_id, [])
+        new_edges = self._live_edges(affected, node_by_id.__contains__)
+
+        # 辺の削除（削除前の閉包から組み直す範囲を求める）
+        up_region = 0
+        down_region = 0
+        for dep_id, node_id in old_edges - new_edges:
+            dep_slot, slot = self._slot[dep_id], self._slot[node_id]
+            self._succ[dep_slot].discard(slot)
+            self._pred[slot].discard(dep_slot)
+            if self._closure:
+                up_region |= (1 << dep_slot) | self._anc[dep_slot]
+                down_region |= (1 << slot) | self._desc[slot]
+        if self._closure:
+            self._recompute(up_region, self._succ, self._desc)
+            self._recompute(down_region, self._pred, self._anc)
+
+        # ノードの削除・追加
+        for node_id in removed:
+            slot = self._slot.pop(node_id)
+            del self._deps[node_id]
+            self._ids[slot] = None
+            self._desc[slot] = self._anc[slot] = 0
+            self._free.append(slot)
+        for node_id in added:
+            self._allocate(node_id)
+
+        # 辺の追加（サイクルができるなら再構築）
+        for dep_id, node_id in new_edges - old_edges:
+            dep_slot, slot = self._slot[dep_id], self._slot[node_id]
+            if self._closure:
+                if dep_slot == slot or self._desc[slot] >> dep_slot & 1:
+                    return False
+                down = (1 << slot) | self._desc[slot]
+                up = (1 << dep_slot) | self._anc[dep_slot]
+                for upstream in _slots(up):
+                    self._desc[upstream] |= down
+                for downstream in _slots(down):
+                    self._anc[downstream] |= up
+            elif dep_slot == slot:
+                return False
+            self._succ[dep_slot].add(slot)
+            self._pred[slot].add(dep_slot)
+        return True
+
+    @staticmethod
+    def _recompute(region, adjacency, closure):
+        """region のスロットの閉包を隣接ノードから組み直す（後順の反復 DFS）
+
+        region 外の隣接ノードの閉包は変わっていない前提。グラフは非巡回。
+        """
+        done = set()
+        for root in _slots(region):
+            if root in done:
+                continue
+            done.add(root)
+            stack = [(root, iter(adjacency[root]))]
+            while stack:
+                slot, neighbors = stack[-1]
+                for other in neighbors:
+                    if other not in done and region >> other & 1:
+                        done.add(other)
+                        stack.append((other, iter(adjacency[other])))
+                        break
+                else:
+                    stack.pop()
+                    reach = 0
+                    for other in adjacency[slot]:
+                        reach |= (1 << other) | closure[other]
+                    closure[slot] = reach
+
+    # ---------- 問い合わせ ----------
+
+    def _search(self, slot, adjacency):
+        """推移閉包を持たない場合の幅優先探索"""
+        seen = {slot}
+        queue = [slot]
+        for current in queue:
+            for other in adjacency[current]:
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        seen.discard(slot)
+        return seen
+
+    def _collect(self, node_id, adjacency, closure):
+        slot = self._slot.get(node_id)
+        if slot is None:
+            return None
+        if self._closure:
+            slots = _slots(closure[slot] & ~(1 << slot))
+        else:
+            slots = self._search(slot, adjacency)
+        ids = [self._ids[s] for s in slots]
+        ids.sort(key=self._position.__getitem__)
+        return ids
+
+    def _downstream(self, node_id):
+        return self._collect(node_id, self._succ, self._desc)
+
+    def _upstream(self, node_id):
+        return self._collect(node_id, self._pred, self._anc)
+
+    def _reaches(self, from_id, to_id):
+        from_slot = self._slot.get(from_id)
+        to_slot = self._slot.get(to_id)
+        if from_slot is None or to_slot is None or from_slot == to_slot:
+            return False
+        if self._closure:
+            return bool(self._desc[from_slot] >> to_slot & 1)
+        return to_slot in self._search(from_slot, self._succ)
+
+    def _impact(self, node_id):
+        upstream = self._upstream(node_id)
+        if upstream is None:
+            return None
+        return upstream, self._downstream(node_id)
+
+    def downstream(self, node_id):
+        """node_id に推移的に依存するノード（並び順）。未知の id は None"""
+        with self._lock:
+            return self._downstream(node_id)
+
+    def upstream(self, node_id):
+        """node_id が推移的に依存するノード（並び順）。未知の id は None"""
+        with self._lock:
+            return self._upstream(node_id)
+
+    def reaches(self, from_id, to_id):
+        """to_id が from_id の下流なら True"""
+        with self._lock:
+            return self._reaches(from_id, to_id)
+
+    def impact(self, node_id):
+        """上流・下流の一覧と件数。未知の id は None"""
+        with self._lock:
+            found = self._impact(node_id)
+        return _impact_result(found)
+
+
+def _impact_result(found):
+    if found is None:
+        return None
+    upstream, downstream = found
+    return {
+        "upstream": upstream,
+        "downstream": downstream,
+        "upstream_count": len(upstream),
+        "downstream_count": len(downstream),
+    }
+
+
+class ReachabilityView:
+    """ReachabilityIndex.update(nodes) 時点のノード列に対する問い合わせ口
+
+    スナップショットごとにメモ化して使う。共有インデックスがまだこの update() の
+    内容なら（インデックスのロックの中で確認して）そのまま答える。後続の update() で
+    先に進んでいれば、自分のノード列から推移閉包を持たないインデックスを一度だけ組んで
+    答える（共有インデックスは巻き戻さない）。
+    """
+
+    __slots__ = ("_index", "_update", "_nodes", "_own", "_own_lock")
+
+    def __init__(self, index, update, nodes):
+        self._index = index
+        self._update = update
+        self._nodes = nodes
+        self._own = None
+        self._own_lock = threading.Lock()
+
+    def _query(self, method, *args):
+        index = self._index
+        with index._lock:
+            if index.updates == self._update:
+                return method(index, *args)
+        with self._own_lock:
+            if self._own is None:
+                own = ReachabilityIndex(max_nodes=0)
+                own.update(self._nodes)
+                self._own = own
+            own = self._own
+        with own._lock:
+            return method(own, *args)
+
+    def downstream(self, node_id):
+        """node_id に推移的に依存するノード（並び順）。未知の id は None"""
+        return self._query(ReachabilityIndex._downstream, node_id)
+
+    def upstream(self, node_id):
+        """node_id が推移的に依存するノード（並び順）。未知の id は None"""
+        return self._query(ReachabilityIndex._upstream, node_id)
+
+    def reaches(self, from_id, to_id):
+        """to_id が from_id の下流なら True"""
+        return self._query(ReachabilityIndex._reaches, from_id, to_id)
+
+    def impact(self, node_id):
+        """上流・下流の一覧と件数。未知の id は None"""
+        return _impact_result(self._query(ReachabilityIndex._impact, node_id))
@@ -0,0 +1,139 @@
+"""
+Render Cache - DAG / タイムライン成果物のコンテンツアドレス型キャッシュ
+
+- キーは描画に影響するフィールドだけの安定ハッシュ＋セクションフィルタ＋出力形式
+  （note など描画に関係しない項目を変えても再描画しない）
+- static/ 配下のディスクに保存し、LRU（mtime）とサイズ上限で追い出す
+- 合計サイズは最初の put で1回だけ走査して求め、以降は書き込んだ分を足していく。
+  上限を超えたときだけ走査し直して追い出す（put ごとにディレクトリ全体を stat しない）。
+  他のワーカーの書き込みは次の走査まで数えないので、上限は目安
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# 描画結果に影響するノードのフィールド
+RENDER_FIELDS = ("id", "label", "deadline", "depends_on", "section", "start", "end")
+
+# レンダラーの出力が変わる変更を入れたら上げる（古いキャッシュを無効化）
+RENDERER_VERSION = 4
+
+
+def render_key(kind, nodes, section_filter=None, fmt="png"):
+    """描画に関係するフィールドだけから安定したキャッシュキーを作る"""
+    payload = [
+        RENDERER_VERSION,
+        kind,
+        fmt,
+        section_filter or "",
+        [[node.get(field) for field in RENDER_FIELDS] for node in nodes],
+    ]
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """キー → バイト列のディスクキャッシュ（LRU + 合計サイズ上限）"""
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # 合計サイズの見積もり（None は未走査）
+
+    def path(self, key, suffix):
+        return self.directory / f"{key}{suffix}"
+
+    def get(self, key, suffix):
+        """キャッシュ済みのバイト列を返す（無ければ None）。参照時刻を更新する"""
+        path = self.path(key, suffix)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def get_text(self, key, suffix):
+        data = self.get(key, suffix)
+        return data.decode("utf-8") if data is not None else None
+
+    def put(self, key, suffix, data):
+        """バイト列を保存（一時ファイル経由で置き換え）し、上限を超えたら追い出す"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(key, suffix)
+        # 同じキーを同時に書くスレッド・プロセスと一時ファイルを共有しない
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f"{path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        self._grow(len(data) - replaced, keep=path.name)
+        return path
+
+    def _grow(self, size, keep=None):
+        """合計サイズの見積もりを size だけ進め、上限を超えたら追い出す"""
+        with self._lock:
+            if self._total is not None:
+                self._total += size
+                if self._total <= self.max_bytes:
+                    return
+            self._total = self._evict_locked(keep)
+
+    def evict(self, keep=None):
+        """最終参照の古いものから削除して合計サイズを上限以下にする"""
+        with self._lock:
+            self._total = self._evict_locked(keep)
+
+    def _evict_locked(self, keep):
+        """ディレクトリを走査して追い出し、残った合計サイズを返す"""
+        try:
+            entries = [
+                e
+                for e in os.scandir(self.directory)
+                if e.is_file() and not e.name.endswith(".tmp")
+            ]
+        except FileNotFoundError:
+            return 0
+        stats = []
+        for entry in entries:
+            try:
+                stats.append((entry, entry.stat()))
+            except FileNotFoundError:
+                # 他のワーカーが追い出し済み
+                continue
+        total = sum(st.st_size for _, st in stats)
+        if total <= self.max_bytes:
+            return total
+        for entry, st in sorted(stats, key=lambda item: item[1].st_mtime_ns):
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+            total -= st.st_size
+        return total
@@ -0,0 +1,301 @@
+"""
+Render Queue - DAG / タイムライン PNG のバックグラウンド生成
+
+- 成果物（artifact）ごとにジョブは1つだけ。実行中に届いた要求は最新の1件に集約
+- レンダリングはプロセスプールで実行し、一時ファイルに書いてから置き換える
+  （配信側は常に最後に成功した画像を返す）
+- 成果物ごとに世代番号と ETag を保持し、鮮度を問い合わせられる
+- キャッシュキーが渡され RenderCache にヒットした場合はレンダリングせずに公開
+- 複数ワーカープロセスで動かす場合は、成果物ごとのプロセス間ロックの中で描画する。
+  ロック取得後にキャッシュを再確認するので、同じ内容を複数のワーカーが描画することはない
+- 公開（rename）は描画用とは別の短い公開ロックの中で行い、実行中の描画を待たない。
+  公開済みの workflow 世代（version）を記録し、古い世代で上書きしない
+- キューの状態（_cond）を持ったままファイル I/O やプロセス間ロックを待たない
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from file_lock import FileLock, SharedCounter
+from render_cache import RenderCache
+
+
+class _Artifact:
+    __slots__ = (
+        "name",
+        "func",
+        "output_path",
+        "requested",
+        "rendered",
+        "running",
+        "pending",
+        "etag",
+        "error",
+        "lock",
+        "publish_lock",
+        "published_version",
+        "published_generation",
+        "publishing",
+    )
+
+    def __init__(self, name, func, output_path):
+        self.name = name
+        self.func = func
+        self.output_path = output_path
+        self.requested = 0  # 要求された最新世代
+        self.rendered = 0  # 最後に成功した世代
+        self.running = None  # 実行中の世代
+        self.pending = None  # (世代, args, key, version) 実行待ちの最新要求
+        self.etag = None
+        self.error = None
+        self.publishing = 0  # _cond の外で公開中の件数
+        # 全ワーカー共通: 描画の排他（描画中ずっと保持される）
+        self.lock = FileLock(output_path.with_name(output_path.name + ".lock"))
+        # 全ワーカー共通: 公開の排他と公開済みの workflow 世代（rename の間だけ保持）
+        self.publish_lock = FileLock(
+            output_path.with_name(output_path.name + ".publish.lock")
+        )
+        self.published_version = SharedCounter(
+            output_path.with_name(output_path.name + ".version")
+        )
+        # このプロセスで公開済みの世代（publish_lock の中で読み書きする）
+        self.published_generation = 0
+
+
+def _file_etag(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
+
+
+def _render_locked(func, args, tmp_path, lock_path, cache_config, key):
+    """ワーカープロセス側: プロセス間ロックの中でキャッシュを再確認してから描画
+
+    描画結果はロックを持ったままキャッシュに入れ、後続のワーカーがヒットするようにする。
+    """
+    cache = RenderCache(*cache_config) if cache_config and key is not None else None
+    with FileLock(lock_path):
+        if cache is not None:
+            data = cache.get(key, tmp_path.suffix)
+            if data is not None:
+                # 別のワーカーが同じ内容を描画済み
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                return str(tmp_path)
+        result = func(*args, tmp_path)
+        if cache is not None and result is not None and tmp_path.exists():
+            with open(tmp_path, "rb") as f:
+                cache.put(key, tmp_path.suffix, f.read())
+        return result
+
+
+class RenderQueue:
+    """成果物ごとに集約されるレンダリングキュー"""
+
+    def __init__(self, max_workers=2, cache=None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self._executor = None
+        self._artifacts = {}
+        self._cond = threading.Condition()
+
+    def register(self, name, func, output_path):
+        """成果物を登録する。func(*args, output_path) は成功時にパスを返すこと"""
+        artifact = _Artifact(name, func, output_path)
+        if output_path.exists():
+            artifact.etag = _file_etag(output_path)
+        self._artifacts[name] = artifact
+
+    def _get_executor(self):
+        if self._executor is None:
+            # スレッド実行中のサーバから fork すると matplotlib 等がデッドロックし得るため spawn
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def submit(self, name, *args, key=None, version=None):
+        """レンダリングを要求する。実行中なら最新の要求だけを保持して後で実行
+
+        key がキャッシュにあればその内容を即座に公開する（公開は _cond の外で行う）。
+        version は描画元の workflow 世代（全ワーカー共通の番号）。
+        """
+        artifact = self._artifacts[name]
+        cached = None
+        if key is not None and self.cache is not None:
+            cached = self.cache.get(key, artifact.output_path.suffix)
+
+        with self._cond:
+            artifact.requested += 1
+            generation = artifact.requested
+            if cached is None:
+                artifact.pending = (generation, args, key, version)
+                if artifact.running is None:
+                    self._start(artifact)
+                return generation
+            artifact.pending = None
+            artifact.publishing += 1
+
+        self._publish_bytes(artifact, generation, cached, key, version)
+        return generation
+
+    def _tmp_path(self, artifact, label):
+        # ワーカープロセス間で衝突しないよう pid を含める
+        output = artifact.output_path
+        return output.with_name(f"{output.stem}.{label}-{os.getpid()}{output.suffix}")
+
+    def _publish_file(self, artifact, generation, tmp_path, version):
+        """一時ファイルを成果物に置き換える（原子的な rename）
+
+        公開ロックだけを取り、描画ロックは待たない。このプロセスでより新しい
+        世代を、または他のワーカーがより新しい workflow 世代を公開済みなら
+        置き換えずに False を返す。
+        """
+        with artifact.publish_lock:
+            if generation < artifact.published_generation or (
+                version is not None and version < artifact.published_version.value()
+            ):
+                tmp_path.unlink()
+                return False
+            os.replace(tmp_path, artifact.output_path)
+            artifact.published_generation = generation
+            if version is not None:
+                artifact.published_version.set(version)
+            return True
+
+    def _publish(self, artifact, generation, tmp_path, key, version):
+        """_cond の外で呼ぶ: 公開してから世代と ETag を更新する
+
+        呼び出し側は _cond の中で artifact.publishing を増やしておくこと。
+        """
+        try:
+            published = self._publish_file(artifact, generation, tmp_path, version)
+            etag = key[:16] if key and published else _file_etag(artifact.output_path)
+            error = None
+        except Exception as e:
+            traceback.print_exc()
+            published, etag, error = False, None, str(e) or type(e).__name__
+        with self._cond:
+            artifact.publishing -= 1
+            if error is not None:
+                artifact.error = error
+            elif generation > artifact.rendered:
+                artifact.rendered = generation
+                artifact.etag = etag
+                artifact.error = None
+            self._cond.notify_all()
+
+    def _publish_bytes(self, artifact, generation, data, key, version):
+        output = artifact.output_path
+        tmp_path = self._tmp_path(artifact, f"publish-{generation}")
+        try:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        except Exception:
+            with self._cond:
+                artifact.publishing -= 1
+                self._cond.notify_all()
+            raise
+        self._publish(artifact, generation, tmp_path, key, version)
+
+    def _start(self, artifact):
+        generation, args, key, version = artifact.pending
+        artifact.pending = None
+        artifact.running = generation
+        tmp_path = self._tmp_path(artifact, f"rendering-{generation}")
+        cache_config = (
+            (self.cache.directory, self.cache.max_bytes)
+            if self.cache is not None
+            else None
+        )
+        try:
+            future = self._get_executor().submit(
+                _render_locked,
+                artifact.func,
+                args,
+                tmp_path,
+                artifact.lock.path,
+                cache_config,
+                key,
+            )
+        except Exception as e:
+            artifact.running = None
+            artifact.error = str(e)
+            self._cond.notify_all()
+            return
+        future.add_done_callback(
+            lambda f: self._finished(artifact, generation, key, version, tmp_path, f)
+        )
+
+    def _finished(self, artifact, generation, key, version, tmp_path, future):
+        try:
+            result = future.result()
+            if result is None or not tmp_path.exists():
+                raise RuntimeError(f"{artifact.name} renderer returned no image")
+            error = None
+        except Exception as e:
+            traceback.print_exc()
+            error = str(e) or type(e).__name__
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        with self._cond:
+            if isinstance(future.exception(), BrokenProcessPool):
+                # ワーカーが異常終了した場合はプールを作り直す
+                self._executor = None
+            artifact.running = None
+            # 実行中にキャッシュから新しい世代が公開済みなら捨てる
+            publish = error is None and generation > artifact.rendered
+            if publish:
+                artifact.publishing += 1
+            else:
+                artifact.error = error
+            if artifact.pending is not None:
+                self._start(artifact)
+            self._cond.notify_all()
+
+        if publish:
+            self._publish(artifact, generation, tmp_path, key, version)
+        elif error is None:
+            tmp_path.unlink()
+
+    def current(self, name):
+        """(最後に成功した世代, ETag) を返す"""
+        with self._cond:
+            artifact = self._artifacts[name]
+            return artifact.rendered, artifact.etag
+
+    def status(self):
+        """全成果物の鮮度情報を返す"""
+        with self._cond:
+            return {
+                name: {
+                    "generation": a.rendered,
+                    "requested": a.requested,
+                    "rendering": a.running is not None,
+                    "fresh": a.rendered == a.requested
+                    and a.running is None
+                    and a.pending is None
+                    and a.publishing == 0,
+                    "etag": a.etag,
+                    "error": a.error,
+                }
+                for name, a in self._artifacts.items()
+            }
+
+    def wait(self, timeout=None):
+        """実行中・実行待ちのジョブが全て終わるまで待つ"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: all(
+                    a.running is None and a.pending is None and a.publishing == 0
+                    for a in self._artifacts.values()
+                ),
+                timeout,
+            )
@@ -0,0 +1,234 @@
+"""
+Renderers - DAG / タイムライン PNG 生成
+
+レンダーキューのワーカープロセスから呼び出せるよう、アプリ本体から分離している。
+出力先は呼び出し側が指定する。
+pandas / matplotlib / networkx は起動を遅くするため、各関数の中で初めて使う時に import する。
+"""
+
+import traceback
+from pathlib import Path
+
+# ==================== DAG PNG ====================
+
+
+def layered_positions(nodes):
+    """階層レイアウトを [-1, 1] の座標に正規化する（上の層ほど y が大きい）"""
+    from dag_layered import layered_layout
+
+    layout = layered_layout(nodes)
+    x_scale = max(layout.width - 1, 1) / 2
+    y_scale = max(layout.depth - 1, 1) / 2
+    return {
+        node_id: (x / x_scale, 1 - rank / y_scale)
+        for node_id, (x, rank) in layout.positions.items()
+    }
+
+
+def generate_dag_png(nodes, output_path):
+    """Graphviz/networkxを使ったDAG PNG生成"""
+    output_path = Path(output_path)
+    try:
+        import pygraphviz as pgv
+
+        use_graphviz = True
+    except ImportError:
+        use_graphviz = False
+
+    if use_graphviz:
+        try:
+            G = pgv.AGraph(directed=True)
+            G.graph_attr["rankdir"] = "TB"
+            G.graph_attr["size"] = "12,8"
+            G.graph_attr["ratio"] = "fill"
+
+            for node in nodes:
+                G.add_node(
+                    node["id"],
+                    label=node["label"][:20],
+                    shape="box",
+                    style="filled",
+                    fillcolor="lightblue",
+                )
+
+            for node in nodes:
+                for dep_id in node.get("depends_on", []):
+                    G.add_edge(dep_id, node["id"])
+
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            G.draw(str(output_path), prog="dot", format="png")
+            return str(output_path)
+        except Exception as e:
+            print(f"Graphviz error: {e}")
+            return None
+    else:
+        # networkx + matplotlib fallback
+        try:
+            import matplotlib.pyplot as plt
+            import networkx as nx
+            from matplotlib.patches import FancyBboxPatch
+
+            pos = layered_positions(nodes)
+
+            G = nx.DiGraph()
+            G.add_nodes_from(pos)
+            for node in nodes:
+                for dep_id in node.get("depends_on", []):
+                    if dep_id in pos:
+                        G.add_edge(dep_id, node["id"])
+
+            fig, ax = plt.subplots(1, 1, figsize=(14, 10))
+
+            # ノード描画
+            for node_id, (x, y) in pos.items():
+                bbox = FancyBboxPatch(
+                    (x - 0.08, y - 0.04),
+                    0.16,
+                    0.08,
+                    boxstyle="round,pad=0.01",
+                    edgecolor="black",
+                    facecolor="lightblue",
+                )
+                ax.add_patch(bbox)
+                ax.text(
+                    x, y, node_id, ha="center", va="center", fontsize=9, weight="bold"
+                )
+
+            # エッジ描画
+            nx.draw_networkx_edges(G, pos, ax=ax, arrowsize=20, arrowstyle="->")
+
+            ax.set_xlim(-1.2, 1.2)
+            ax.set_ylim(-1.2, 1.2)
+            ax.axis("off")
+            ax.set_title("Workflow DAG", fontsize=14, weight="bold")
+
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            plt.tight_layout()
+            plt.savefig(str(output_path), dpi=100, bbox_inches="tight")
+            plt.close()
+            return str(output_path)
+        except Exception as e:
+            print(f"networkx error: {e}")
+            return None
+
+
+# ==================== TIMELINE PNG ====================
+
+# y 軸ラベルの最大数（図の高さ 10in / 9pt で重ならずに読める行数）。
+# これを超える行数では等間隔に間引く（tick ごとに artist が作られるため）
+MAX_TIMELINE_LABELS = 60
+
+
+def timeline_bars(df):
+    """タスクの DataFrame を描画用の配列にまとめる
+
+    start / end はベクトル化して1回でパースし、どちらかが解釈できない行は除く。
+    (有効行の DataFrame, x（matplotlib の日付数値）, 幅（日数、最短1日）) を返す。
+    """
+    import matplotlib.dates as mdates
+    import numpy as np
+    import pandas as pd
+
+    start = pd.to_datetime(df["start"], errors="coerce", format="mixed")
+    end = pd.to_datetime(df["end"], errors="coerce", format="mixed")
+    valid = (start.notna() & end.notna()).to_numpy()
+    start = start[valid]
+
+    # 終了日を含む日数（最短1日）
+    widths = np.maximum(1, (end[valid] - start).dt.days.to_numpy() + 1)
+    x = mdates.date2num(start.to_numpy())
+    return df[valid].reset_index(drop=True), x, widths
+
+
+def generate_timeline_png(tasks, output_path):
+    """matplotlib を使ったタイムライン/ガントチャートPNG生成
+
+    バーはセクションごとに1つの PolyCollection にまとめて描画する。
+    """
+    output_path = Path(output_path)
+    try:
+        import matplotlib.dates as mdates
+        import matplotlib.pyplot as plt
+        import numpy as np
+        import pandas as pd
+        from matplotlib.collections import PolyCollection
+
+        if not tasks:
+            return None
+
+        df = pd.DataFrame(tasks)
+
+        fig, ax = plt.subplots(figsize=(14, 10))
+
+        sections = df["section"].unique() if "section" in df.columns else ["Default"]
+        colors_list = [
+            "#FF6B6B",
+            "#4ECDC4",
+            "#45B7D1",
+            "#FFA07A",
+            "#98D8C8",
+            "#F7DC6F",
+            "#BB8FCE",
+            "#85C1E2",
+        ]
+        color_map = {
+            s: colors_list[i % len(colors_list)] for i, s in enumerate(sections)
+        }
+
+        if "section" not in df.columns:
+            df["section"] = "Default"
+        df, x, widths = timeline_bars(df)
+        y_pos = len(df)
+        y = np.arange(y_pos, dtype=float)
+        row_sections = df["section"].to_numpy()
+
+        # バー表示（最短1日）: (n, 4, 2) の頂点配列をセクションごとに描画
+        verts = np.empty((y_pos, 4, 2))
+        verts[:, 0, 0] = verts[:, 1, 0] = x
+        verts[:, 2, 0] = verts[:, 3, 0] = x + widths
+        verts[:, 0, 1] = verts[:, 3, 1] = y - 0.3
+        verts[:, 1, 1] = verts[:, 2, 1] = y + 0.3
+        for section in pd.unique(row_sections):
+            mask = row_sections == section
+            ax.add_collection(
+                PolyCollection(
+                    verts[mask],
+                    facecolors=color_map.get(section, "gray"),
+                    edgecolors="black",
+                    linewidths=1,
+                    alpha=0.8,
+                ),
+                autolim=True,
+            )
+        ax.xaxis_date()
+        ax.autoscale_view()
+
+        stride = -(-y_pos // MAX_TIMELINE_LABELS) if y_pos else 1
+        y_labels = [
+            f"{section} - {task_name}"
+            for section, task_name in zip(
+                row_sections[::stride], df["task"].to_numpy()[::stride]
+            )
+        ]
+        ax.set_yticks(y[::stride])
+        ax.set_yticklabels(y_labels, fontsize=9)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+        plt.xticks(rotation=45, ha="right")
+
+        ax.set_xlabel("Date", fontsize=11, weight="bold")
+        ax.set_ylabel("Tasks", fontsize=11, weight="bold")
+        ax.set_title("Project Timeline (Gantt Chart)", fontsize=14, weight="bold")
+        ax.grid(True, axis="x", alpha=0.3)
+
+        ax.set_ylim(-1, y_pos)
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        plt.tight_layout()
+        plt.savefig(str(output_path), dpi=100, bbox_inches="tight")
+        plt.close(fig)
+        return str(output_path)
+    except Exception as e:
+        print(f"Timeline PNG generation error: {e}")
+        traceback.print_exc()
+        return None
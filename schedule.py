@@ -0,0 +1,227 @@
+"""
+Schedule - ワークフローのクリティカルパスと余裕日数（トポロジカル順の前進・後退計算、O(V + E)）
+
+- depends_on は先行ノード（validation の期限矛盾チェックと同じく、依存先が先に終わる）
+- 各ノードの作業期間は start / end があれば end - start、無ければ期限付きのマイルストーンとして
+  先行ノードの予定日（end または deadline）の最大値から自分の予定日まで（先行が無ければ 0 日）
+- 前進計算: 最早開始 = 先行の最早終了の最大値（先行が無ければ start、予定日、全体の最初の日付の順）
+- 後退計算: 最遅終了 = 自分の期限（deadline または end）と後続の最遅開始の最小値
+  （どちらも無ければ全体の最早終了の最大値）
+- 余裕日数（total slack）= 最遅終了 - 最早終了。負の値は期限に間に合わないことを示す
+- 余裕日数が最小のノードがクリティカル。critical_path はその中で最も遅く終わるノードから、
+  最早開始を決めた先行ノードを辿った1本の経路
+- サイクル上のノードとその下流は順序が決まらないため unscheduled として計算から外す
+- 日付は内部では序数（int）で扱い、同じ日付文字列は1回だけパースする
+"""
+
+from datetime import date, datetime
+
+from validation import DATE_FORMAT
+
+
+def _ordinal(value, cache):
+    """YYYY-MM-DD → 序数（不正・未設定は None）"""
+    try:
+        return cache[value]
+    except KeyError:
+        try:
+            parsed = datetime.strptime(value, DATE_FORMAT).toordinal()
+        except (TypeError, ValueError):
+            parsed = None
+        cache[value] = parsed
+        return parsed
+    except TypeError:
+        return None
+
+
+class Schedule:
+    """compute_schedule() の結果
+
+    earliest_start / earliest_finish / latest_start / latest_finish / slack は
+    id → 序数または日数。critical はクリティカルなノード id の集合。
+    """
+
+    def __init__(self):
+        self.order = []
+        self.earliest_start = {}
+        self.earliest_finish = {}
+        self.latest_start = {}
+        self.latest_finish = {}
+        self.slack = {}
+        self.critical = frozenset()
+        self.critical_path = []
+        self.unscheduled = []
+        self.min_slack = None
+        self.project_start = None
+        self.project_finish = None
+        self._dict = None
+
+    def as_dict(self):
+        """JSON 用の辞書（日付は YYYY-MM-DD。初回だけ組み立てる）"""
+        if self._dict is None:
+            iso = {}
+
+            def to_iso(ordinal):
+                if ordinal is None:
+                    return None
+                value = iso.get(ordinal)
+                if value is None:
+                    value = iso[ordinal] = date.fromordinal(ordinal).isoformat()
+                return value
+
+            self._dict = {
+                "project_start": to_iso(self.project_start),
+                "project_finish": to_iso(self.project_finish),
+                "min_slack": self.min_slack,
+                "critical_path": self.critical_path,
+                "unscheduled": self.unscheduled,
+                "nodes": {
+                    node_id: {
+                        "earliest_start": to_iso(self.earliest_start[node_id]),
+                        "earliest_finish": to_iso(self.earliest_finish[node_id]),
+                        "latest_start": to_iso(self.latest_start[node_id]),
+                        "latest_finish": to_iso(self.latest_finish[node_id]),
+                        "slack": self.slack[node_id],
+                        "critical": node_id in self.critical,
+                    }
+                    for node_id in self.order
+                },
+            }
+        return self._dict
+
+
+def compute_schedule(nodes):
+    """ノード列から最早・最遅日程、余裕日数、クリティカルパスを計算する
+
+    id が重複している場合は validate_workflow() と同じく後勝ち。
+    日付を持つノードが1つも無い場合は全ノードが unscheduled になる。
+    """
+    node_by_id = {node["id"]: node for node in nodes}
+    date_cache = {}
+
+    # 依存グラフ（存在する依存先のみ・重複なし）と日付
+    predecessors = {}
+    successors = {node_id: [] for node_id in node_by_id}
+    start_of = {}
+    planned = {}  # 予定日（end または deadline）
+    due = {}  # 期限（deadline または end）
+    first = None
+    for node_id, node in node_by_id.items():
+        preds = [dep_id for dep_id in node.get("depends_on", ()) if dep_id in successors]
+        if len(preds) > 1 and len(set(preds)) < len(preds):
+            preds = list(dict.fromkeys(preds))
+        predecessors[node_id] = preds
+        for dep_id in preds:
+            successors[dep_id].append(node_id)
+
+        deadline = _ordinal(node.get("deadline"), date_cache)
+        end = _ordinal(node.get("end"), date_cache)
+        start = _ordinal(node.get("start"), date_cache)
+        start_of[node_id] = start
+        planned[node_id] = finish = deadline if end is None else end
+        due[node_id] = end if deadline is None else deadline
+        for known in (start, finish):
+            if known is not None and (first is None or known < first):
+                first = known
+
+    schedule = Schedule()
+    if first is None:
+        schedule.unscheduled = list(node_by_id)
+        return schedule
+
+    # トポロジカル順（Kahn 法、入力順を保つ）に前進計算
+    duration = {}
+    es = schedule.earliest_start
+    ef = schedule.earliest_finish
+    indegree = {node_id: len(preds) for node_id, preds in predecessors.items()}
+    order = [node_id for node_id, count in indegree.items() if count == 0]
+    for node_id in order:
+        preds = predecessors[node_id]
+        start = start_of[node_id]
+        finish = planned[node_id]
+        if start is not None and finish is not None:
+            length = finish - start if finish > start else 0
+        elif finish is not None:
+            pred_finish = None
+            for p in preds:
+                value = planned[p]
+                if value is not None and (pred_finish is None or value > pred_finish):
+                    pred_finish = value
+            if pred_finish is not None and finish > pred_finish:
+                length = finish - pred_finish
+            else:
+                length = 0
+        else:
+            length = 0
+        duration[node_id] = length
+        if preds:
+            begin = max([ef[p] for p in preds])
+        elif start is not None:
+            begin = start
+        elif finish is not None:
+            begin = finish - length
+        else:
+            begin = first
+        es[node_id] = begin
+        ef[node_id] = begin + length
+
+        for succ in successors[node_id]:
+            indegree[succ] -= 1
+            if not indegree[succ]:
+                order.append(succ)
+
+    # 後退計算
+    project_finish = max(ef.values(), default=first)
+    ls = schedule.latest_start
+    lf = schedule.latest_finish
+    slack = schedule.slack
+    min_slack = None
+    for node_id in reversed(order):
+        latest = due[node_id]
+        for succ in successors[node_id]:
+            succ_start = ls.get(succ)
+            if succ_start is not None and (latest is None or succ_start < latest):
+                latest = succ_start
+        if latest is None:
+            latest = project_finish
+        lf[node_id] = latest
+        ls[node_id] = latest - duration[node_id]
+        slack[node_id] = node_slack = latest - ef[node_id]
+        if min_slack is None or node_slack < min_slack:
+            min_slack = node_slack
+
+    # クリティカルパス（最も遅く終わるクリティカルなノード（同じならトポロジカル順で後ろ）から、
+    # 開始を決めた先行を辿る）
+    critical = frozenset(
+        node_id for node_id, node_slack in slack.items() if node_slack == min_slack
+    )
+    path = []
+    current = max(
+        (node_id for node_id in reversed(order) if node_id in critical),
+        key=ef.__getitem__,
+        default=None,
+    )
+    while current is not None:
+        path.append(current)
+        current = next(
+            (
+                p
+                for p in predecessors[current]
+                if p in critical and ef[p] == es[current]
+            ),
+            None,
+        )
+    path.reverse()
+
+    schedule.order = order
+    schedule.critical = critical
+    schedule.critical_path = path
+    if len(order) < len(node_by_id):
+        scheduled = set(order)
+        schedule.unscheduled = [
+            node_id for node_id in node_by_id if node_id not in scheduled
+        ]
+    schedule.min_slack = min_slack
+    schedule.project_start = first
+    schedule.project_finish = project_finish
+    return schedule
@@ -0,0 +1,401 @@
+"""
+SQLite Store - 大きな workflow 向けの SQLite バックエンド（標準ライブラリ sqlite3）
+
+- WorkflowStore（JSON）と同じインターフェース。workflow_store.open_workflow_store() で
+  拡張子 .sqlite / .sqlite3 / .db のパスを渡すとこちらが使われる
+- nodes（ノード本体）と edges（依存関係）のテーブルを持ち、section / deadline /
+  depends_on にインデックスを張る。セクション単位の取得・単一ノードの取得と更新・
+  「X に依存しているノード」の問い合わせは全件を読まずにインデックスで引く
+- 書き込みは1トランザクション（WAL モード）。プロセス間の排他と原子性は SQLite に任せる
+- 全体のスナップショットは DAG 描画や検証など全ノードが必要な時だけ読み込み、
+  version が変わるまで再利用する
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+from workflow_store import VersionConflict, WorkflowSnapshot, _copy_node, merge_patch
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    section TEXT NOT NULL DEFAULT '',
+    deadline TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS nodes_position ON nodes(position);
+CREATE INDEX IF NOT EXISTS nodes_section ON nodes(section, position);
+CREATE INDEX IF NOT EXISTS nodes_deadline ON nodes(deadline);
+CREATE TABLE IF NOT EXISTS edges (
+    node_id TEXT NOT NULL,
+    depends_on TEXT NOT NULL,
+    PRIMARY KEY (node_id, depends_on)
+);
+CREATE INDEX IF NOT EXISTS edges_depends_on ON edges(depends_on);
+"""
+
+
+def _node_row(node, position):
+    return (
+        node["id"],
+        position,
+        node.get("section", "") or "",
+        node.get("deadline", "") or "",
+        json.dumps(node, ensure_ascii=False),
+    )
+
+
+def _edge_rows(node):
+    return [(node["id"], dep) for dep in dict.fromkeys(node.get("depends_on", [])) if dep]
+
+
+class SqliteWorkflowStore:
+    """SQLite ファイルに workflow を保存するストア"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._snapshot = None
+
+    def _connection(self):
+        """スレッドごとの接続（初回にスキーマを作成）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # トランザクションは BEGIN で明示的に開始する
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _write(self):
+        """書き込みトランザクション（他プロセスの書き込みとは SQLite のロックで直列化）"""
+        return _Transaction(self._connection(), "BEGIN IMMEDIATE")
+
+    @staticmethod
+    def _read_version(conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return json.loads(row[0]) if row else 0
+
+    def _stamp(self, version):
+        # JSON ストアの (ファイル stamp, 共有世代番号) に合わせる。世代番号は version
+        return (None, version)
+
+    def snapshot(self):
+        """現在のスナップショットを返す（version が変わっていれば再読み込み）"""
+        current = self._snapshot
+        conn = self._connection()
+        if current is not None and current.stamp == self._stamp(
+            self._read_version(conn)
+        ):
+            return current
+
+        with self._lock:
+            with _Transaction(conn, "BEGIN"):
+                # 1つの読み取りトランザクションで meta とノードを揃えて読む
+                version = self._read_version(conn)
+                current = self._snapshot
+                if current is not None and current.stamp == self._stamp(version):
+                    return current
+                workflow = {
+                    key: json.loads(value)
+                    for key, value in conn.execute("SELECT key, value FROM meta")
+                }
+                # 行ごとに json.loads するより、配列にまとめて1回でパースする方が速い
+                (nodes_json,) = conn.execute(
+                    "SELECT '[' || coalesce(group_concat(data, ','), '') || ']' "
+                    "FROM (SELECT data FROM nodes ORDER BY position)"
+                ).fetchone()
+                workflow["nodes"] = json.loads(nodes_json)
+            self._snapshot = WorkflowSnapshot.build(workflow, self._stamp(version))
+            return self._snapshot
+
+    def save(self, workflow, base_version=None):
+        """workflow 全体を書き込む
+
+        version は現在の値（と workflow 側の値の大きい方）+ 1。
+        base_version が現在の version と異なれば VersionConflict、
+        id の重複は ValueError。
+        """
+        workflow = dict(workflow)
+        workflow["nodes"] = [_copy_node(n) for n in workflow.get("nodes", [])]
+        seen = set()
+        for node in workflow["nodes"]:
+            if node["id"] in seen:
+                raise ValueError(f"Duplicate node id: {node['id']}")
+            seen.add(node["id"])
+
+        with self._lock, self._write() as conn:
+            current = self._read_version(conn)
+            if base_version is not None and base_version != current:
+                raise VersionConflict(base_version, current)
+            workflow["version"] = max(current, workflow.get("version", 0)) + 1
+
+            conn.execute("DELETE FROM edges")
+            conn.execute("DELETE FROM nodes")
+            conn.execute("DELETE FROM meta")
+            conn.executemany(
+                "INSERT INTO nodes (id, position, section, deadline, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (_node_row(node, i) for i, node in enumerate(workflow["nodes"])),
+            )
+            conn.executemany(
+                "INSERT INTO edges (node_id, depends_on) VALUES (?, ?)",
+                (row for node in workflow["nodes"] for row in _edge_rows(node)),
+            )
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                (
+                    (key, json.dumps(value, ensure_ascii=False))
+                    for key, value in workflow.items()
+                    if key != "nodes"
+                ),
+            )
+            version = workflow["version"]
+
+        with self._lock:
+            self._snapshot = WorkflowSnapshot.build(workflow, self._stamp(version))
+            return self._snapshot
+
+    def apply_patch(self, patches, base_version=None):
+        """ノード単位のパッチ（id → merge patch）を適用する
+
+        対象ノードの行だけを読み書きする。存在しない id は KeyError、
+        不正なパッチは ValueError、base_version が古ければ VersionConflict。
+        更新後のノードのリストを返す。
+        """
+        with self._lock, self._write() as conn:
+            current = self._read_version(conn)
+            if base_version is not None and base_version != current:
+                raise VersionConflict(base_version, current)
+            changed = {}
+            for node_id, patch in patches.items():
+                node = changed.get(node_id) or self._select_node(conn, node_id)
+                if node is None:
+                    raise KeyError(node_id)
+                changed[node_id] = merge_patch(node, patch)
+            if not changed:
+                return []
+
+            version = current + 1
+            for node_id, node in changed.items():
+                conn.execute(
+                    "UPDATE nodes SET section = ?, deadline = ?, data = ? WHERE id = ?",
+                    (
+                        node.get("section", "") or "",
+                        node.get("deadline", "") or "",
+                        json.dumps(node, ensure_ascii=False),
+                        node_id,
+                    ),
+                )
+                conn.execute("DELETE FROM edges WHERE node_id = ?", (node_id,))
+                conn.executemany(
+                    "INSERT INTO edges (node_id, depends_on) VALUES (?, ?)",
+                    _edge_rows(node),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                (json.dumps(version),),
+            )
+
+        with self._lock:
+            # 読み込み済みのスナップショットが直前の version なら差分だけ反映
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.stamp == self._stamp(current):
+                self._snapshot = snapshot.with_changes(
+                    changed,
+                    stamp=self._stamp(version),
+                    meta=MappingProxyType(dict(snapshot.meta, version=version)),
+                )
+        return list(changed.values())
+
+    def import_nodes(self, node_batches, base_version=None):
+        """ノードのバッチ列で workflow 全体を置き換える（一括インポート）
+
+        1トランザクションでバッチごとに挿入するので、保持するのは1バッチ分だけ。
+        途中で例外が出た場合はロールバックする。meta は version 以外を引き継ぐ。
+        (取り込んだノード数, 新しい version) を返す。
+        """
+        with self._lock, self._write() as conn:
+            current = self._read_version(conn)
+            if base_version is not None and base_version != current:
+                raise VersionConflict(base_version, current)
+            version = current + 1
+
+            conn.execute("DELETE FROM edges")
+            conn.execute("DELETE FROM nodes")
+            count = 0
+            for batch in node_batches:
+                rows = [_node_row(node, count + i) for i, node in enumerate(batch)]
+                try:
+                    conn.executemany(
+                        "INSERT INTO nodes (id, position, section, deadline, data) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                except sqlite3.IntegrityError as e:
+                    raise ValueError(f"Duplicate node id: {e}") from e
+                conn.executemany(
+                    "INSERT INTO edges (node_id, depends_on) VALUES (?, ?)",
+                    (row for node in batch for row in _edge_rows(node)),
+                )
+                count += len(rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                (json.dumps(version),),
+            )
+
+        with self._lock:
+            # スナップショットは次のアクセスで読み直す
+            self._snapshot = None
+        return count, version
+
+    def iter_nodes(self, batch_size=1000):
+        """全ノードを workflow 内の順序で返す（一括エクスポート用）
+
+        専用の接続の読み取りトランザクションで batch_size 行ずつ読むので、
+        途中で書き込みがあっても一貫した内容を返し、全件をメモリに載せない。
+        """
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            with _Transaction(conn, "BEGIN"):
+                cursor = conn.execute("SELECT data FROM nodes ORDER BY position")
+                while rows := cursor.fetchmany(batch_size):
+                    for (data,) in rows:
+                        yield json.loads(data)
+        finally:
+            conn.close()
+
+    def compact(self):
+        """変更ログは持たないので何もしない（JSON ストアとの互換用）"""
+
+    def invalidate(self):
+        """次回アクセス時に強制的に再読み込みさせる"""
+        with self._lock:
+            self._snapshot = None
+
+    # ==================== 問い合わせ（インデックスで引く） ====================
+
+    @staticmethod
+    def _select_node(conn, node_id):
+        row = conn.execute("SELECT data FROM nodes WHERE id = ?", (node_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_node(self, node_id):
+        """id のノード（無ければ None）"""
+        return self._select_node(self._connection(), node_id)
+
+    def section_nodes(self, section):
+        """section に属するノード（workflow 内の順序）"""
+        return tuple(
+            json.loads(data)
+            for (data,) in self._connection().execute(
+                "SELECT data FROM nodes WHERE section = ? ORDER BY position",
+                (section,),
+            )
+        )
+
+    def sections(self):
+        """空でないセクション名の一覧（ソート済み）"""
+        return [
+            section
+            for (section,) in self._connection().execute(
+                "SELECT DISTINCT section FROM nodes WHERE section != '' ORDER BY section"
+            )
+        ]
+
+    def dependents(self, node_id):
+        """node_id に依存しているノードの id（workflow 内の順序）"""
+        return [
+            dependent
+            for (dependent,) in self._connection().execute(
+                "SELECT edges.node_id FROM edges "
+                "JOIN nodes ON nodes.id = edges.node_id "
+                "WHERE edges.depends_on = ? ORDER BY nodes.position",
+                (node_id,),
+            )
+        ]
+
+    def nodes_page(self, offset, limit, section=None):
+        """(offset から limit 件のノード, 対象の総数)。section 指定時はそのセクション内"""
+        conn = self._connection()
+        with _Transaction(conn, "BEGIN"):
+            if section is None:
+                (total,) = conn.execute("SELECT COUNT(*) FROM nodes").fetchone()
+                # position は 0 からの連番なので OFFSET を使わずインデックスで位置決め
+                rows = conn.execute(
+                    "SELECT data FROM nodes WHERE position >= ? "
+                    "ORDER BY position LIMIT ?",
+                    (offset, limit),
+                )
+            else:
+                (total,) = conn.execute(
+                    "SELECT COUNT(*) FROM nodes WHERE section = ?", (section,)
+                ).fetchone()
+                rows = conn.execute(
+                    "SELECT data FROM nodes WHERE section = ? ORDER BY position "
+                    "LIMIT ? OFFSET ?",
+                    (section, limit, offset),
+                )
+            nodes = tuple(json.loads(data) for (data,) in rows)
+        return nodes, total
+
+    def search_nodes(self, query, limit):
+        """id かラベルに query を含むノードを最大 limit 件（前方一致を優先）
+
+        query が空なら workflow 内の順序で先頭から返す。
+        """
+        conn = self._connection()
+        query = query.strip().lower()
+        if not query:
+            rows = conn.execute(
+                "SELECT data FROM nodes ORDER BY position LIMIT ?", (limit,)
+            )
+            return [json.loads(data) for (data,) in rows]
+
+        # LIKE のワイルドカードをエスケープ（ASCII の大文字小文字は LIKE が無視する）
+        escaped = (
+            query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        rows = conn.execute(
+            """
+            SELECT data FROM (
+                SELECT data, position, id AS key_id,
+                       coalesce(json_extract(data, '$.label'), '') AS key_label
+                FROM nodes
+            )
+            WHERE key_id LIKE :partial ESCAPE '\\'
+               OR key_label LIKE :partial ESCAPE '\\'
+            ORDER BY (key_id LIKE :prefix ESCAPE '\\'
+                      OR key_label LIKE :prefix ESCAPE '\\') DESC, position
+            LIMIT :limit
+            """,
+            {"partial": f"%{escaped}%", "prefix": f"{escaped}%", "limit": limit},
+        )
+        return [json.loads(data) for (data,) in rows]
+
+
+class _Transaction:
+    """BEGIN 〜 COMMIT / ROLLBACK を with 文で扱う"""
+
+    def __init__(self, conn, begin):
+        self.conn = conn
+        self.begin = begin
+
+    def __enter__(self):
+        self.conn.execute(self.begin)
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
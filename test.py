@@ -2,13 +2,13 @@ import dash
 from dash import dcc, html, Input, Output, State, ctx, dash_table
 import plotly.graph_objects as go
 import plotly.express as px
-import pandas as pd
-from datetime import datetime, date, timedelta
+from datetime import date
 import webbrowser
 from threading import Timer
-import re
 import uuid
 
+from mermaid_gantt import parse_gantt, serialize_gantt
+
 app = dash.Dash(__name__, title="Engineering Schedule Editor")
 
 # --- 1. 現行データ (Initial Data) ---
@@ -239,37 +239,25 @@ def update_store(add_n, upd_n, del_n, up_n, down_n, parse_n, selected_data, acti
         return tasks, [active_cell['row']]
 
     if trig == 'gantt-graph' and click_data:
+        # 点の customdata（タスク id）から行を引く
         try:
-            point = click_data['points'][0]
-            y_pos = point.get('y', 0)
-            if isinstance(y_pos, (int, float)):
-                task_idx = len(tasks) - 1 - int(y_pos)
-                if 0 <= task_idx < len(tasks):
-                    return tasks, [task_idx]
+            task_id = click_data['points'][0].get('customdata')
+            index = {t['id']: i for i, t in enumerate(tasks)}
+            if task_id in index:
+                return tasks, [index[task_id]]
         except: pass
         return tasks, selected_rows
 
     if trig == 'btn-parse':
-        lines = m_code.split('\n')
-        parsed = []
-        curr_sec = "Default"
-        cnt = 1
-        for line in lines:
-            line = line.strip()
-            if line.startswith('section'): curr_sec = line.replace('section', '').strip()
-            elif ':' in line:
-                parts = line.split(':')
-                tn = parts[0].strip()
-                rem = parts[1].strip()
-                tokens = [t.strip() for t in rem.split(',')]
-                dates = [t for t in tokens if re.match(r'\d{4}-\d{2}-\d{2}', t)]
-                ids = [t for t in tokens if not re.match(r'\d{4}-\d{2}-\d{2}', t) and not t.startswith('after')]
-                if len(dates) >= 1:
-                    s = dates[0]
-                    e = dates[1] if len(dates) > 1 else s
-                    tid = ids[0] if ids else f"id{cnt}"
-                    parsed.append({"id": tid, "section": curr_sec, "task": tn, "start": s, "end": e, "next_to": "", "doc": "", "action": "", "lesson": ""})
-                    cnt += 1
+        gantt_tasks = parse_gantt(m_code or "")
+        parsed = [{"id": t["id"], "section": t["section"], "task": t["task"], "start": t["start"], "end": t["end"], "next_to": "", "doc": "", "action": "", "lesson": ""}
+                  for t in gantt_tasks]
+        # Mermaid の after（依存先）を next_to（後続タスク）に読み替える
+        by_id = {t["id"]: t for t in parsed}
+        for t in gantt_tasks:
+            for dep in t["depends_on"]:
+                if dep in by_id and not by_id[dep]["next_to"]:
+                    by_id[dep]["next_to"] = t["id"]
         return (parsed, []) if parsed else (tasks, selected_rows)
 
     new_tasks = tasks[:]
@@ -297,96 +285,176 @@ def update_store(add_n, upd_n, del_n, up_n, down_n, parse_n, selected_data, acti
             
     return tasks, selected_rows
 
-@app.callback(
-    [Output('gantt-graph', 'figure'), Output('task-table', 'data'), Output('mermaid-output', 'value')],
-    [Input('task-store', 'data')]
-)
-def update_view(tasks):
-    if not tasks: return go.Figure(), [], ""
-    df = pd.DataFrame(tasks)
-    df_rev = df.iloc[::-1].reset_index(drop=True)
-    fig = go.Figure()
-    sections = df['section'].unique()
+# --- ガントチャート ---
+# セクションごと・種別（期間バー / マイルストーン）ごとに1トレースにまとめ、点は配列で持つ。
+# 1タスクの編集では Patch() で変わった点と矢印だけを送る
+DAY_MS = 24 * 60 * 60 * 1000
+TXT_FONT = dict(size=11, family='Arial, sans-serif')  # フォントサイズは少し小さめに
+# 変更行がこれを超えたら差分ではなく図全体を送る
+PATCH_MAX_ROWS = 50
+
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def task_point(t, y):
+    """1タスク分の点（日付が不正なら None）"""
+    d_start, d_end = parse_day(t.get('start')), parse_day(t.get('end'))
+    if d_start is None or d_end is None: return None
+    lesson = t.get('lesson', '') or ''
+    point = {'id': t['id'], 'y': y, 'start': t['start'], 'end': t['end'],
+             'hover': f"<b>{t['task']}</b> ({t['section']})<br>{t['start']} - {t['end']}<br>{lesson}"}
+    duration = (d_end - d_start).days
+    if duration <= 0:
+        point['kind'] = 'milestone'
+        point['text'] = f"{d_start:%m/%d}" + (f"<br>{lesson}" if lesson else "")
+    else:
+        point['kind'] = 'bar'
+        point['length'] = (duration + 1) * DAY_MS  # 日付軸のバーの長さはミリ秒
+        point['text'] = f"{d_start:%m/%d}-{d_end:%m/%d}" + (f": {lesson}" if lesson else "")
+    return point
+
+
+def build_traces(tasks):
+    """(セクション, 種別) → 点のリスト。先頭のタスクが一番上（y が大きい）"""
+    n = len(tasks)
+    groups = {}
+    for i, t in enumerate(tasks):
+        point = task_point(t, n - 1 - i)
+        if point: groups.setdefault((t['section'], point['kind']), []).append(point)
+    return groups
+
+
+def trace_signature(groups):
+    """トレースの構成（どのトレースのどの位置にどのタスクがあるか）"""
+    return [(key, [p['id'] for p in points]) for key, points in groups.items()]
+
+
+def point_arrays(kind, points):
+    """トレースの配列プロパティ"""
+    arrays = {'text': [p['text'] for p in points], 'hovertext': [p['hover'] for p in points]}
+    if kind == 'milestone':
+        arrays['x'] = [p['start'] for p in points]
+    else:
+        arrays['x'] = [p['length'] for p in points]
+        arrays['base'] = [p['start'] for p in points]
+    return arrays
+
+
+def build_annotations(tasks, groups):
+    """next_to の矢印（座標は id のインデックスから引く）"""
+    coords = {p['id']: p for points in groups.values() for p in points}
+    annotations = []
+    for t in tasks:
+        src, tgt = coords.get(t['id']), coords.get(t.get('next_to'))
+        if src and tgt:
+            annotations.append(dict(
+                x=tgt['start'], y=tgt['y'], xref="x", yref="y",
+                ax=src['end'], ay=src['y'], axref="x", ayref="y",
+                showarrow=True, arrowhead=2, arrowsize=1, arrowwidth=1, arrowcolor="#555"
+            ))
+    return annotations
+
+
+def y_labels(tasks):
+    return [f"<b>[{t['section']}]</b> {t['task']}" for t in reversed(tasks)]
+
+
+def build_figure(tasks, groups):
+    sections = list(dict.fromkeys(t['section'] for t in tasks))
     colors = px.colors.qualitative.Plotly
     color_map = {s: colors[i % len(colors)] for i, s in enumerate(sections)}
-    id_to_coords = {} 
-    y_labels = []
-    
-    for i, row in df_rev.iterrows():
-        y_pos = i
-        sec = row['section']
-        task_name = row['task']
+    fig = go.Figure()
+    for (sec, kind), points in groups.items():
         c = color_map.get(sec, 'gray')
-        y_labels.append(f"<b>[{sec}]</b> {task_name}")
-        try:
-            d_start = pd.to_datetime(row['start'])
-            d_end = pd.to_datetime(row['end'])
-            s_str = d_start.strftime('%m/%d')
-            e_str = d_end.strftime('%m/%d')
-        except:
-            y_labels.pop()
-            continue
-        id_to_coords[row['id']] = {"x_start": d_start, "x_end": d_end, "y": y_pos}
-        duration = (d_end - d_start).days
-        hover_text = f"<b>{task_name}</b> ({sec})<br>{row['start']} - {row['end']}<br>{row.get('lesson', '')}"
-        lesson_txt = row.get('lesson', '')
-        
-        # フォントサイズは少し小さめに
-        txt_font = dict(size=11, family='Arial, sans-serif')
-        
-        if duration <= 0:
-            disp_text = f"{s_str}"
-            if lesson_txt: disp_text += f"<br>{lesson_txt}"
+        common = dict(y=[p['y'] for p in points], customdata=[p['id'] for p in points],
+                      textfont=TXT_FONT, name=sec, showlegend=False, hoverinfo='text',
+                      **point_arrays(kind, points))
+        if kind == 'milestone':
             fig.add_trace(go.Scatter(
-                x=[d_start], y=[y_pos], mode='markers+text',
-                marker=dict(symbol='diamond', size=14, color=c, line=dict(width=1, color='black')),
-                text=[disp_text], textposition="bottom center", textfont=txt_font,
-                name=sec, showlegend=False, hoverinfo='text', hovertext=hover_text, customdata=[row['id']]
+                mode='markers+text', marker=dict(symbol='diamond', size=14, color=c, line=dict(width=1, color='black')),
+                textposition="bottom center", **common
             ))
         else:
-            disp_text = f"{s_str}-{e_str}"
-            if lesson_txt: disp_text += f": {lesson_txt}"
             fig.add_trace(go.Bar(
-                x=[duration + 1], y=[y_pos], base=[d_start], orientation='h',
-                marker=dict(color=c, opacity=0.8, line=dict(width=1, color=c)),
-                text=[disp_text], textposition='outside', cliponaxis=False, textfont=txt_font,
-                name=sec, showlegend=False, hoverinfo='text', hovertext=hover_text, customdata=[row['id']]
-            ))
-
-    annotations = []
-    for t_id, coords in id_to_coords.items():
-        task_data = next((t for t in tasks if t.get("id") == t_id), None)
-        if not task_data: continue
-        target_id = task_data.get("next_to")
-        if target_id and target_id in id_to_coords:
-            tgt = id_to_coords[target_id]
-            src = coords
-            annotations.append(dict(
-                x=tgt["x_start"], y=tgt["y"], xref="x", yref="y",
-                ax=src["x_end"], ay=src["y"], axref="x", ayref="y",
-                showarrow=True, arrowhead=2, arrowsize=1, arrowwidth=1, arrowcolor="#555"
+                orientation='h', marker=dict(color=c, opacity=0.8, line=dict(width=1, color=c)),
+                textposition='outside', cliponaxis=False, **common
             ))
 
     fig.update_layout(
         title={'text': "Project Schedule", 'y':0.98, 'x':0.5, 'xanchor': 'center', 'font': {'size': 18}}, 
         xaxis=dict(type='date', side='top', gridcolor='#eee', showgrid=True, tickfont=dict(size=11)),
-        yaxis=dict(tickmode='array', tickvals=list(range(len(y_labels))), ticktext=y_labels, showgrid=True, gridcolor='#f5f5f5', automargin=True, tickfont=dict(size=11)),
+        yaxis=dict(tickmode='array', tickvals=list(range(len(tasks))), ticktext=y_labels(tasks), showgrid=True, gridcolor='#f5f5f5', automargin=True, tickfont=dict(size=11)),
+        annotations=build_annotations(tasks, groups),
         plot_bgcolor='white',
         autosize=True, # 自動調整
         margin=dict(l=10, r=10, t=60, b=10), # 余白削減
         showlegend=False,
         hoverlabel=dict(bgcolor="white", font_size=12)
     )
-    
-    lines = ["gantt", "    dateFormat YYYY-MM-DD", "    title Gantt Chart"]
-    curr_sec = None
+    return fig
+
+
+def figure_patch(shown, tasks, groups):
+    """表示中の図（shown のタスクから描いたもの）を tasks に合わせる Patch
+
+    トレースの構成が変わらず、変更行が PATCH_MAX_ROWS 以下の時だけ作る（それ以外は None）。
+    """
+    if len(shown) != len(tasks): return None
+    changed = [i for i, (old, new) in enumerate(zip(shown, tasks)) if old != new]
+    if len(changed) > PATCH_MAX_ROWS: return None
+    old_groups = build_traces(shown)
+    if trace_signature(old_groups) != trace_signature(groups): return None
+
+    patch = dash.Patch()
+    changed_ids = {tasks[i]['id'] for i in changed}
+    for ti, ((sec, kind), points) in enumerate(groups.items()):
+        for pi, p in enumerate(points):
+            if p['id'] not in changed_ids: continue
+            for prop, values in point_arrays(kind, [p]).items():
+                patch['data'][ti][prop][pi] = values[0]
+    n = len(tasks)
+    for i in changed:
+        patch['layout']['yaxis']['ticktext'][n - 1 - i] = y_labels([tasks[i]])[0]
+
+    old_annotations = build_annotations(shown, old_groups)
+    annotations = build_annotations(tasks, groups)
+    if len(old_annotations) != len(annotations):
+        patch['layout']['annotations'] = annotations
+    else:
+        for ai, (old, new) in enumerate(zip(old_annotations, annotations)):
+            if old != new: patch['layout']['annotations'][ai] = new
+    return patch
+
+
+@app.callback(
+    [Output('gantt-graph', 'figure'), Output('task-table', 'data'), Output('mermaid-output', 'value')],
+    [Input('task-store', 'data')],
+    [State('task-table', 'data')]
+)
+def update_view(tasks, shown):
+    if not tasks: return go.Figure(), [], ""
+    groups = build_traces(tasks)
+
+    # next_to（後続タスク）を Mermaid の after（依存先）に読み替える
+    depends_on = {}
     for t in tasks:
-        if t['section'] != curr_sec:
-            curr_sec = t['section']
-            lines.append(f"    section {curr_sec}")
-        lines.append(f"    {t['task']} : {t['id']}, {t['start']}, {t['end']}")
+        if t.get('next_to'): depends_on.setdefault(t['next_to'], []).append(t['id'])
+    mermaid_code = serialize_gantt(dict(t, depends_on=depends_on.get(t['id'], [])) for t in tasks)
+
+    # task-table には直前に描いたタスクが入っている。初回表示（図が未描画）は全体を送る
+    patch = figure_patch(shown, tasks, groups) if ctx.triggered_id and shown else None
+    if patch is None:
+        return build_figure(tasks, groups), tasks, mermaid_code
 
-    return fig, tasks, "\n".join(lines)
+    table = dash.Patch()
+    for i, (old, new) in enumerate(zip(shown, tasks)):
+        if old != new: table[i] = new
+    return patch, table, mermaid_code
 
 @app.callback(
     [Output('input-section', 'value'), Output('input-task', 'value'), Output('input-start', 'value'), Output('input-end', 'value'), Output('input-next', 'value'),
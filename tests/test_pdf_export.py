@@ -0,0 +1,98 @@
+"""pdf_export のバックグラウンド一括変換（ExportJobs）"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("reportlab")
+
+import pdf_export  # noqa: E402
+from pdf_export import ExportJobs  # noqa: E402
+
+
+@pytest.fixture
+def base_dir(tmp_path):
+    docs = tmp_path / "static" / "docs"
+    docs.mkdir(parents=True)
+    (docs / "form_a.md").write_text("# 様式A\n\n- [x] 確認\n", encoding="utf-8")
+    return tmp_path
+
+
+NODES = [{"id": "a", "label": "A", "knowledge_dir": "static/docs"}]
+
+
+def test_export_runs_in_background(base_dir):
+    jobs = ExportJobs(base_dir, workers=1)
+    assert jobs.status() == {"state": "idle"}
+
+    status, started = jobs.start(NODES)
+    assert started
+    assert status["state"] == "running"
+    assert jobs.wait(60)
+
+    status = jobs.status()
+    assert status["state"] == "done"
+    assert status["result"]["exported"] == ["static/docs/form_a.md"]
+    assert "finished_at" in status
+    assert (base_dir / "static" / "docs" / "form_a.pdf").exists()
+
+    # ソースが変わっていなければ変換しない
+    jobs.start(NODES)
+    assert jobs.wait(60)
+    assert jobs.status()["result"] == {"exported": [], "skipped": 1, "failed": []}
+
+
+def test_running_job_is_not_started_twice(base_dir, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_export(nodes, base_dir, force, workers):
+        calls.append(force)
+        release.wait(10)
+        return {"exported": [], "skipped": 0, "failed": []}
+
+    monkeypatch.setattr(pdf_export, "export_knowledge_pdfs", slow_export)
+    jobs = ExportJobs(base_dir)
+    _, started = jobs.start(NODES)
+    assert started
+    status, started = jobs.start(NODES, force=True)
+    assert not started
+    assert status["state"] == "running"
+    release.set()
+    assert jobs.wait(10)
+    assert calls == [False]
+    assert jobs.status()["state"] == "done"
+
+
+def test_concurrent_render_same_output(base_dir):
+    # 同じプロセスの複数スレッドが同じ PDF を書いても一時ファイルを共有しない
+    docs = base_dir / "static" / "docs"
+    source, output = docs / "form_a.md", docs / "form_a.pdf"
+    errors = []
+    barrier = threading.Barrier(4)
+
+    def render():
+        barrier.wait()
+        try:
+            pdf_export.render_markdown_pdf(source, output)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=render) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert output.read_bytes().startswith(b"%PDF")
+    assert sorted(p.name for p in docs.iterdir()) == ["form_a.md", "form_a.pdf"]
+
+
+def test_manifest_is_written_atomically(base_dir):
+    directories = pdf_export.knowledge_dirs(NODES, base_dir)
+    manifest = base_dir / "static" / "pdf_manifest.json"
+    pdf_export.export_pdfs(directories, base_dir, manifest, workers=1)
+
+    assert pdf_export._load_manifest(manifest).keys() == {"static/docs/form_a.md"}
+    assert not list(manifest.parent.glob("pdf_manifest.json.*tmp"))
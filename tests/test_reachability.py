@@ -0,0 +1,54 @@
+"""reachability のビュー（古いスナップショットの問い合わせに新しいグラフを返さない）"""
+
+import pytest
+
+from reachability import ReachabilityIndex
+
+OLD = [
+    {"id": "a", "label": "A"},
+    {"id": "b", "label": "B", "depends_on": ["a"]},
+    {"id": "c", "label": "C", "depends_on": ["b"]},
+]
+# b → c の依存を外し、d を追加
+NEW = [
+    {"id": "a", "label": "A"},
+    {"id": "b", "label": "B", "depends_on": ["a"]},
+    {"id": "c", "label": "C"},
+    {"id": "d", "label": "D", "depends_on": ["c"]},
+]
+
+
+@pytest.mark.parametrize("max_nodes", [0, 100])
+def test_view_answers_for_its_own_nodes(max_nodes):
+    index = ReachabilityIndex(max_nodes=max_nodes)
+    old = index.update(OLD)
+    assert old.downstream("a") == ["b", "c"]
+
+    new = index.update(NEW)
+    assert old.downstream("a") == ["b", "c"]
+    assert old.upstream("c") == ["a", "b"]
+    assert old.reaches("a", "c")
+    assert old.impact("d") is None
+    assert old.impact("b") == {
+        "upstream": ["a"],
+        "downstream": ["c"],
+        "upstream_count": 1,
+        "downstream_count": 1,
+    }
+
+    assert new.downstream("a") == ["b"]
+    assert new.upstream("d") == ["c"]
+    assert not new.reaches("a", "c")
+    # インデックス自体は最後の update() の内容のまま
+    assert index.downstream("a") == ["b"]
+
+
+def test_current_view_uses_shared_index():
+    index = ReachabilityIndex()
+    view = index.update(OLD)
+    view.impact("a")
+    assert view._own is None
+
+    index.update(NEW)
+    view.impact("a")
+    assert view._own is not None
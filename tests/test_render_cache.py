@@ -0,0 +1,67 @@
+"""render_cache の書き込み（同じキーの同時 put と追い出しの走査回数）"""
+
+import os
+import threading
+
+import pytest
+
+import render_cache
+from render_cache import RenderCache
+
+
+def test_concurrent_put_same_key(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    payloads = [bytes([i]) * 200_000 for i in range(8)]
+    errors = []
+    barrier = threading.Barrier(len(payloads))
+
+    def writer(data):
+        barrier.wait()
+        try:
+            for _ in range(20):
+                cache.put("k", ".svg", data)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(data,)) for data in payloads]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # どれか1つの書き込みが丸ごと残る
+    assert cache.get("k", ".svg") in payloads
+    assert os.listdir(cache.directory) == ["k.svg"]
+
+
+def test_put_scans_only_when_over_limit(tmp_path, monkeypatch):
+    cache = RenderCache(tmp_path / "cache", max_bytes=1000)
+    scans = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        scans.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(render_cache.os, "scandir", counting_scandir)
+    for i in range(9):
+        cache.put(f"k{i}", ".png", b"x" * 100)
+    # 最初の put で1回だけ走査
+    assert len(scans) == 1
+    # 同じキーの上書きは増分だけ数える
+    cache.put("k0", ".png", b"x" * 100)
+    assert len(scans) == 1
+
+    cache.put("k9", ".png", b"x" * 300)
+    assert len(scans) == 2
+    total = sum(e.stat().st_size for e in scandir(cache.directory))
+    assert total <= 1000
+    assert cache.get("k9", ".png") is not None
+
+
+def test_failed_put_leaves_no_temp_file(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    with pytest.raises(TypeError):
+        cache.put("k", ".png", object())
+    assert os.listdir(cache.directory) == []
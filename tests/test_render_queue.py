@@ -0,0 +1,69 @@
+"""render_queue の公開処理（キャッシュヒット時に実行中の描画を待たない）"""
+
+import threading
+
+from render_cache import RenderCache
+from render_queue import RenderQueue
+
+
+def _unused_renderer(output_path):
+    raise AssertionError("cache hit must not render")
+
+
+def _queue(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    queue = RenderQueue(cache=cache)
+    queue.register("dag", _unused_renderer, tmp_path / "static" / "dag.png")
+    return queue, cache
+
+
+def test_cache_hit_publishes_while_render_lock_is_held(tmp_path):
+    queue, cache = _queue(tmp_path)
+    key = "a" * 40
+    cache.put(key, ".png", b"cached-png")
+    artifact = queue._artifacts["dag"]
+
+    held = threading.Event()
+    release = threading.Event()
+
+    def render_in_progress():
+        # 別ワーカーが描画中（描画ロックを保持したまま）
+        with artifact.lock:
+            held.set()
+            release.wait(10)
+
+    holder = threading.Thread(target=render_in_progress)
+    holder.start()
+    held.wait(10)
+    try:
+        result = {}
+        submitter = threading.Thread(
+            target=lambda: result.update(generation=queue.submit("dag", key=key, version=1))
+        )
+        submitter.start()
+        submitter.join(5)
+        assert not submitter.is_alive(), "cache-hit publish waited for the render lock"
+        assert result["generation"] == 1
+        assert queue.current("dag") == (1, key[:16])
+        assert artifact.output_path.read_bytes() == b"cached-png"
+        assert queue.status()["dag"]["fresh"]
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_older_generation_does_not_overwrite_newer(tmp_path):
+    queue, _ = _queue(tmp_path)
+    artifact = queue._artifacts["dag"]
+    artifact.output_path.parent.mkdir(parents=True)
+    for generation, data in ((2, b"new"), (1, b"old")):
+        tmp = queue._tmp_path(artifact, f"publish-{generation}")
+        tmp.write_bytes(data)
+        with queue._cond:
+            artifact.publishing += 1
+        queue._publish(artifact, generation, tmp, None, None)
+
+    assert artifact.output_path.read_bytes() == b"new"
+    assert queue.current("dag")[0] == 2
+    assert queue.wait(1)
+    assert not list(artifact.output_path.parent.glob("dag.publish-*"))
@@ -0,0 +1,216 @@
+"""workflow_store のパッチ検証とクラッシュからの復元
+
+- 不正なパッチは変更ログにもストアにも残さない
+- 保存・圧縮・追記の途中で落ちた状態のファイルを作り、再起動（新しいストア）で
+  最後にコミットされた内容と version に戻ることを確かめる
+"""
+
+import json
+
+import pytest
+
+import workflow_store
+from sqlite_store import SqliteWorkflowStore
+from workflow_store import WorkflowStore, _write_json, merge_patch
+
+NODES = [
+    {"id": "a", "label": "企画", "section": "商品A"},
+    {"id": "b", "label": "設計", "section": "商品A", "depends_on": ["a"]},
+]
+
+INVALID_PATCHES = [
+    {"label": None},
+    {"label": 5},
+    {"section": ["商品B"]},
+    {"deadline": 20240101},
+    {"depends_on": "a"},
+    {"decision": "yes"},
+    {"id": "c"},
+]
+
+
+@pytest.fixture(autouse=True)
+def no_background_compaction(monkeypatch):
+    # テスト中にタイマーの圧縮がファイルを書き換えないようにする
+    monkeypatch.setattr(workflow_store, "COMPACT_DELAY", 3600)
+
+
+@pytest.fixture
+def json_store(tmp_path):
+    store = WorkflowStore(tmp_path / "workflow.json")
+    store.save({"nodes": NODES})
+    return store
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SqliteWorkflowStore(tmp_path / "workflow.sqlite")
+    store.save({"nodes": NODES})
+    return store
+
+
+@pytest.mark.parametrize("patch", INVALID_PATCHES)
+def test_merge_patch_rejects_invalid_fields(patch):
+    with pytest.raises(ValueError):
+        merge_patch(NODES[1], patch)
+
+
+def test_merge_patch_deletes_optional_field():
+    assert "section" not in merge_patch(NODES[1], {"section": None})
+
+
+@pytest.mark.parametrize("patch", INVALID_PATCHES)
+def test_rejected_patch_is_not_logged(json_store, patch):
+    version = json_store.snapshot().version
+    with pytest.raises(ValueError):
+        json_store.apply_patch({"a": {"note": "ok"}, "b": patch})
+
+    assert not json_store.changelog.path.exists()
+    assert json_store.snapshot().version == version
+    # 再読み込みしても変わらない
+    json_store.invalidate()
+    snapshot = json_store.snapshot()
+    assert snapshot.version == version
+    assert [dict(node) for node in snapshot.nodes] == NODES
+
+
+@pytest.mark.parametrize("patch", INVALID_PATCHES)
+def test_rejected_patch_is_not_stored_in_sqlite(sqlite_store, patch):
+    version = sqlite_store.snapshot().version
+    with pytest.raises(ValueError):
+        sqlite_store.apply_patch({"a": {"note": "ok"}, "b": patch})
+
+    fresh = SqliteWorkflowStore(sqlite_store.path).snapshot()
+    assert fresh.version == version
+    assert [dict(node) for node in fresh.nodes] == NODES
+
+
+def test_valid_patch_is_logged(json_store):
+    json_store.apply_patch({"b": {"label": "詳細設計", "note": None}})
+
+    assert json_store.changelog.path.exists()
+    json_store.invalidate()
+    assert json_store.get_node("b")["label"] == "詳細設計"
+
+
+# ==================== クラッシュからの復元 ====================
+
+
+def _patched_store(tmp_path):
+    """version 1 で保存し、2 件のパッチ（version 2, 3）を変更ログに持つストア"""
+    store = WorkflowStore(tmp_path / "workflow.json")
+    store.save({"nodes": NODES})
+    store.apply_patch({"a": {"note": "first"}})
+    store.apply_patch({"b": {"note": "second", "section": None}})
+    return store
+
+
+def _restart(store):
+    """プロセスの再起動（ファイルだけを引き継いだ新しいストア）"""
+    return WorkflowStore(store.path)
+
+
+def _state(snapshot):
+    return snapshot.version, {node["id"]: dict(node) for node in snapshot.nodes}
+
+
+PATCHED = {
+    "a": {"id": "a", "label": "企画", "section": "商品A", "note": "first"},
+    "b": {"id": "b", "label": "設計", "depends_on": ["a"], "note": "second"},
+}
+
+
+def test_restart_replays_changelog(tmp_path):
+    store = _patched_store(tmp_path)
+    assert _state(_restart(store).snapshot()) == (3, PATCHED)
+
+
+def test_journal_written_but_not_committed(tmp_path):
+    # save() がジャーナルを書いた直後（変更ログの破棄・rename の前）に落ちた
+    store = _patched_store(tmp_path)
+    saved = {"version": 4, "nodes": [{"id": "x", "label": "新規"}]}
+    store.journal.write(saved)
+
+    recovered = _restart(store)
+    assert _state(recovered.snapshot()) == (4, {"x": {"id": "x", "label": "新規"}})
+    assert not store.journal.exists()
+    # ジャーナルより古い変更ログは再生しない
+    assert not store.changelog.path.exists()
+    assert json.loads(store.path.read_text(encoding="utf-8")) == saved
+    assert _state(_restart(store).snapshot())[0] == 4
+
+
+def test_journal_committed_after_changelog_cleared(tmp_path):
+    # 変更ログを破棄した後、ジャーナルの rename 前に落ちた
+    store = _patched_store(tmp_path)
+    store.journal.write({"version": 4, "nodes": NODES})
+    store.changelog.clear()
+
+    snapshot = _restart(store).snapshot()
+    assert snapshot.version == 4
+    assert [dict(node) for node in snapshot.nodes] == NODES
+
+
+def test_partial_journal_write_is_discarded(tmp_path):
+    # ジャーナルの一時ファイルを書いている途中で落ちた（rename 前なので未コミット）
+    store = _patched_store(tmp_path)
+    tmp_journal = store.journal.path.with_name(store.journal.path.name + ".999.tmp")
+    tmp_journal.write_text('{"version": 4, "nodes": [{"id": "x"', encoding="utf-8")
+
+    assert _state(_restart(store).snapshot()) == (3, PATCHED)
+    assert not tmp_journal.exists()
+
+
+def test_compaction_interrupted_before_write(tmp_path):
+    # 圧縮がログを退避した直後（workflow.json を書く前）に落ちた
+    store = _patched_store(tmp_path)
+    store.changelog.rotate()
+    assert store.changelog.rotated_path.exists()
+
+    recovered = _restart(store)
+    assert _state(recovered.snapshot()) == (3, PATCHED)
+    recovered.compact()
+    assert not store.changelog.rotated_path.exists()
+    assert _state(_restart(store).snapshot()) == (3, PATCHED)
+
+
+def test_compaction_interrupted_after_write_is_idempotent(tmp_path):
+    # workflow.json を書いた後、退避ログの削除前に落ちた: 反映済みのパッチをもう一度再生する
+    store = _patched_store(tmp_path)
+    snapshot = store.snapshot()
+    store.changelog.rotate()
+    _write_json(store.path, snapshot.as_workflow())
+
+    recovered = _restart(store)
+    assert _state(recovered.snapshot()) == (3, PATCHED)
+    # 再起動を繰り返しても、退避ログの上に新しいパッチが積まれても同じ結果になる
+    assert _state(_restart(store).snapshot()) == (3, PATCHED)
+    recovered.apply_patch({"a": {"note": "third"}})
+    expected = dict(PATCHED, a=dict(PATCHED["a"], note="third"))
+    assert _state(_restart(store).snapshot()) == (4, expected)
+    assert _state(_restart(store).snapshot()) == (4, expected)
+
+
+def test_truncated_last_changelog_line(tmp_path):
+    # 追記の途中で落ちた（最後の行が途中で切れている）
+    store = _patched_store(tmp_path)
+    with open(store.changelog.path, "a", encoding="utf-8") as f:
+        f.write('{"op": "patch", "id": "a", "patch": {"note": "lo')
+
+    recovered = _restart(store)
+    assert _state(recovered.snapshot()) == (3, PATCHED)
+    # 復元後の追記は切れた行の続きにならず、再起動後も残る
+    recovered.apply_patch({"a": {"note": "after crash"}})
+    expected = dict(PATCHED, a=dict(PATCHED["a"], note="after crash"))
+    assert _state(_restart(store).snapshot()) == (4, expected)
+
+
+def test_truncated_line_from_other_worker(tmp_path):
+    # 別のワーカーが追記中に落ちた。生きているワーカーは再読み込みせずに追記する
+    store = _patched_store(tmp_path)
+    with open(store.changelog.path, "a", encoding="utf-8") as f:
+        f.write('{"op": "patch", "id": "b", "pat')
+
+    store.apply_patch({"b": {"label": "詳細設計"}})
+    expected = dict(PATCHED, b=dict(PATCHED["b"], label="詳細設計"))
+    assert _state(_restart(store).snapshot()) == (4, expected)
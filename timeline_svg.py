@@ -0,0 +1,228 @@
+"""
+Timeline SVG - タスク一覧から直接ガントチャート SVG を生成（matplotlib 不要）
+
+- 日付は1回だけパースし、バー・セクション色・月単位の日付軸をそのまま出力
+- セクションフィルタと日付ウィンドウ（from / to）に対応。ウィンドウ外のタスクは出力しない
+- 出力はチャンク単位のジェネレータ（Flask でストリーミング可能）
+- 各行に data-task-id / data-section / data-start / data-end / data-depends-on を付与し、
+  UI 側でサーバに問い合わせずにインタラクションを組める
+- schedule（schedule.compute_schedule の結果）を渡すと、行に data-slack を付け、
+  クリティカルなタスクの行に critical クラスと強調枠を付ける
+"""
+
+import traceback
+from datetime import datetime, timedelta
+from html import escape
+
+from dag_svg import CRITICAL_COLOR, SECTION_COLORS, _chunked, _parse_date
+
+# 日付軸の目盛りの最大数（超える場合は月を間引く）
+MAX_AXIS_TICKS = 24
+
+
+def _month_starts(first, last):
+    """first 〜 last に含まれる各月の1日"""
+    year, month = first.year, first.month
+    if first.day != 1:
+        month += 1
+    while True:
+        if month > 12:
+            year, month = year + 1, 1
+        current = datetime(year, month, 1)
+        if current > last:
+            return
+        yield current
+        month += 1
+
+
+class TimelineLayout:
+    """ガントチャート SVG の座標計算結果"""
+
+    width = 1200
+    margin_left = 240
+    margin_right = 30
+    margin_top = 70
+    margin_bottom = 30
+    row_height = 24
+    bar_height = 14
+    title = "Project Timeline (Gantt Chart)"
+
+    def __init__(
+        self, tasks, section_filter=None, date_from=None, date_to=None, schedule=None
+    ):
+        self.schedule = schedule
+        date_cache = {}
+        window_from = _parse_date(date_from, date_cache) if date_from else None
+        window_to = _parse_date(date_to, date_cache) if date_to else None
+        if date_from and window_from is None:
+            raise ValueError(f"Invalid date: {date_from}")
+        if date_to and window_to is None:
+            raise ValueError(f"Invalid date: {date_to}")
+
+        # セクション色はフィルタ前の全タスクの出現順で決める（PNG と同じ）
+        self.colors = {}
+        for task in tasks:
+            section = task.get("section", "")
+            if section not in self.colors:
+                self.colors[section] = SECTION_COLORS[
+                    len(self.colors) % len(SECTION_COLORS)
+                ]
+
+        # 開始・終了が解釈できて、ウィンドウに交差するタスクだけを行にする
+        rows = []
+        for task in tasks:
+            if section_filter and task.get("section", "") != section_filter:
+                continue
+            start = _parse_date(task.get("start", ""), date_cache)
+            end = _parse_date(task.get("end", ""), date_cache)
+            if start is None or end is None:
+                continue
+            # 終了日を含む（最短1日）
+            end = max(end, start) + timedelta(days=1)
+            if window_from is not None and end <= window_from:
+                continue
+            if window_to is not None and start > window_to:
+                continue
+            rows.append((task, start, end))
+        self.rows = rows
+
+        if window_from is not None:
+            min_date = window_from
+        elif rows:
+            min_date = min(start for _, start, _ in rows)
+        else:
+            min_date = datetime(2023, 1, 1)
+        if window_to is not None:
+            max_date = window_to + timedelta(days=1)
+        elif rows:
+            max_date = max(end for _, _, end in rows)
+        else:
+            max_date = datetime(2023, 12, 31)
+        if max_date <= min_date:
+            max_date = min_date + timedelta(days=1)
+        self.min_date = min_date
+        self.max_date = max_date
+        self.days = (max_date - min_date).days
+
+        self.usable_width = self.width - self.margin_left - self.margin_right
+        self.height = (
+            self.margin_top + max(len(rows), 1) * self.row_height + self.margin_bottom
+        )
+
+    def x_for(self, value):
+        """datetime を X 座標に変換（ウィンドウ外は端に寄せる）"""
+        days = (value - self.min_date).days
+        days = min(max(days, 0), self.days)
+        return self.margin_left + days / self.days * self.usable_width
+
+    def header_parts(self):
+        width, height = self.width, self.height
+        left, top = self.margin_left, self.margin_top
+        bottom = height - self.margin_bottom
+
+        yield f'<rect width="{width}" height="{height}" fill="#f9f9f9"/>'
+        yield (
+            f'<text x="{width / 2}" y="24" text-anchor="middle" fill="#333" '
+            f'font-size="14" font-weight="bold">{escape(self.title)}</text>'
+        )
+
+        # X軸（月単位の日付軸とグリッド）
+        months = list(_month_starts(self.min_date, self.max_date))
+        step = -(-len(months) // MAX_AXIS_TICKS) if months else 1
+        yield '<g class="x-axis">'
+        yield f'<line x1="{left}" y1="{top - 10}" x2="{width - self.margin_right}" y2="{top - 10}" stroke="#333" stroke-width="1"/>'
+        for month in months[::step]:
+            x = self.x_for(month)
+            yield f'<line x1="{x}" y1="{top - 10}" x2="{x}" y2="{bottom}" stroke="#ddd" stroke-width="1"/>'
+            yield f'<text x="{x}" y="{top - 16}" text-anchor="middle" fill="#333" font-size="10">{month.strftime("%Y-%m-%d")}</text>'
+        yield "</g>"
+
+    def row_parts(self):
+        """各タスク行（ラベル＋バー）のマークアップ
+
+        X 座標・セクション属性は同じ日付・セクションごとに1回だけ計算する。
+        """
+        x_cache = {}
+        section_cache = {}
+        label_x = self.margin_left - 8
+        text_dy = self.row_height / 2 + 4
+        bar_dy = (self.row_height - self.bar_height) / 2
+        for index, (task, start, end) in enumerate(self.rows):
+            x1 = x_cache.get(start)
+            if x1 is None:
+                x1 = x_cache[start] = self.x_for(start)
+            x2 = x_cache.get(end)
+            if x2 is None:
+                x2 = x_cache[end] = self.x_for(end)
+
+            section = task.get("section", "")
+            cached = section_cache.get(section)
+            if cached is None:
+                cached = section_cache[section] = (
+                    escape(section),
+                    self.colors.get(section, "gray"),
+                )
+            section_attr, color = cached
+
+            y = self.margin_top + index * self.row_height
+            task_id = escape(str(task.get("id", "")))
+            label = escape(f"{section} - {task.get('task', '')}")
+            depends_on = escape(" ".join(task.get("next_to_list", [])))
+            attrs = 'class="gantt-task"'
+            stroke = 'stroke="#333" stroke-width="1"'
+            if self.schedule is not None:
+                if task.get("id") in self.schedule.critical:
+                    attrs = 'class="gantt-task critical"'
+                    stroke = f'stroke="{CRITICAL_COLOR}" stroke-width="2"'
+                slack = self.schedule.slack.get(task.get("id"))
+                if slack is not None:
+                    attrs += f' data-slack="{slack}"'
+            yield (
+                f'<g {attrs} data-task-id="{task_id}" '
+                f'data-section="{section_attr}" '
+                f'data-start="{escape(task.get("start", ""))}" '
+                f'data-end="{escape(task.get("end", ""))}" '
+                f'data-depends-on="{depends_on}">'
+                f'<text x="{label_x}" y="{y + text_dy}" '
+                f'text-anchor="end" fill="#333" font-size="11">{label}</text>'
+                f'<rect class="gantt-bar" x="{x1}" y="{y + bar_dy}" '
+                f'width="{max(x2 - x1, 2)}" height="{self.bar_height}" '
+                f'fill="{color}" fill-opacity="0.8" {stroke}/>'
+                "</g>"
+            )
+
+    def iter_svg(self):
+        """SVG をチャンクごとに返す"""
+        yield (
+            f'<svg width="{self.width}" height="{self.height}" '
+            'xmlns="http://www.w3.org/2000/svg" class="gantt-chart">'
+            + "".join(self.header_parts())
+        )
+        yield from _chunked(self.row_parts())
+        yield "</svg>"
+
+
+def iter_timeline_svg(
+    tasks, section_filter=None, date_from=None, date_to=None, schedule=None
+):
+    """ガントチャート SVG をチャンク単位で返すジェネレータ
+
+    日付ウィンドウが不正な場合は最初のチャンクを返す前に ValueError を送出する。
+    """
+    return TimelineLayout(
+        tasks, section_filter, date_from, date_to, schedule
+    ).iter_svg()
+
+
+def generate_timeline_svg(
+    tasks, section_filter=None, date_from=None, date_to=None, schedule=None
+):
+    """ガントチャート SVG を文字列で返す（失敗時は None）"""
+    try:
+        return "".join(
+            iter_timeline_svg(tasks, section_filter, date_from, date_to, schedule)
+        )
+    except Exception as e:
+        print(f"Timeline SVG generation error: {e}")
+        traceback.print_exc()
+        return None
@@ -0,0 +1,479 @@
+"""
+Validation Engine - workflow のノード検証（存在しない依存・サイクル・期限矛盾）
+
+- 依存グラフは1回だけ構築し、期限も1ノードにつき1回だけパースする
+- サイクル検出は反復版 Tarjan 法（再帰なし）。強連結成分をすべて報告する
+- 全体で O(V + E)。1,000 段を超える依存チェーンでも RecursionError にならない
+- IncrementalValidator は編集間で状態を保持し、変更の影響範囲だけを再評価する
+"""
+
+import threading
+from datetime import datetime
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# エラーメッセージに列挙する強連結成分のノード数の上限
+MAX_COMPONENT_LISTING = 20
+
+
+class ValidationError(Exception):
+    pass
+
+
+def _parse_deadline(node, cache=None):
+    """期限を datetime に変換（不正・未設定は None）。cache は文字列 → 結果"""
+    value = node.get("deadline", "")
+    if cache is not None and value in cache:
+        return cache[value]
+    try:
+        parsed = datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        parsed = None
+    if cache is not None:
+        try:
+            cache[value] = parsed
+        except TypeError:
+            pass
+    return parsed
+
+
+def parse_deadlines(node_by_id):
+    """id → 期限（datetime または None）。同じ日付文字列は1回だけパースする"""
+    cache = {}
+    return {
+        node_id: _parse_deadline(node, cache) for node_id, node in node_by_id.items()
+    }
+
+
+def build_dependency_graph(nodes, node_by_id):
+    """依存元 → 依存先（dep → node）の隣接リストを作る
+
+    存在しない依存は含めない。同じ依存が重複していても辺は1本。
+    """
+    successors = {node_id: [] for node_id in node_by_id}
+    for node in nodes:
+        node_id = node["id"]
+        seen = set()
+        for dep_id in node.get("depends_on", []):
+            if dep_id in successors and dep_id not in seen:
+                seen.add(dep_id)
+                successors[dep_id].append(node_id)
+    return successors
+
+
+def strongly_connected_components(successors):
+    """反復版 Tarjan 法で強連結成分を求める
+
+    successors の挿入順に探索し、成分を逆トポロジカル順で返す。
+    """
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+
+    for root in successors:
+        if root in index_of:
+            continue
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors[root]))]
+
+        while work:
+            node_id, neighbors = work[-1]
+            advanced = False
+            for neighbor in neighbors:
+                if neighbor not in index_of:
+                    index_of[neighbor] = lowlink[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack.add(neighbor)
+                    work.append((neighbor, iter(successors[neighbor])))
+                    advanced = True
+                    break
+                if neighbor in on_stack and index_of[neighbor] < lowlink[node_id]:
+                    lowlink[node_id] = index_of[neighbor]
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if lowlink[node_id] < lowlink[parent]:
+                    lowlink[parent] = lowlink[node_id]
+            if lowlink[node_id] == index_of[node_id]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node_id:
+                        break
+                components.append(component)
+
+    return components
+
+
+def _cycle_in_component(component, successors):
+    """強連結成分内の単純サイクルを1つ返す（始点を末尾に繰り返す）
+
+    成分内の各ノードは成分内に必ず後続を持つので、辿れば必ず閉じる。
+    successors は後続ノードのイテラブルを返す関数でもよい。
+    """
+    if not callable(successors):
+        successors = successors.__getitem__
+    members = set(component)
+    start = component[0]
+    path = [start]
+    position = {start: 0}
+    current = start
+    while True:
+        current = next(n for n in successors(current) if n in members)
+        if current in position:
+            return path[position[current] :] + [current]
+        position[current] = len(path)
+        path.append(current)
+
+
+def detect_cycles(nodes, node_by_id, successors=None):
+    """サイクルを含む強連結成分ごとにエラーを1件返す"""
+    if successors is None:
+        successors = build_dependency_graph(nodes, node_by_id)
+    order = {node_id: i for i, node_id in enumerate(successors)}
+
+    cyclic = []
+    for component in strongly_connected_components(successors):
+        if not _is_cyclic(component, successors.__getitem__):
+            continue
+        # 報告順をノードの並び順で安定させる
+        component.sort(key=order.__getitem__)
+        cyclic.append(component)
+    cyclic.sort(key=lambda component: order[component[0]])
+
+    return [_cycle_message(component, successors) for component in cyclic]
+
+
+def _is_cyclic(component, successors):
+    return len(component) > 1 or component[0] in successors(component[0])
+
+
+def _cycle_message(component, successors):
+    """並び順にソート済みの強連結成分からエラーメッセージを作る"""
+    cycle = _cycle_in_component(component, successors)
+    message = f"Cycle detected: {' -> '.join(cycle)}"
+    if len(component) > len(cycle) - 1:
+        listed = ", ".join(component[:MAX_COMPONENT_LISTING])
+        if len(component) > MAX_COMPONENT_LISTING:
+            listed += ", ..."
+        message += (
+            f" (strongly connected component of {len(component)} nodes: {listed})"
+        )
+    return message
+
+
+def _missing_dependency_errors(node_id, depends_on, exists):
+    return [
+        f"Node '{node_id}': Dependency '{dep_id}' does not exist"
+        for dep_id in depends_on
+        if not exists(dep_id)
+    ]
+
+
+def _contradiction_warnings(node, parent_date, depends_on, node_by_id, deadlines):
+    warnings = []
+    for dep_id in depends_on:
+        dep_date = deadlines.get(dep_id)
+        if dep_date is not None and dep_date > parent_date:
+            parent_node = node_by_id[dep_id]
+            warnings.append(
+                f"Deadline contradiction: '{dep_id}' (親) has deadline {parent_node['deadline']} "
+                f"but '{node['id']}' (子) has earlier deadline {node['deadline']}"
+            )
+    return warnings
+
+
+def check_deadline_contradictions(nodes, node_by_id, deadlines=None):
+    """親ノードの期限が子ノードより古い場合は警告"""
+    if deadlines is None:
+        deadlines = parse_deadlines(node_by_id)
+    warnings = []
+    for node in nodes:
+        if node_by_id.get(node["id"]) is node:
+            parent_date = deadlines.get(node["id"])
+        else:
+            parent_date = _parse_deadline(node)
+        if parent_date is None:
+            continue
+        warnings.extend(
+            _contradiction_warnings(
+                node, parent_date, node.get("depends_on", []), node_by_id, deadlines
+            )
+        )
+
+    return warnings
+
+
+def validate_workflow(nodes):
+    errors = []
+    warnings = []
+    node_by_id = {node["id"]: node for node in nodes}
+
+    # 存在しない依存関係のチェック
+    for node in nodes:
+        errors.extend(
+            _missing_dependency_errors(
+                node["id"], node.get("depends_on", []), node_by_id.__contains__
+            )
+        )
+
+    # サイクル検出
+    successors = build_dependency_graph(nodes, node_by_id)
+    errors.extend(detect_cycles(nodes, node_by_id, successors))
+
+    # 期限矛盾チェック（期限のパースはノードごとに1回）
+    deadlines = parse_deadlines(node_by_id)
+    warnings.extend(check_deadline_contradictions(nodes, node_by_id, deadlines))
+
+    return {"valid": len(errors) == 0, "errors": errors, "warnings": warnings}
+
+
+class IncrementalValidator:
+    """編集間で検証状態を保持し、変更の影響範囲だけを再評価するバリデータ
+
+    update(nodes) に最新のノード列を渡すと validate_workflow() と同じ結果を返す。
+    前回との差分（追加・削除・depends_on / deadline の変更）から
+
+    - 依存の存在チェック: 変更ノードと、追加・削除された id を参照するノード
+    - 期限矛盾チェック: 変更ノードと、期限が変わったノードの子
+    - サイクル検出: 変更ノードから到達可能な範囲の強連結成分
+
+    だけを再計算する。id の変更は「削除＋追加」として扱う。
+    id が重複している場合や並び順が変わった場合は全体を再構築する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._nodes = {}  # id → ノード
+        self._deps = {}  # id → depends_on（複製）
+        self._order = []  # ノードの並び順
+        self._position = {}  # id → 並び順の位置
+        self._dependents = {}  # 依存先 id（存在しない id も含む）→ 参照しているノード id
+        self._raw_deadlines = {}  # id → 期限の元の値
+        self._deadlines = {}  # id → 期限（datetime または None）
+        self._date_cache = {}
+        self._missing = {}  # id → 依存切れエラー
+        self._warnings = {}  # id → 期限矛盾の警告
+        self._component_of = {}  # id → サイクルを含む強連結成分（frozenset）
+        self._cycles = {}  # 強連結成分 → (先頭ノード id, エラーメッセージ)
+        self._result = None
+
+    def update(self, nodes):
+        """最新のノード列に追従して検証結果を返す（戻り値は書き換えないこと）"""
+        with self._lock:
+            nodes = list(nodes)
+            ids = [node["id"] for node in nodes]
+            if len(set(ids)) != len(ids):
+                # 重複 id は validate_workflow() の「後勝ち」の意味論に任せる
+                self._reset()
+                return validate_workflow(nodes)
+            new_ids = set(ids)
+            old_ids = set(self._deps)
+            if [i for i in ids if i in old_ids] != [
+                i for i in self._order if i in new_ids
+            ]:
+                self._reset()
+                old_ids = set()
+            self._apply(nodes, ids, new_ids, old_ids)
+            return self._result
+
+    def _dependents_of(self, node_id):
+        return self._dependents.get(node_id, ())
+
+    def _successors(self, node_id):
+        """依存グラフ上の後続（node_id に依存するノード）を並び順で返す"""
+        return sorted(
+            (n for n in self._dependents_of(node_id) if n in self._deps),
+            key=self._position.__getitem__,
+        )
+
+    def _apply(self, nodes, ids, new_ids, old_ids):
+        added = new_ids - old_ids
+        removed = old_ids - new_ids
+        deps_changed = set()
+        deadline_changed = set()
+
+        for node in nodes:
+            node_id = node["id"]
+            self._nodes[node_id] = node
+            depends_on = node.get("depends_on", [])
+            old_deps = self._deps.get(node_id)
+            if depends_on != old_deps:
+                depends_on = list(depends_on)
+                deps_changed.add(node_id)
+                for dep_id in set(old_deps or ()):
+                    self._dependents[dep_id].discard(node_id)
+                for dep_id in set(depends_on):
+                    self._dependents.setdefault(dep_id, set()).add(node_id)
+                self._deps[node_id] = depends_on
+            deadline = node.get("deadline", "")
+            if node_id not in self._raw_deadlines or (
+                self._raw_deadlines[node_id] != deadline
+            ):
+                deadline_changed.add(node_id)
+                self._raw_deadlines[node_id] = deadline
+                self._deadlines[node_id] = _parse_deadline(node, self._date_cache)
+
+        for node_id in removed:
+            for dep_id in set(self._deps.pop(node_id)):
+                self._dependents[dep_id].discard(node_id)
+            del self._nodes[node_id]
+            del self._deadlines[node_id]
+            del self._raw_deadlines[node_id]
+            self._missing.pop(node_id, None)
+            self._warnings.pop(node_id, None)
+
+        if not (added or removed or deps_changed or deadline_changed):
+            if self._result is None:
+                self._assemble()
+            return
+
+        if added or removed:
+            self._order = ids
+            self._position = {node_id: i for i, node_id in enumerate(ids)}
+
+        appeared = added | removed
+        referencing = set()
+        for node_id in appeared:
+            referencing.update(self._dependents_of(node_id))
+        referencing &= new_ids
+
+        for node_id in added | deps_changed | referencing:
+            errors = _missing_dependency_errors(
+                node_id, self._deps[node_id], self._deps.__contains__
+            )
+            if errors:
+                self._missing[node_id] = errors
+            else:
+                self._missing.pop(node_id, None)
+
+        children = set()
+        for node_id in deadline_changed | removed:
+            children.update(self._dependents_of(node_id))
+        recheck = deps_changed | deadline_changed | referencing | children
+        for node_id in recheck & new_ids:
+            parent_date = self._deadlines[node_id]
+            warnings = (
+                _contradiction_warnings(
+                    self._nodes[node_id],
+                    parent_date,
+                    self._deps[node_id],
+                    self._nodes,
+                    self._deadlines,
+                )
+                if parent_date is not None
+                else None
+            )
+            if warnings:
+                self._warnings[node_id] = warnings
+            else:
+                self._warnings.pop(node_id, None)
+
+        self._update_cycles(added | deps_changed | referencing, removed)
+        self._assemble()
+
+    def _cycle_region(self, starts):
+        """starts を通るサイクルが存在し得る範囲（子孫かつ祖先）を返す
+
+        子孫方向と祖先方向を交互に広げ、先に閉じた側の集合の中だけで
+        もう一方向を辿る。編集位置がグラフの端に近いほど小さく済む。
+        """
+        predecessors = self._deps.__getitem__
+        forward = (set(starts), list(starts), self._dependents_of)
+        backward = (set(starts), list(starts), predecessors)
+        while forward[1] and backward[1]:
+            for seen, frontier, neighbors in (forward, backward):
+                node_id = frontier.pop()
+                for n in neighbors(node_id):
+                    if n not in seen and n in self._deps:
+                        seen.add(n)
+                        frontier.append(n)
+
+        if not forward[1]:
+            closed, neighbors = forward[0], predecessors
+        else:
+            closed, neighbors = backward[0], self._dependents_of
+        region = set(starts)
+        frontier = list(starts)
+        while frontier:
+            node_id = frontier.pop()
+            for n in neighbors(node_id):
+                if n not in region and n in closed:
+                    region.add(n)
+                    frontier.append(n)
+        return region
+
+    def _update_cycles(self, seeds, removed):
+        """変更ノードから到達可能な範囲だけ強連結成分を求め直す
+
+        辺 dep → node は node の depends_on が所有するので、サイクルの増減は
+        depends_on が変わったノード（＋削除・追加された id を参照するノード）を
+        必ず含む。以前の成分の構成ノードも起点に加え、分断された成分を拾う。
+        """
+        starts = set()
+        for node_id in seeds | removed:
+            component = self._component_of.get(node_id)
+            if component is not None:
+                starts.update(component)
+            starts.add(node_id)
+        starts = [node_id for node_id in starts if node_id in self._deps]
+        affected = self._cycle_region(starts)
+
+        for node_id in affected | removed:
+            component = self._component_of.pop(node_id, None)
+            if component is not None and component in self._cycles:
+                del self._cycles[component]
+                for member in component:
+                    self._component_of.pop(member, None)
+
+        position = self._position
+        subgraph = {
+            node_id: [n for n in self._dependents_of(node_id) if n in affected]
+            for node_id in sorted(affected, key=position.__getitem__)
+        }
+        for component in strongly_connected_components(subgraph):
+            if not _is_cyclic(component, subgraph.__getitem__):
+                continue
+            component.sort(key=position.__getitem__)
+            key = frozenset(component)
+            self._cycles[key] = (
+                component[0],
+                _cycle_message(component, self._successors),
+            )
+            for member in component:
+                self._component_of[member] = key
+
+    def _assemble(self):
+        position = self._position.__getitem__
+        errors = []
+        warnings = []
+        for node_id in sorted(self._missing, key=position):
+            errors.extend(self._missing[node_id])
+        for node_id in sorted(self._warnings, key=position):
+            warnings.extend(self._warnings[node_id])
+        errors.extend(
+            message
+            for _, message in sorted(
+                self._cycles.values(), key=lambda item: position(item[0])
+            )
+        )
+        self._result = {
+            "valid": len(errors) == 0,
+            "errors": errors,
+            "warnings": warnings,
+        }
@@ -0,0 +1,687 @@
+"""
+Workflow Store - workflow.json のプロセス内キャッシュ
+
+- 一度だけパースし、id / section のインデックスを保持
+- ファイルの mtime / size が変わった時、または save_workflow() の書き込み時のみ再構築
+- 読み取りは不変スナップショット経由（スレッド間で途中状態を見せない）
+- ノード単位のパッチは追記型の変更ログに記録し、バックグラウンドで workflow.json に圧縮
+- 複数ワーカープロセスで動かす場合に備え、書き込み・再読み込みはプロセス間ロックの中で行い、
+  更新のたびに共有の世代番号を進める（他のワーカーは次のアクセスで再読み込みする）
+- workflow.json は 一時ファイル → fsync → rename で置き換える（途中で落ちても壊れない）
+- workflow には単調増加の version を保存する。更新時に基にした version を渡すと、
+  その後に別の更新が入っていれば VersionConflict を送出する（楽観的排他）
+- 全体保存は先行書き込みジャーナル（write-ahead journal）に書いてから反映し、
+  kill -9 などで中断しても最後にコミットされた状態を復元する
+
+ストアのインターフェース（SqliteWorkflowStore も同じ）:
+  snapshot() / save(workflow, base_version) / apply_patch(patches, base_version) /
+  compact() / invalidate()、一括入出力 import_nodes(node_batches, base_version) /
+  iter_nodes() と、問い合わせ get_node(id) / section_nodes(section) /
+  sections() / dependents(id) / nodes_page(offset, limit, section) /
+  search_nodes(query, limit)。open_workflow_store() がパスの拡張子で実装を選ぶ
+"""
+
+import json
+import os
+import threading
+from types import MappingProxyType
+
+from file_lock import FileLock, SharedCounter
+
+# 変更ログがこの件数に達したら即座に圧縮する
+COMPACT_EVERY = 200
+# 最後のパッチからこの秒数経過したら圧縮する
+COMPACT_DELAY = 2.0
+
+
+class VersionConflict(Exception):
+    """基にした version より後に別の更新が保存されている"""
+
+    def __init__(self, base_version, current_version):
+        super().__init__(
+            f"Workflow was modified by another update "
+            f"(based on version {base_version}, current version {current_version}). "
+            "Reload and apply your changes again."
+        )
+        self.base_version = base_version
+        self.current_version = current_version
+
+
+class WorkflowSnapshot:
+    """ある時点の workflow を表す読み取り専用スナップショット
+
+    公開後に変更されることはない。ノード dict も呼び出し側で書き換えないこと。
+    """
+
+    __slots__ = ("nodes", "by_id", "by_section", "meta", "stamp", "_memo")
+
+    def __init__(self, nodes, by_id, by_section, meta, stamp, memo=None):
+        self.nodes = nodes
+        self.by_id = by_id
+        self.by_section = by_section
+        self.meta = meta
+        self.stamp = stamp
+        self._memo = {} if memo is None else memo
+
+    def derive(self, key, factory):
+        """このスナップショットから導出した値をメモ化して返す
+
+        キャッシュキーや集計結果など、ノード内容だけで決まる値に使う。
+        競合時に二重計算されることはあるが、結果は同じなので問題ない。
+        """
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = factory(self)
+            return value
+
+    @classmethod
+    def build(cls, workflow, stamp):
+        """workflow dict からインデックスを構築"""
+        nodes = tuple(workflow.get("nodes", []))
+        by_id = {}
+        by_section = {}
+        for node in nodes:
+            by_id[node["id"]] = node
+            by_section.setdefault(node.get("section", ""), []).append(node)
+
+        return cls(
+            nodes,
+            MappingProxyType(by_id),
+            MappingProxyType(
+                {section: tuple(items) for section, items in by_section.items()}
+            ),
+            MappingProxyType({k: v for k, v in workflow.items() if k != "nodes"}),
+            stamp,
+        )
+
+    @property
+    def version(self):
+        """保存のたびに増える workflow の version（未保存のファイルは 0）"""
+        return self.meta.get("version", 0)
+
+    def with_changes(self, changed, stamp=None, meta=None):
+        """changed（id → 新ノード）を反映した新しいスナップショットを返す
+
+        JSON の再パースや再シリアライズは行わず、参照の付け替えと
+        影響を受けるセクションの再構築だけで済ませる。
+        """
+        if meta is None:
+            meta = self.meta
+        if not changed:
+            return WorkflowSnapshot(
+                self.nodes,
+                self.by_id,
+                self.by_section,
+                meta,
+                self.stamp if stamp is None else stamp,
+                self._memo,
+            )
+        nodes = tuple(changed.get(n["id"], n) for n in self.nodes)
+        by_id = dict(self.by_id)
+        by_id.update(changed)
+
+        touched = set()
+        for node_id, node in changed.items():
+            touched.add(node.get("section", ""))
+            old = self.by_id.get(node_id)
+            if old is not None:
+                touched.add(old.get("section", ""))
+
+        by_section = dict(self.by_section)
+        for section in touched:
+            items = tuple(n for n in nodes if n.get("section", "") == section)
+            if items:
+                by_section[section] = items
+            else:
+                by_section.pop(section, None)
+
+        return WorkflowSnapshot(
+            nodes,
+            MappingProxyType(by_id),
+            MappingProxyType(by_section),
+            meta,
+            self.stamp if stamp is None else stamp,
+        )
+
+    def as_workflow(self):
+        """load_workflow() 互換の dict を返す（nodes リストは毎回新規）"""
+        workflow = dict(self.meta)
+        workflow["nodes"] = list(self.nodes)
+        return workflow
+
+
+def _file_stamp(path):
+    """(mtime_ns, size) を返す。ファイルが無ければ None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _copy_value(value):
+    return list(value) if isinstance(value, list) else value
+
+
+def _copy_node(node):
+    """呼び出し側の dict / list と共有しないようにノードを複製"""
+    return {k: _copy_value(v) for k, v in node.items()}
+
+
+# 文字列でなければならないノードのフィールド
+NODE_STRING_FIELDS = (
+    "label",
+    "section",
+    "deadline",
+    "note",
+    "doc",
+    "action",
+    "qms_path",
+    "knowledge_dir",
+)
+
+
+def node_field_error(node):
+    """ノードのフィールドの型を検証し、問題があればメッセージを返す（無ければ None）
+
+    id の形式・重複は呼び出し側で検証する。
+    """
+    if "label" not in node:
+        return "'label' is required"
+    for field in NODE_STRING_FIELDS:
+        if field in node and not isinstance(node[field], str):
+            return f"'{field}' must be a string"
+    depends_on = node.get("depends_on", [])
+    if not isinstance(depends_on, list) or not all(
+        isinstance(dep, str) for dep in depends_on
+    ):
+        return "'depends_on' must be a list of strings"
+    if "decision" in node and not isinstance(node["decision"], bool):
+        return "'decision' must be a boolean"
+    return None
+
+
+def merge_patch(node, patch):
+    """JSON Merge Patch (RFC 7396) 形式でノードにパッチを当てた新しい dict を返す
+
+    値が None のキーは削除する。id の変更と label の削除は許可しない。
+    パッチ後のノードは node_field_error で検証し、不正なら ValueError を送出する
+    （変更履歴に書く前に呼ぶこと）。
+    """
+    if not isinstance(patch, dict):
+        raise ValueError("Patch must be a JSON object")
+    if "id" in patch and patch["id"] != node["id"]:
+        raise ValueError(f"Node '{node['id']}': id cannot be changed by patch")
+    if "label" in patch and patch["label"] is None:
+        raise ValueError(f"Node '{node['id']}': label cannot be deleted")
+
+    merged = dict(node)
+    for key, value in patch.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = _copy_value(value)
+
+    error = node_field_error(merged)
+    if error:
+        raise ValueError(f"Node '{node['id']}': {error}")
+    return merged
+
+
+def _fsync_dir(directory):
+    """rename を永続化するためディレクトリを fsync（POSIX のみ）"""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_json(path, workflow, indent=2):
+    """一時ファイルに書いて fsync してから rename で置き換える
+
+    読み手やクラッシュ後の起動が書きかけのファイルを見ることはない。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(workflow, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+
+
+def _indent_json(value, indent):
+    """json.dump(indent=2) の入れ子の位置に合わせて値を直列化"""
+    return json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n" + indent)
+
+
+def _write_json_stream(path, header, node_batches):
+    """json.dump(indent=2) と同じ形式で、ノードをバッチごとに書き出す
+
+    一時ファイル → fsync → rename で置き換え、書き出したノード数を返す。
+    途中で例外が出た場合は一時ファイルを消し、path は変更しない。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    count = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("{\n")
+            for key, value in header.items():
+                f.write(f"  {json.dumps(key)}: {_indent_json(value, '  ')},\n")
+            f.write('  "nodes": [')
+            for batch in node_batches:
+                for node in batch:
+                    f.write(",\n    " if count else "\n    ")
+                    f.write(_indent_json(node, "    "))
+                    count += 1
+            f.write("\n  ]\n}" if count else "]\n}")
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+    return count
+
+
+class Journal:
+    """workflow 全体保存の先行書き込みジャーナル
+
+    保存内容をまず workflow.json と同じ形式の完全なファイルとしてジャーナルに書く
+    （rename で作るので、存在すればコミット済み）。変更ログを破棄してから
+    workflow.json に rename する。ジャーナルが残っていれば反映途中で落ちたと
+    いうことなので、同じ手順で反映を完了させる。
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, workflow):
+        _write_json(self.path, workflow)
+
+    def write_stream(self, header, node_batches):
+        """ノードをバッチごとに書き出す（一括インポート用）。ノード数を返す"""
+        return _write_json_stream(self.path, header, node_batches)
+
+    def exists(self):
+        return self.path.exists()
+
+    def commit(self, target):
+        """ジャーナルを target に置き換えて反映する"""
+        os.replace(self.path, target)
+        _fsync_dir(target.parent)
+
+
+def _dependents_index(snapshot):
+    """依存先 id → それに依存しているノード id のリスト（workflow 内の順序）"""
+    index = {}
+    for node in snapshot.nodes:
+        for dep in dict.fromkeys(node.get("depends_on", [])):
+            if dep:
+                index.setdefault(dep, []).append(node["id"])
+    return index
+
+
+def _search_index(snapshot):
+    """(ノード, 小文字の id, 小文字のラベル) のリスト（タイプアヘッド検索用）"""
+    return [
+        (node, str(node["id"]).lower(), str(node.get("label", "")).lower())
+        for node in snapshot.nodes
+    ]
+
+
+class ChangeLog:
+    """追記専用の変更ログ（1行1エントリの JSON Lines）
+
+    圧縮時は現在のログを .compacting に退避してから workflow.json を書き、
+    書き込み完了後に削除する。読み込み時は 退避ログ → 現在のログ の順に
+    再生する（パッチは冪等なので、圧縮途中で落ちても二重適用にならない）。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rotated_path = path.with_name(path.name + ".compacting")
+        self.pending = 0
+
+    def append(self, entries):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(
+            json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries
+        ).encode("utf-8")
+        with open(self.path, "a+b") as f:
+            self._drop_torn_tail(f)
+            f.write(data)
+            f.flush()
+            # 応答を返した変更はクラッシュ後も残す
+            os.fsync(f.fileno())
+        self.pending += len(entries)
+
+    @staticmethod
+    def _drop_torn_tail(f):
+        """追記中に落ちて途中で切れた末尾行を切り詰める
+
+        残したまま追記すると新しいエントリが壊れた行の続きになり、読み込み時に
+        捨てられてしまう。
+        """
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        f.truncate(f.read().rfind(b"\n") + 1)
+
+    def entries(self):
+        """退避ログと現在のログのエントリを順に返す（壊れた末尾行は無視）"""
+        result = []
+        for path in (self.rotated_path, self.path):
+            if not path.exists():
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        result.append(json.loads(line))
+                    except ValueError:
+                        break
+        return result
+
+    def rotate(self):
+        """現在のログを圧縮用に退避する"""
+        if self.path.exists():
+            os.replace(self.path, self.rotated_path)
+        self.pending = 0
+
+    def drop_rotated(self):
+        if self.rotated_path.exists():
+            self.rotated_path.unlink()
+
+    def clear(self):
+        self.drop_rotated()
+        if self.path.exists():
+            self.path.unlink()
+        self.pending = 0
+
+
+def _replay(workflow, entries):
+    """変更ログのエントリを workflow に適用"""
+    if not entries:
+        return workflow
+    nodes = workflow.get("nodes", [])
+    index = {node["id"]: i for i, node in enumerate(nodes)}
+    for entry in entries:
+        if entry.get("op") != "patch":
+            continue
+        if "version" in entry:
+            workflow["version"] = entry["version"]
+        i = index.get(entry.get("id"))
+        if i is None:
+            continue
+        try:
+            nodes[i] = merge_patch(nodes[i], entry.get("patch", {}))
+        except ValueError:
+            continue
+    return workflow
+
+
+class WorkflowStore:
+    """workflow.json をパース済みスナップショットとして保持するストア"""
+
+    def __init__(self, path, changelog_path=None):
+        self.path = path
+        if changelog_path is None:
+            changelog_path = path.with_name(path.stem + ".changes.jsonl")
+        self.changelog = ChangeLog(changelog_path)
+        self.journal = Journal(path.with_name(path.stem + ".journal.json"))
+        # ロックの取得順は必ず _lock → file_lock
+        self._lock = threading.RLock()
+        self.file_lock = FileLock(path.with_name(path.name + ".lock"))
+        self.generation = SharedCounter(path.with_name(path.stem + ".generation"))
+        self._snapshot = None
+        self._compact_timer = None
+
+    def _recover(self):
+        """ロック保持中に呼ぶ: 反映途中で中断した全体保存をジャーナルから復元する
+
+        復元した場合は True を返す。
+        """
+        if self._snapshot is None:
+            # 中断した書き込みの一時ファイルを掃除する
+            for tmp_path in self.path.parent.glob(f"{self.path.stem}.*.tmp"):
+                tmp_path.unlink(missing_ok=True)
+        if not self.journal.exists():
+            return False
+        self.changelog.clear()
+        self.journal.commit(self.path)
+        self.generation.increment()
+        self._snapshot = None
+        return True
+
+    def _current(self):
+        """ロック保持中に呼ぶ: 復元と他ワーカーの変更の取り込みを済ませた最新スナップショット"""
+        self._recover()
+        return self.snapshot()
+
+    def _check_version(self, snapshot, base_version):
+        if base_version is not None and base_version != snapshot.version:
+            raise VersionConflict(base_version, snapshot.version)
+
+    def _stamp(self):
+        """(ファイル stamp, 共有世代番号)。どちらかが変われば再読み込みが必要"""
+        return (_file_stamp(self.path), self.generation.value())
+
+    def snapshot(self):
+        """現在のスナップショットを返す（ファイルか共有世代が変わっていれば再読み込み）"""
+        current = self._snapshot
+        if current is not None and current.stamp == self._stamp():
+            return current
+
+        with self._lock, self.file_lock:
+            current = self._snapshot
+            stamp = self._stamp()
+            if current is not None and current.stamp == stamp:
+                return current
+            if self._recover():
+                stamp = self._stamp()
+            if stamp[0] is None:
+                workflow = {"nodes": []}
+            else:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    workflow = json.load(f)
+            entries = self.changelog.entries()
+            self.changelog.pending = len(entries)
+            workflow = _replay(workflow, entries)
+            self._snapshot = WorkflowSnapshot.build(workflow, stamp)
+            return self._snapshot
+
+    def publish(self, workflow):
+        """書き込み直後の workflow をスナップショットとして差し替える
+
+        保存処理から呼ばれる。再パースせずに済むよう、書き込んだ内容と
+        その時点の stamp を対応付けて保持する。
+        """
+        workflow = dict(workflow)
+        workflow["nodes"] = [_copy_node(n) for n in workflow.get("nodes", [])]
+        with self._lock:
+            self._snapshot = WorkflowSnapshot.build(workflow, self._stamp())
+            return self._snapshot
+
+    def save(self, workflow, base_version=None):
+        """workflow 全体を書き込む（未圧縮の変更ログは不要になるので破棄）
+
+        version は現在の値（と workflow 側の値の大きい方）+ 1 に置き換える。
+        base_version が現在の version と異なれば VersionConflict。
+        """
+        with self._lock, self.file_lock:
+            current = self._current()
+            self._check_version(current, base_version)
+            workflow = dict(workflow)
+            workflow["version"] = max(current.version, workflow.get("version", 0)) + 1
+
+            self.journal.write(workflow)
+            self.changelog.clear()
+            self.journal.commit(self.path)
+            self.generation.increment()
+            return self.publish(workflow)
+
+    def import_nodes(self, node_batches, base_version=None):
+        """ノードのバッチ列で workflow 全体を置き換える（一括インポート）
+
+        ノードはジャーナルに逐次書き出すので、保持するのは1バッチ分だけ。
+        途中で例外が出た場合は何も変更しない。base_version が古ければ VersionConflict。
+        (取り込んだノード数, 新しい version) を返す。
+        """
+        with self._lock, self.file_lock:
+            current = self._current()
+            self._check_version(current, base_version)
+            version = current.version + 1
+            count = self.journal.write_stream(
+                dict(current.meta, version=version), node_batches
+            )
+            self.changelog.clear()
+            self.journal.commit(self.path)
+            self.generation.increment()
+            # スナップショットは次のアクセスで読み直す
+            self._snapshot = None
+            return count, version
+
+    def iter_nodes(self):
+        """全ノードを workflow 内の順序で返す（一括エクスポート用）"""
+        return iter(self.snapshot().nodes)
+
+    def apply_patch(self, patches, base_version=None):
+        """ノード単位のパッチ（id → merge patch）を適用する
+
+        全パッチを検証してから一括で反映する。存在しない id は KeyError、
+        不正なパッチは ValueError、base_version が古ければ VersionConflict。
+        更新後のノードのリストを返す。
+        """
+        with self._lock, self.file_lock:
+            # 他のワーカーの変更を取り込んでから適用する
+            snapshot = self._current()
+            self._check_version(snapshot, base_version)
+            version = snapshot.version + 1
+            changed = {}
+            for node_id, patch in patches.items():
+                node = changed.get(node_id) or snapshot.by_id.get(node_id)
+                if node is None:
+                    raise KeyError(node_id)
+                changed[node_id] = merge_patch(node, patch)
+            if not changed:
+                return []
+
+            self.changelog.append(
+                [
+                    {"op": "patch", "id": node_id, "patch": patch, "version": version}
+                    for node_id, patch in patches.items()
+                ]
+            )
+            self.generation.increment()
+            self._snapshot = snapshot.with_changes(
+                changed,
+                stamp=self._stamp(),
+                meta=MappingProxyType(dict(snapshot.meta, version=version)),
+            )
+            self._schedule_compaction()
+            return list(changed.values())
+
+    def _schedule_compaction(self):
+        if self.changelog.pending >= COMPACT_EVERY:
+            delay = 0
+        elif self._compact_timer is not None:
+            return
+        else:
+            delay = COMPACT_DELAY
+        if self._compact_timer is not None:
+            self._compact_timer.cancel()
+        self._compact_timer = threading.Timer(delay, self.compact)
+        self._compact_timer.daemon = True
+        self._compact_timer.start()
+
+    def compact(self):
+        """変更ログを workflow.json に反映して空にする"""
+        with self._lock, self.file_lock:
+            if self._compact_timer is not None:
+                # 直接呼ばれた場合は予約済みの圧縮を取り消す
+                self._compact_timer.cancel()
+                self._compact_timer = None
+            snapshot = self._current()
+            if self.changelog.pending == 0:
+                return
+            # 書き込み中に落ちても退避ログから復元できるよう、反映後に削除する
+            self.changelog.rotate()
+            _write_json(self.path, snapshot.as_workflow())
+            self.changelog.drop_rotated()
+            self._snapshot = snapshot.with_changes({}, stamp=self._stamp())
+
+    def invalidate(self):
+        """次回アクセス時に強制的に再読み込みさせる"""
+        with self._lock:
+            self._snapshot = None
+
+    # ==================== 問い合わせ（スナップショットのインデックスで引く） ====================
+
+    def get_node(self, node_id):
+        """id のノード（無ければ None）"""
+        return self.snapshot().by_id.get(node_id)
+
+    def section_nodes(self, section):
+        """section に属するノード（workflow 内の順序）"""
+        return self.snapshot().by_section.get(section, ())
+
+    def sections(self):
+        """空でないセクション名の一覧（ソート済み）"""
+        return sorted(section for section in self.snapshot().by_section if section)
+
+    def dependents(self, node_id):
+        """node_id に依存しているノードの id（workflow 内の順序）"""
+        index = self.snapshot().derive("dependents", _dependents_index)
+        return list(index.get(node_id, ()))
+
+    def nodes_page(self, offset, limit, section=None):
+        """(offset から limit 件のノード, 対象の総数)。section 指定時はそのセクション内"""
+        snapshot = self.snapshot()
+        if section is None:
+            nodes = snapshot.nodes
+        else:
+            nodes = snapshot.by_section.get(section, ())
+        return nodes[offset : offset + limit], len(nodes)
+
+    def search_nodes(self, query, limit):
+        """id かラベルに query を含むノードを最大 limit 件（前方一致を優先）
+
+        query が空なら workflow 内の順序で先頭から返す。
+        """
+        snapshot = self.snapshot()
+        query = query.strip().lower()
+        if not query:
+            return list(snapshot.nodes[:limit])
+        prefix = []
+        partial = []
+        for node, node_id, label in snapshot.derive("search", _search_index):
+            if node_id.startswith(query) or label.startswith(query):
+                prefix.append(node)
+                if len(prefix) >= limit:
+                    break
+            elif len(partial) < limit and (query in node_id or query in label):
+                partial.append(node)
+        return (prefix + partial)[:limit]
+
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+def open_workflow_store(path):
+    """パスの拡張子に応じたストアを返す（.sqlite / .sqlite3 / .db は SQLite、他は JSON）"""
+    if path.suffix.lower() in SQLITE_SUFFIXES:
+        from sqlite_store import SqliteWorkflowStore
+
+        return SqliteWorkflowStore(path)
+    return WorkflowStore(path)
@@ -0,0 +1,23 @@
+"""
+WSGI エントリポイント - 複数ワーカープロセスでの本番配信用
+
+    uv run --with gunicorn gunicorn -w 4 -b 127.0.0.1:5000 wsgi:app
+
+- miwada-test.py はファイル名にハイフンを含むため importlib で読み込む
+- ワーカーごとにバックグラウンドでキャッシュを温める。画像の描画は成果物ごとの
+  プロセス間ロックで直列化され、先に描いたワーカーの結果を他はキャッシュから公開する
+"""
+
+import importlib.util
+import threading
+from pathlib import Path
+
+_APP_PATH = Path(__file__).with_name("miwada-test.py")
+
+_spec = importlib.util.spec_from_file_location("miwada_app", _APP_PATH)
+miwada_app = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(miwada_app)
+
+app = miwada_app.app
+
+threading.Thread(target=miwada_app.warm_caches, daemon=True).start()